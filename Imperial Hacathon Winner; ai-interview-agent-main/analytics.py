@@ -0,0 +1,356 @@
+# analytics.py
+"""
+Cross-session analytics over interview evaluations.
+
+Evaluation scores used to be write-only: answering "average specificity
+by persona this week" meant loading every session. InterviewAnalytics
+ingests each evaluation into a columnar store instead:
+
+- rows are partitioned by (day, persona, role); each partition keeps its
+  columns (timestamp + the four scores) as array('d') - 8 bytes a value;
+- each partition also keeps a rollup per score (count, sum, min, max,
+  variance and a histogram of values), updated as rows arrive, so a query
+  merges one rollup per matching partition and never scans rows;
+- scores take few distinct values (integers 1-5, overall in thirds), so
+  percentiles come exactly from the merged histograms;
+- partitions are persisted as append-only binary files,
+  <path>/<day>/<persona>,<role>.f64, written on flush().
+
+Example:
+    analytics = InterviewAnalytics("interview_analytics")
+    analytics.ingest("HR", "Junior Data Analyst", evaluation)
+    analytics.query("specificity", group_by=("persona",),
+                    since=date.today() - timedelta(days=7), percentiles=(50, 90))
+    # {("HR",): {"count": 812, "mean": 3.1, "stdev": 0.9, "min": 1.0, "max": 5.0, "p50": 3.0, "p90": 4.0}, ...}
+"""
+
+from array import array
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+from urllib.parse import quote, unquote
+import json
+import math
+import os
+import time
+
+METRICS = ("clarity", "specificity", "confidence", "overall_score")
+COLUMNS = ("timestamp",) + METRICS
+GROUP_FIELDS = ("day", "week", "persona", "role")
+
+# (day, persona, role); persona and role are "" when unknown
+PartitionKey = Tuple[str, str, str]
+
+_ROW_BYTES = len(COLUMNS) * array("d").itemsize
+
+
+class Rollup:
+    """Mergeable count / sum / min / max / variance / histogram of one score."""
+
+    __slots__ = ("count", "total", "m2", "min", "max", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the mean (Welford)
+        self.min = math.inf
+        self.max = -math.inf
+        self.histogram: Counter = Counter()
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, value: float) -> None:
+        old_mean = self.mean
+        self.count += 1
+        self.total += value
+        self.m2 += (value - old_mean) * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.histogram[value] += 1
+
+    @classmethod
+    def of(cls, values: Sequence[float]) -> "Rollup":
+        """Rollup of many values at once (bulk load)."""
+        rollup = cls()
+        if values:
+            rollup.count = len(values)
+            rollup.total = sum(values)
+            mean = rollup.total / rollup.count
+            rollup.m2 = sum((value - mean) ** 2 for value in values)
+            rollup.min = min(values)
+            rollup.max = max(values)
+            rollup.histogram = Counter(values)
+        return rollup
+
+    def merge(self, other: "Rollup") -> None:
+        """Fold `other` in (Chan et al.'s parallel variance)."""
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.histogram.update(other.histogram)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Nearest-rank percentile from the histogram."""
+        if not self.count:
+            return None
+        rank = min(self.count - 1, int(p / 100.0 * self.count))
+        seen = 0
+        for value in sorted(self.histogram):
+            seen += self.histogram[value]
+            if seen > rank:
+                return value
+        return self.max
+
+    def summary(self, percentiles: Sequence[float] = ()) -> Dict[str, Any]:
+        result = {
+            "count": self.count,
+            "mean": round(self.mean, 4),
+            "stdev": round(math.sqrt(self.m2 / self.count), 4) if self.count else 0.0,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+        for p in percentiles:
+            result[f"p{p:g}"] = self.percentile(p)
+        return result
+
+
+class Partition:
+    """The rows of one (day, persona, role), column by column, with their rollups."""
+
+    __slots__ = ("key", "columns", "rollups", "persisted")
+
+    def __init__(self, key: PartitionKey):
+        self.key = key
+        self.columns: Dict[str, array] = {name: array("d") for name in COLUMNS}
+        self.rollups: Dict[str, Rollup] = {metric: Rollup() for metric in METRICS}
+        # Rows [0, persisted) are on disk
+        self.persisted = 0
+
+    def __len__(self) -> int:
+        return len(self.columns["timestamp"])
+
+    def append(self, row: Sequence[float]) -> None:
+        for name, value in zip(COLUMNS, row):
+            self.columns[name].append(value)
+        for metric, value in zip(METRICS, row[1:]):
+            self.rollups[metric].add(value)
+
+    def extend(self, rows: array) -> None:
+        """Append rows stored row-major (as in the partition files)."""
+        width = len(COLUMNS)
+        for offset, name in enumerate(COLUMNS):
+            column = rows[offset::width]
+            self.columns[name].extend(column)
+            if name in self.rollups:
+                self.rollups[name].merge(Rollup.of(column))
+
+    def group_value(self, field: str) -> str:
+        day, persona, role = self.key
+        if field == "day":
+            return day
+        if field == "week":
+            year, week, _ = date.fromisoformat(day).isocalendar()
+            return f"{year}-W{week:02d}"
+        return persona if field == "persona" else role
+
+
+def _file_name(persona: str, role: str) -> str:
+    return f"{quote(persona, safe='')},{quote(role, safe='')}.f64"
+
+
+class InterviewAnalytics:
+    """
+    Columnar store of evaluation scores with incremental rollups.
+
+    `path` is the directory the partitions are persisted to (None keeps
+    everything in memory). Rows are buffered in memory and appended to
+    their partition files by flush().
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._partitions: Dict[PartitionKey, Partition] = {}
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    # -------------------------------
+    # Persistence
+    # -------------------------------
+
+    def _load(self) -> None:
+        for day in sorted(os.listdir(self.path)):
+            day_dir = os.path.join(self.path, day)
+            if not os.path.isdir(day_dir):
+                continue
+            for name in os.listdir(day_dir):
+                if not name.endswith(".f64"):
+                    continue
+                persona, _, role = name[:-len(".f64")].partition(",")
+                partition = self._partition((day, unquote(persona), unquote(role)))
+                file_path = os.path.join(day_dir, name)
+                values = array("d")
+                rows = os.path.getsize(file_path) // _ROW_BYTES
+                with open(file_path, "r+b") as f:
+                    values.fromfile(f, rows * len(COLUMNS))
+                    # Torn final row after a crash: cut it off so appends stay aligned
+                    f.truncate(rows * _ROW_BYTES)
+                partition.extend(values)
+                partition.persisted = len(partition)
+
+    def flush(self) -> int:
+        """Append buffered rows to their partition files; returns the number written."""
+        if self.path is None:
+            return 0
+        written = 0
+        for partition in self._partitions.values():
+            if partition.persisted == len(partition):
+                continue
+            day, persona, role = partition.key
+            os.makedirs(os.path.join(self.path, day), exist_ok=True)
+            rows = array("d")
+            for index in range(partition.persisted, len(partition)):
+                rows.extend(partition.columns[name][index] for name in COLUMNS)
+            with open(os.path.join(self.path, day, _file_name(persona, role)), "ab") as f:
+                rows.tofile(f)
+            written += len(partition) - partition.persisted
+            partition.persisted = len(partition)
+        return written
+
+    def close(self) -> None:
+        self.flush()
+
+    # -------------------------------
+    # Ingestion
+    # -------------------------------
+
+    def _partition(self, key: PartitionKey) -> Partition:
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = self._partitions[key] = Partition(key)
+        return partition
+
+    def ingest(
+        self,
+        persona: Optional[str],
+        role: Optional[str],
+        evaluation: Dict[str, Any],
+        timestamp: Optional[float] = None,
+    ) -> None:
+        """Add one evaluation (a dict with the METRICS scores)."""
+        timestamp = time.time() if timestamp is None else timestamp
+        day = datetime.fromtimestamp(timestamp, timezone.utc).date().isoformat()
+        row = [timestamp] + [float(evaluation.get(metric, 0)) for metric in METRICS]
+        self._partition((day, persona or "", role or "")).append(row)
+
+    def ingest_history_log(self, log_path: str) -> int:
+        """
+        Backfill from an interview history log (interview_history.py), taking
+        each answer's persona and role from the user's latest selection.
+        Returns the number of evaluations ingested.
+        """
+        selections: Dict[str, Dict[str, Optional[str]]] = {}
+        ingested = 0
+        with open(log_path, encoding="utf-8") as log:
+            for line in log:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                selection = selections.setdefault(entry.get("user"), {"role": None, "persona": None})
+                if entry.get("event") == "reset":
+                    selection["role"] = selection["persona"] = None
+                elif entry.get("event") in ("role", "persona"):
+                    selection[entry["event"]] = entry[entry["event"]]
+                elif entry.get("event") == "qa":
+                    self.ingest(selection["persona"], selection["role"], entry, timestamp=entry["time"])
+                    ingested += 1
+        return ingested
+
+    # -------------------------------
+    # Queries
+    # -------------------------------
+
+    def _matching(
+        self,
+        since: Optional[date],
+        until: Optional[date],
+        persona: Optional[str],
+        role: Optional[str],
+    ) -> Iterator[Partition]:
+        since_key = since.isoformat() if since else None
+        until_key = until.isoformat() if until else None
+        for partition in self._partitions.values():
+            day, partition_persona, partition_role = partition.key
+            if since_key and day < since_key or until_key and day > until_key:
+                continue
+            if persona is not None and partition_persona != persona:
+                continue
+            if role is not None and partition_role != role:
+                continue
+            yield partition
+
+    def query(
+        self,
+        metric: str,
+        group_by: Iterable[str] = (),
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        persona: Optional[str] = None,
+        role: Optional[str] = None,
+        percentiles: Sequence[float] = (),
+    ) -> Dict[Tuple[str, ...], Dict[str, Any]]:
+        """
+        Aggregate `metric` over the evaluations from `since` to `until`
+        (UTC days, inclusive), grouped by any of GROUP_FIELDS. Returns
+        {group values: {"count", "mean", "stdev", "min", "max", "p<N>"...}};
+        the key is () when not grouping. Cost is proportional to the number
+        of partitions, not rows.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}; expected one of {METRICS}")
+        group_by = tuple(group_by)
+        unknown = [field for field in group_by if field not in GROUP_FIELDS]
+        if unknown:
+            raise ValueError(f"Cannot group by {unknown}; expected fields from {GROUP_FIELDS}")
+
+        groups: Dict[Tuple[str, ...], Rollup] = {}
+        for partition in self._matching(since, until, persona, role):
+            group = tuple(partition.group_value(field) for field in group_by)
+            rollup = groups.get(group)
+            if rollup is None:
+                rollup = groups[group] = Rollup()
+            rollup.merge(partition.rollups[metric])
+        return {group: rollup.summary(percentiles) for group, rollup in sorted(groups.items())}
+
+    def column(
+        self,
+        name: str,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        persona: Optional[str] = None,
+        role: Optional[str] = None,
+    ) -> array:
+        """The raw values of one column (a score or "timestamp") for ad-hoc analysis."""
+        if name not in COLUMNS:
+            raise ValueError(f"Unknown column {name!r}; expected one of {COLUMNS}")
+        values = array("d")
+        for partition in self._matching(since, until, persona, role):
+            values.extend(partition.columns[name])
+        return values
+
+    def metrics(self) -> Dict[str, int]:
+        rows = sum(len(partition) for partition in self._partitions.values())
+        return {
+            "partitions": len(self._partitions),
+            "rows": rows,
+            "unflushed": rows - sum(partition.persisted for partition in self._partitions.values()),
+        }
@@ -0,0 +1,490 @@
+# asi_client.py
+"""
+Shared async client for the ASI Cloud chat-completions API.
+
+Agents used to call the API with the blocking requests.post(), which froze
+the whole uAgents event loop for every user while one LLM call was in
+flight. AsiClient awaits the call instead, over a pooled keep-alive
+connection, so concurrent sessions overlap their network waits.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import re
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+import aiohttp
+
+if TYPE_CHECKING:
+    from resilience import Resilience
+
+ASI_API_URL = "https://inference.asicloud.cudos.org/v1/chat/completions"
+ASI_MODEL = "asi1-mini"
+
+
+T = TypeVar("T")
+
+# Scheduler priority classes (lower runs first)
+PRIORITY_QUESTION = 0    # the candidate is waiting for the next question
+PRIORITY_EVALUATION = 1  # scoring can wait a little
+PRIORITY_SPECULATIVE = 2  # drafts nobody is waiting for yet; shed first
+
+
+class AsiError(Exception):
+    """An ASI call failed: network error, timeout, HTTP error or malformed response."""
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AsiOverloaded(AsiError):
+    """The scheduler shed the request (queue full or waited too long)."""
+
+
+class AsiMalformedResponse(AsiError):
+    """The endpoint answered, but the body couldn't be parsed; retrying won't help."""
+
+
+class AsiClient:
+    """
+    One pooled HTTP session per agent process, created lazily on first use
+    (aiohttp sessions must be created inside the running event loop).
+
+    `timeout` bounds a whole chat() call. A stream_chat() call may take
+    longer, as long as connecting and each wait for the next chunk take no
+    more than `timeout`.
+
+    Example:
+        asi = AsiClient(ASI_API_KEY)
+        question = await asi.chat("Ask me one interview question.", temperature=0.7)
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_url: str = ASI_API_URL,
+        model: str = ASI_MODEL,
+        timeout: float = 30.0,
+        max_connections: int = 32,
+    ):
+        self.api_key = api_key
+        self.api_url = api_url
+        self.model = model
+        self.timeout = timeout
+        self.max_connections = max_connections
+        # Streams have no overall cap, only per-read and connect timeouts
+        self._stream_timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is not None and not self._session.closed:
+            return self._session
+        async with self._session_lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+                self._session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                    headers={
+                        "Authorization": f"Bearer {self.api_key}",
+                        "Content-Type": "application/json",
+                    },
+                )
+        return self._session
+
+    @staticmethod
+    async def _http_error(response: aiohttp.ClientResponse) -> AsiError:
+        body = await response.text()
+        retry_after = None
+        try:
+            retry_after = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            pass
+        return AsiError(
+            f"ASI API returned HTTP {response.status}: {body[:200]}",
+            status=response.status,
+            retry_after=retry_after,
+        )
+
+    def _payload(self, prompt: str, temperature: float, model: Optional[str]) -> Dict[str, Any]:
+        return {
+            "model": model or self.model,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": temperature,
+        }
+
+    async def complete(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a raw chat-completions payload and return the decoded JSON body."""
+        session = await self._get_session()
+        try:
+            async with session.post(self.api_url, json=payload) as response:
+                if response.status >= 400:
+                    raise await self._http_error(response)
+                return await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise AsiError(f"ASI API request failed: {e!r}") from e
+        except ValueError as e:
+            raise AsiMalformedResponse(f"Malformed ASI response: {e!r}") from e
+
+    async def chat(self, prompt: str, temperature: float = 0.7, model: Optional[str] = None) -> str:
+        """Send a single user prompt and return the stripped reply text."""
+        result = await self.complete(self._payload(prompt, temperature, model))
+        try:
+            return result["choices"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError, AttributeError) as e:
+            raise AsiMalformedResponse(f"Unexpected ASI response shape: {e!r}") from e
+
+    async def stream_chat(
+        self, prompt: str, temperature: float = 0.7, model: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Like chat(), but yields the reply text as it is generated, consuming
+        the endpoint's server-sent events ("data: {...}" lines up to
+        "data: [DONE]"). A server that answers with plain JSON instead
+        yields the whole reply at once.
+        """
+        payload = self._payload(prompt, temperature, model)
+        payload["stream"] = True
+        session = await self._get_session()
+        try:
+            async with session.post(self.api_url, json=payload, timeout=self._stream_timeout) as response:
+                if response.status >= 400:
+                    raise await self._http_error(response)
+                if response.content_type == "application/json":
+                    result = await response.json()
+                    yield result["choices"][0]["message"]["content"]
+                    return
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        return
+                    choices = json.loads(data).get("choices") or [{}]
+                    delta = (choices[0].get("delta") or {}).get("content")
+                    if delta:
+                        yield delta
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise AsiError(f"ASI API request failed: {e!r}") from e
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            raise AsiMalformedResponse(f"Malformed ASI stream: {e!r}") from e
+
+    async def close(self) -> None:
+        """Close the pooled connections (call on agent shutdown)."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class StreamingJsonFields:
+    """
+    Pulls the top-level fields out of a JSON object while the model is still
+    writing it, e.g. the scores at the start of an evaluation before the
+    long "improved_answer" has arrived.
+
+    Anything before the first "{" (prose, a ```json fence) is skipped. A
+    field is reported once its value is complete; numbers and literals only
+    count as complete once the next character has arrived.
+
+    Example:
+        fields = StreamingJsonFields()
+        async for delta in asi.stream_chat(prompt):
+            for key, value in fields.feed(delta).items():
+                print("got", key, value)
+        fields.values  # everything parsed, even if the JSON was cut off later
+    """
+
+    _FIELD = re.compile(r'\s*,?\s*"((?:[^"\\]|\\.)*)"\s*:\s*')
+    _DECODER = json.JSONDecoder()
+
+    def __init__(self):
+        self.text = ""
+        self.values: Dict[str, Any] = {}
+        self._pos: Optional[int] = None
+
+    def feed(self, delta: str) -> Dict[str, Any]:
+        """Add generated text; returns the fields completed by it."""
+        self.text += delta
+        completed: Dict[str, Any] = {}
+        if self._pos is None:
+            start = self.text.find("{")
+            if start < 0:
+                return completed
+            self._pos = start + 1
+        while True:
+            match = self._FIELD.match(self.text, self._pos)
+            if match is None:
+                break
+            try:
+                value, end = self._DECODER.raw_decode(self.text, match.end())
+            except ValueError:
+                break
+            if end == len(self.text) and not isinstance(value, (str, list, dict)):
+                # "4" might still become "45"
+                break
+            key = json.loads(f'"{match.group(1)}"')
+            self.values[key] = completed[key] = value
+            self._pos = end
+        return completed
+
+
+class TokenBucket:
+    """Requests-per-second limiter: `rate` tokens per second, up to `burst` saved up."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for a while (e.g. after an HTTP 429)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def take(self) -> None:
+        # The lock makes waiters take tokens in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+
+class AsiScheduler:
+    """
+    Bounded-concurrency front end for AsiClient.
+
+    At most `max_in_flight` calls run at once and calls start at no more
+    than `rate` per second. Waiting calls are served by priority class
+    (PRIORITY_QUESTION before PRIORITY_EVALUATION), oldest first. When
+    `max_queue` calls are already waiting, a new call displaces the newest
+    waiter of a lower priority class or, if there is none, is rejected with
+    AsiOverloaded so the caller can fall back right away instead of timing
+    out. An HTTP 429 pauses the token bucket for its Retry-After.
+
+    With a `resilience` policy, each call that gets a slot also gets
+    adaptive timeouts, retries, circuit breaking and (optionally) hedging;
+    retries and hedges take rate tokens too, and a hedge only goes out if
+    it can have a slot of its own.
+
+    Example:
+        asi = AsiScheduler(AsiClient(ASI_API_KEY), max_in_flight=8, rate=5.0)
+        text = await asi.chat(prompt, priority=PRIORITY_QUESTION, max_wait=5.0)
+        asi.metrics()  # queue depth, in-flight, wait times, shed counts
+    """
+
+    def __init__(
+        self,
+        client: AsiClient,
+        max_in_flight: int = 8,
+        max_queue: int = 64,
+        rate: float = 5.0,
+        burst: int = 10,
+        resilience: Optional["Resilience"] = None,
+    ):
+        self.client = client
+        self.resilience = resilience
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self._bucket = TokenBucket(rate, burst)
+        self._in_flight = 0
+        # Heap of (priority, sequence, future); a waiter's future resolves when it gets a slot
+        self._waiting: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._queued: Dict[int, int] = {}
+        self._shed: Dict[int, int] = {}
+        self._completed: Dict[int, int] = {}
+        self._waits: Dict[int, Deque[float]] = {}
+
+    def _count(self, counter: Dict[int, int], priority: int, delta: int = 1) -> None:
+        counter[priority] = counter.get(priority, 0) + delta
+
+    def _shed_request(self, priority: int) -> AsiOverloaded:
+        self._count(self._shed, priority)
+        return AsiOverloaded(f"ASI scheduler is full ({self._in_flight} in flight, {len(self._waiting)} queued)")
+
+    def _make_room(self, priority: int) -> None:
+        """Evict the newest lower-priority waiter, or raise AsiOverloaded."""
+        victim = None
+        for entry in self._waiting:
+            if not entry[2].done() and entry[0] > priority and (victim is None or entry[:2] > victim[:2]):
+                victim = entry
+        if victim is None:
+            raise self._shed_request(priority)
+        self._count(self._queued, victim[0], -1)
+        victim[2].set_exception(self._shed_request(victim[0]))
+
+    def _try_acquire(self) -> bool:
+        """Take a free slot if nobody is waiting for one."""
+        if self._in_flight < self.max_in_flight and not any(not f.done() for _, _, f in self._waiting):
+            self._in_flight += 1
+            return True
+        return False
+
+    async def _acquire(self, priority: int, max_wait: Optional[float]) -> None:
+        if self._try_acquire():
+            return
+        if sum(self._queued.values()) >= self.max_queue:
+            self._make_room(priority)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._sequence), future))
+        self._count(self._queued, priority)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), max_wait)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self._count(self._queued, priority, -1)
+                raise self._shed_request(priority) from None
+            if future.exception() is not None:
+                raise future.exception()
+            # The slot was handed over just as the wait ran out - keep it
+        except asyncio.CancelledError:
+            if not future.done():
+                future.cancel()
+                self._count(self._queued, priority, -1)
+            elif future.exception() is None:
+                self._release()
+            raise
+
+    async def _paused_on_429(self, call: Callable[[], Awaitable[T]]) -> T:
+        try:
+            return await call()
+        except AsiError as e:
+            if e.status == 429:
+                self._bucket.pause(e.retry_after or 1.0)
+            raise
+
+    async def _stream_paused_on_429(self, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+        try:
+            async for delta in chunks:
+                yield delta
+        except AsiError as e:
+            if e.status == 429:
+                self._bucket.pause(e.retry_after or 1.0)
+            raise
+
+    def _release(self) -> None:
+        """Hand the slot to the best waiter, or free it."""
+        while self._waiting:
+            priority, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                self._count(self._queued, priority, -1)
+                future.set_result(None)
+                return
+        self._in_flight -= 1
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        priority: int = PRIORITY_QUESTION,
+        max_wait: Optional[float] = None,
+    ) -> T:
+        """Run `call()` once a slot and a rate token are available."""
+        queued_at = time.monotonic()
+        await self._acquire(priority, max_wait)
+        try:
+            await self._bucket.take()
+            self._waits.setdefault(priority, deque(maxlen=512)).append(time.monotonic() - queued_at)
+            if self.resilience is None:
+                return await self._paused_on_429(call)
+            return await self.resilience.call(
+                lambda: self._paused_on_429(call),
+                pace=self._bucket.take,
+                try_acquire=self._try_acquire,
+                release=self._release,
+            )
+        finally:
+            self._count(self._completed, priority)
+            self._release()
+
+    async def chat(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        model: Optional[str] = None,
+        priority: int = PRIORITY_QUESTION,
+        max_wait: Optional[float] = None,
+    ) -> str:
+        """Scheduled AsiClient.chat()."""
+        return await self.run(lambda: self.client.chat(prompt, temperature, model), priority, max_wait)
+
+    async def stream_chat(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        model: Optional[str] = None,
+        priority: int = PRIORITY_QUESTION,
+        max_wait: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """Scheduled AsiClient.stream_chat(); the slot is held until the stream ends."""
+        queued_at = time.monotonic()
+        await self._acquire(priority, max_wait)
+        try:
+            await self._bucket.take()
+            self._waits.setdefault(priority, deque(maxlen=512)).append(time.monotonic() - queued_at)
+
+            def open_stream() -> AsyncIterator[str]:
+                return self._stream_paused_on_429(self.client.stream_chat(prompt, temperature, model))
+
+            if self.resilience is None:
+                chunks = open_stream()
+            else:
+                chunks = self.resilience.stream(open_stream, pace=self._bucket.take)
+            try:
+                async for delta in chunks:
+                    yield delta
+            finally:
+                await chunks.aclose()
+        finally:
+            self._count(self._completed, priority)
+            self._release()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, in-flight count and per-priority wait times (seconds) and counters."""
+        classes = {}
+        for priority in sorted(set(self._queued) | set(self._waits) | set(self._shed)):
+            waits = sorted(self._waits.get(priority, ()))
+            classes[priority] = {
+                "queued": self._queued.get(priority, 0),
+                "completed": self._completed.get(priority, 0),
+                "shed": self._shed.get(priority, 0),
+                "wait_mean": sum(waits) / len(waits) if waits else 0.0,
+                "wait_p95": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                "wait_max": waits[-1] if waits else 0.0,
+            }
+        metrics = {
+            "in_flight": self._in_flight,
+            "queued": sum(self._queued.values()),
+            "priorities": classes,
+        }
+        if self.resilience is not None:
+            metrics["resilience"] = self.resilience.metrics()
+        return metrics
+
+    async def close(self) -> None:
+        await self.client.close()
@@ -1,10 +1,17 @@
-from typing import Optional
-import requests
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional, Set, Tuple
+import asyncio
+import functools
 import json
 import re
 
 from uagents import Agent, Context, Model, Protocol
 
+from asi_client import AsiClient, AsiError, AsiScheduler, StreamingJsonFields, PRIORITY_EVALUATION
+from resilience import Resilience
+from response_cache import ResponseCache, normalize_prompt
+from heuristic_scorer import HeuristicScore, score_answer
+
 # -------------------------------
 # Message models for evaluation
 # -------------------------------
@@ -15,6 +22,9 @@ class EvaluationRequest(Model):
     persona: Optional[str] = None
     role: Optional[str] = None
     user_address: str  # address of the original chat user
+    # Correlation fields, echoed back unchanged
+    request_id: Optional[str] = None
+    session_key: Optional[str] = None
 
 
 class EvaluationResponse(Model):
@@ -23,6 +33,8 @@ class EvaluationResponse(Model):
     persona: Optional[str] = None
     role: Optional[str] = None
     user_address: str
+    request_id: Optional[str] = None
+    session_key: Optional[str] = None
 
     clarity: int
     specificity: int
@@ -32,6 +44,10 @@ class EvaluationResponse(Model):
     feedback: str
     improved_answer: str
 
+    # Scores sent ahead of the improved answer, which follows in a second
+    # (full) response with the same request_id
+    partial: bool = False
+
 
 # -------------------------------
 # Protocol + agent setup
@@ -53,21 +69,68 @@ ASI_API_KEY = "sk-FVoN14UREfvuUPIZugEWKiJGuxMROZ18Ahz4MT6L8TE"
 ASI_API_URL = "https://inference.asicloud.cudos.org/v1/chat/completions"
 ASI_MODEL = "asi1-mini"
 
+# Scoring is not latency-critical, so evaluations queue (up to ASI_MAX_QUEUE)
+# rather than fail fast, and are shed explicitly when the queue is full.
+ASI_MAX_IN_FLIGHT = 4
+ASI_MAX_QUEUE = 128
+ASI_RATE_PER_SECOND = 3.0
+ASI_BURST = 6
+
+# Evaluations can afford a few retries but not the token cost of hedging
+ASI_RETRY_ATTEMPTS = 3
+ASI_HEDGE_REQUESTS = False
+
+# Pooled, non-blocking client so one slow evaluation doesn't stall the others,
+# behind a scheduler that bounds concurrency and request rate
+asi = AsiScheduler(
+    AsiClient(ASI_API_KEY, ASI_API_URL, ASI_MODEL),
+    max_in_flight=ASI_MAX_IN_FLIGHT,
+    max_queue=ASI_MAX_QUEUE,
+    rate=ASI_RATE_PER_SECOND,
+    burst=ASI_BURST,
+    resilience=Resilience(retry_attempts=ASI_RETRY_ATTEMPTS, hedge=ASI_HEDGE_REQUESTS),
+)
+
+# Evaluations of identical answers (and, via the similarity tier, of nearly
+# identical answers to the same question) are served from disk
+ASI_CACHE_PATH = "evaluator_cache.sqlite3"
+ASI_CACHE_TTL = 7 * 24 * 3600.0
+ASI_CACHE_MAX_ENTRIES = 20_000
+ASI_CACHE_SIMILARITY = 0.92
+
+response_cache = ResponseCache(
+    ASI_CACHE_PATH,
+    ttl=ASI_CACHE_TTL,
+    max_entries=ASI_CACHE_MAX_ENTRIES,
+    similarity_threshold=ASI_CACHE_SIMILARITY,
+)
+
+# How answers are scored:
+#   "asi"    - every answer is evaluated by ASI
+#   "tiered" - the local heuristic scorer handles clearly strong or clearly
+#              weak answers; only borderline ones go to ASI. Locally scored
+#              answers come without an improved example answer; the
+#              interviewer has ASI write those when it builds the report
+#   "local"  - never call ASI
+EVAL_MODE = "tiered"
+
 
 # -------------------------------
 # ASI Cloud evaluator
 # -------------------------------
 
-def evaluate_with_asi(req: EvaluationRequest) -> EvaluationResponse:
-    """
-    Evaluate interview answer using ASI Cloud API.
-    Returns structured evaluation with scores and feedback.
-    """
-    # Build the evaluation prompt
-    role_context = f" for a {req.role} position" if req.role else ""
-    persona_context = f" The interviewer style is {req.persona}." if req.persona else ""
-    
-    prompt = f"""You are an expert interview coach evaluating a candidate's answer to an interview question.
+EVALUATION_CRITERIA = """Evaluate {what} on three dimensions (score each 1-5):
+1. Clarity: How clear, well-structured, and easy to understand is the answer?
+2. Specificity: How many concrete examples, numbers, metrics, tools, or specific details are included?
+3. Confidence: How confident, assertive, and decisive does the candidate sound?"""
+
+
+def _has_scores(values: dict) -> bool:
+    return all(key in values for key in ("clarity", "specificity", "confidence"))
+
+
+def build_evaluation_prompt(req: EvaluationRequest) -> str:
+    return f"""You are an expert interview coach evaluating a candidate's answer to an interview question.
 
 Context:
 - Role: {req.role or 'General'}
@@ -77,10 +140,7 @@ Question: {req.question}
 
 Candidate's answer: {req.answer}
 
-Evaluate this answer on three dimensions (score each 1-5):
-1. Clarity: How clear, well-structured, and easy to understand is the answer?
-2. Specificity: How many concrete examples, numbers, metrics, tools, or specific details are included?
-3. Confidence: How confident, assertive, and decisive does the candidate sound?
+{EVALUATION_CRITERIA.format(what="this answer")}
 
 Provide your evaluation in this exact JSON format:
 {{
@@ -93,72 +153,17 @@ Provide your evaluation in this exact JSON format:
 
 Be direct and honest in your evaluation. If the answer is generic or lacks specifics, point that out clearly."""
 
-    try:
-        # Call ASI Cloud API
-        payload = {
-            "model": ASI_MODEL,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.3,  # Lower temperature for more consistent evaluation
-        }
-        
-        headers = {
-            "Authorization": f"Bearer {ASI_API_KEY}",
-            "Content-Type": "application/json",
-        }
-        
-        response = requests.post(ASI_API_URL, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        result = response.json()
-        ai_response = result["choices"][0]["message"]["content"].strip()
-        
-        # Parse the JSON response from ASI
-        # Try to extract JSON from the response (it might have markdown code blocks)
-        json_match = re.search(r'\{[\s\S]*\}', ai_response)
-        if json_match:
-            json_str = json_match.group(0)
-            eval_data = json.loads(json_str)
-        else:
-            # Fallback: try to parse the whole response as JSON
-            eval_data = json.loads(ai_response)
-        
-        # Extract scores and feedback
-        clarity = int(eval_data.get("clarity", 3))
-        specificity = int(eval_data.get("specificity", 2))
-        confidence = int(eval_data.get("confidence", 3))
-        feedback = eval_data.get("feedback", "No specific feedback provided.")
-        improved_answer = eval_data.get("improved_answer", req.answer)
-        
-        # Clamp scores to valid range
-        clarity = max(1, min(5, clarity))
-        specificity = max(1, min(5, specificity))
-        confidence = max(1, min(5, confidence))
-        
-        # Calculate overall score
-        overall = round((clarity + specificity + confidence) / 3.0, 2)
-        
-    except requests.exceptions.RequestException as e:
-        # API call failed - fallback to basic evaluation
-        print(f"ASI API error: {e}")
-        clarity = 3
-        specificity = 2
-        confidence = 3
-        overall = round((clarity + specificity + confidence) / 3.0, 2)
-        feedback = "Unable to get detailed evaluation. Please ensure your answer includes specific examples and concrete details."
-        improved_answer = f"{req.answer}\n\n(Add specific examples with numbers, tools, and measurable outcomes to improve this answer.)"
-        
-    except (json.JSONDecodeError, KeyError, ValueError) as e:
-        # JSON parsing failed - fallback to basic evaluation
-        print(f"Error parsing ASI response: {e}")
-        print(f"Raw response: {ai_response if 'ai_response' in locals() else 'No response'}")
-        clarity = 3
-        specificity = 2
-        confidence = 3
-        overall = round((clarity + specificity + confidence) / 3.0, 2)
-        feedback = "Evaluation completed. Focus on adding specific examples and concrete details to your answers."
-        improved_answer = f"{req.answer}\n\n(Add specific examples with numbers, tools, and measurable outcomes to improve this answer.)"
+
+def cache_namespace(req: EvaluationRequest) -> str:
+    """Near-duplicate answers only match answers to the same question."""
+    return f"{req.role or ''}\0{req.persona or ''}\0{normalize_prompt(req.question)}"
+
+
+def response_from_scores(req: EvaluationRequest, eval_data: dict, partial: bool = False) -> EvaluationResponse:
+    """Build the response from parsed scores, clamping them to 1-5."""
+    clarity = max(1, min(5, int(eval_data.get("clarity", 3))))
+    specificity = max(1, min(5, int(eval_data.get("specificity", 2))))
+    confidence = max(1, min(5, int(eval_data.get("confidence", 3))))
     
     return EvaluationResponse(
         question=req.question,
@@ -166,15 +171,293 @@ Be direct and honest in your evaluation. If the answer is generic or lacks speci
         persona=req.persona,
         role=req.role,
         user_address=req.user_address,
+        request_id=req.request_id,
+        session_key=req.session_key,
         clarity=clarity,
         specificity=specificity,
         confidence=confidence,
-        overall_score=overall,
-        feedback=feedback,
-        improved_answer=improved_answer,
+        overall_score=round((clarity + specificity + confidence) / 3.0, 2),
+        feedback=eval_data.get("feedback", "No specific feedback provided."),
+        improved_answer=eval_data.get("improved_answer", ""),
+        partial=partial,
+    )
+
+
+def local_evaluation(req: EvaluationRequest, score: Optional[HeuristicScore] = None) -> EvaluationResponse:
+    """Evaluation from the local heuristic scorer: no network, a few milliseconds."""
+    score = score or score_answer(req.answer)
+    return response_from_scores(
+        req,
+        {**score.scores(), "feedback": score.feedback(), "improved_answer": score.improved_answer},
+    )
+
+
+def cached_evaluation(req: EvaluationRequest) -> Optional[EvaluationResponse]:
+    cached = response_cache.get(
+        build_evaluation_prompt(req), ASI_MODEL, 0.3,
+        namespace=cache_namespace(req), similar_text=req.answer,
+    )
+    return response_from_scores(req, json.loads(cached)) if cached is not None else None
+
+
+def cache_evaluation(req: EvaluationRequest, eval_data: dict) -> None:
+    response_cache.put(
+        build_evaluation_prompt(req), ASI_MODEL, 0.3, json.dumps(eval_data),
+        namespace=cache_namespace(req), similar_text=req.answer,
     )
 
 
+ScoresCallback = Callable[[EvaluationResponse], Awaitable[None]]
+
+
+async def evaluate_with_asi(req: EvaluationRequest, on_scores: Optional[ScoresCallback] = None) -> EvaluationResponse:
+    """
+    Evaluate interview answer using ASI Cloud API.
+    Returns structured evaluation with scores and feedback.
+
+    If given, `on_scores` is called with a partial response as soon as the
+    scores have streamed in, while the long improved_answer is still being
+    generated.
+    """
+    cached = cached_evaluation(req)
+    if cached is not None:
+        return cached
+
+    # Fields are parsed as the evaluation streams in, so the scores (emitted
+    # first) are kept even if the long improved_answer is cut off or malformed
+    fields = StreamingJsonFields()
+    scores_sent = False
+    try:
+        # Call ASI Cloud API (lower temperature for more consistent evaluation)
+        try:
+            async for delta in asi.stream_chat(
+                build_evaluation_prompt(req), temperature=0.3, priority=PRIORITY_EVALUATION
+            ):
+                fields.feed(delta)
+                if on_scores is not None and not scores_sent and _has_scores(fields.values):
+                    scores_sent = True
+                    await on_scores(response_from_scores(req, fields.values, partial=True))
+        except AsiError:
+            if not _has_scores(fields.values):
+                raise
+            print(f"ASI stream broke after the scores arrived; keeping partial evaluation: {fields.values}")
+        ai_response = fields.text.strip()
+        
+        if _has_scores(fields.values):
+            eval_data = fields.values
+        else:
+            # Parse the JSON response from ASI
+            # Try to extract JSON from the response (it might have markdown code blocks)
+            json_match = re.search(r'\{[\s\S]*\}', ai_response)
+            if json_match:
+                json_str = json_match.group(0)
+                eval_data = json.loads(json_str)
+            else:
+                # Fallback: try to parse the whole response as JSON
+                eval_data = json.loads(ai_response)
+        
+        result = response_from_scores(req, eval_data)
+        
+    except AsiError as e:
+        # API call failed - fall back to the local scorer
+        print(f"ASI API error: {e}")
+        return local_evaluation(req)
+        
+    except (json.JSONDecodeError, AttributeError, KeyError, TypeError, ValueError) as e:
+        # JSON parsing failed - fall back to the local scorer
+        print(f"Error parsing ASI response: {e}")
+        print(f"Raw response: {ai_response if 'ai_response' in locals() else 'No response'}")
+        return local_evaluation(req)
+    
+    if _has_scores(eval_data):
+        cache_evaluation(req, eval_data)
+    return result
+
+
+# -------------------------------
+# Batched evaluation
+# -------------------------------
+
+# Requests arriving within EVAL_BATCH_WINDOW seconds of each other are scored
+# together in one prompt (up to EVAL_BATCH_MAX_SIZE), so the instructions are
+# sent once per batch rather than once per answer
+EVAL_BATCH_WINDOW = 0.25
+EVAL_BATCH_MAX_SIZE = 8
+
+
+def build_batch_evaluation_prompt(reqs: List[EvaluationRequest]) -> str:
+    answers = "\n\n".join(
+        f"""### Answer {i}
+- Role: {req.role or 'General'}
+- Interviewer style: {req.persona or 'Standard'}
+Question: {req.question}
+Candidate's answer: {req.answer}"""
+        for i, req in enumerate(reqs, 1)
+    )
+    return f"""You are an expert interview coach evaluating {len(reqs)} candidates' answers to interview questions. Evaluate each answer independently of the others.
+
+{answers}
+
+{EVALUATION_CRITERIA.format(what="each answer")}
+
+Provide your evaluation as a JSON array with exactly one object per answer, in this exact format:
+[
+    {{
+        "id": <answer number>,
+        "clarity": <integer 1-5>,
+        "specificity": <integer 1-5>,
+        "confidence": <integer 1-5>,
+        "feedback": "<2-3 sentences of constructive feedback focusing on what to improve>",
+        "improved_answer": "<A complete improved version of the answer with specific examples, numbers, and concrete details>"
+    }}
+]
+
+Be direct and honest in your evaluation. If an answer is generic or lacks specifics, point that out clearly."""
+
+
+async def evaluate_batch_with_asi(
+    reqs: List[EvaluationRequest],
+    on_scores: Optional[Callable[[int, EvaluationResponse], Awaitable[None]]] = None,
+) -> List[EvaluationResponse]:
+    """
+    Evaluate several answers with one ASI call, returning responses in the
+    order of `reqs`. Answers the local scorer settles (see EVAL_MODE) and
+    cached answers are skipped, and any answer the batch reply doesn't
+    cover is evaluated on its own, streamed: `on_scores(i, partial)` is
+    then called once the scores of reqs[i] are in.
+    """
+    results: List[Optional[EvaluationResponse]] = []
+    for req in reqs:
+        result = None
+        if EVAL_MODE != "asi":
+            score = score_answer(req.answer)
+            if EVAL_MODE == "local" or not score.borderline:
+                result = local_evaluation(req, score)
+        results.append(result or cached_evaluation(req))
+    todo = [i for i, result in enumerate(results) if result is None]
+
+    if len(todo) > 1:
+        batch = [reqs[i] for i in todo]
+        try:
+            ai_response = await asi.chat(
+                build_batch_evaluation_prompt(batch), temperature=0.3, priority=PRIORITY_EVALUATION
+            )
+            json_match = re.search(r'\[[\s\S]*\]', ai_response)
+            items = json.loads(json_match.group(0) if json_match else ai_response)
+            for item in items:
+                try:
+                    position = int(item["id"]) - 1
+                    if 0 <= position < len(batch) and results[todo[position]] is None and _has_scores(item):
+                        results[todo[position]] = response_from_scores(batch[position], item)
+                        cache_evaluation(batch[position], item)
+                except (KeyError, TypeError, ValueError) as e:
+                    print(f"Skipping malformed batch evaluation item {item!r}: {e}")
+        except AsiError as e:
+            print(f"ASI API error evaluating a batch of {len(batch)}: {e}")
+        except (json.JSONDecodeError, TypeError, ValueError) as e:
+            print(f"Error parsing ASI batch response: {e}")
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        singles = await asyncio.gather(*(
+            evaluate_with_asi(reqs[i], None if on_scores is None else functools.partial(on_scores, i))
+            for i in missing
+        ))
+        for i, result in zip(missing, singles):
+            results[i] = result
+    return results
+
+
+class EvaluationBatcher:
+    """
+    Collects evaluation requests for up to `window` seconds (or until
+    `max_size` are waiting), scores them together, and sends each
+    EvaluationResponse back to the agent that asked for it.
+
+    Message handlers only enqueue, so the agent keeps accepting requests
+    while a batch is being scored. Responses are sent with the agent-level
+    context given to start() rather than the handlers' contexts: those
+    belong to the message they were built for, and a batch is sent after
+    its handlers have returned.
+    """
+
+    def __init__(self, window: float = EVAL_BATCH_WINDOW, max_size: int = EVAL_BATCH_MAX_SIZE):
+        self.window = window
+        self.max_size = max_size
+        self._ctx: Optional[Context] = None
+        self._pending: List[Tuple[str, EvaluationRequest]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Task] = set()
+        self._sizes: Deque[int] = deque(maxlen=512)
+
+    def start(self, ctx: Context) -> None:
+        """Set the context responses are sent with (the startup handler's)."""
+        self._ctx = ctx
+
+    def submit(self, sender: str, req: EvaluationRequest) -> None:
+        if self._ctx is None:
+            raise RuntimeError("EvaluationBatcher.start() must be called before submit()")
+        self._pending.append((sender, req))
+        if len(self._pending) >= self.max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+    def flush(self) -> None:
+        """Start scoring everything that is waiting."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self._sizes.append(len(batch))
+        task = asyncio.ensure_future(self._evaluate(batch))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _evaluate(self, batch: List[Tuple[str, EvaluationRequest]]) -> None:
+        async def send_scores(i: int, partial: EvaluationResponse) -> None:
+            await self._send(batch[i][0], partial)
+
+        try:
+            results = await evaluate_batch_with_asi([req for _, req in batch], send_scores)
+        except Exception as e:
+            print(f"Batch evaluation failed: {e!r}")
+            results = [local_evaluation(req) for _, req in batch]
+        for (sender, _), result in zip(batch, results):
+            await self._send(sender, result)
+
+    async def _send(self, sender: str, result: EvaluationResponse) -> None:
+        ctx = self._ctx
+        ctx.logger.info(
+            f"Sending {'partial ' if result.partial else ''}EvaluationResponse to {sender}: "
+            f"overall={result.overall_score}, clarity={result.clarity}, "
+            f"specificity={result.specificity}, confidence={result.confidence}"
+        )
+        try:
+            await ctx.send(sender, result)
+        except Exception as e:
+            ctx.logger.error(f"Failed to send EvaluationResponse to {sender}: {e}")
+
+    async def drain(self) -> None:
+        """Score anything still waiting and wait for in-flight batches."""
+        self.flush()
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+
+    def metrics(self) -> dict:
+        sizes = list(self._sizes)
+        return {
+            "waiting": len(self._pending),
+            "in_flight_batches": len(self._batches),
+            "mean_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+        }
+
+
+batcher = EvaluationBatcher()
+
+
 # -------------------------------
 # Protocol handler
 # -------------------------------
@@ -183,22 +466,31 @@ Be direct and honest in your evaluation. If the answer is generic or lacks speci
 async def handle_evaluation(ctx: Context, sender: str, msg: EvaluationRequest):
     ctx.logger.info(f"Received EvaluationRequest from {sender}: {msg}")
 
-    result = evaluate_with_asi(msg)
-
-    ctx.logger.info(
-        f"Sending EvaluationResponse to {sender}: "
-        f"overall={result.overall_score}, clarity={result.clarity}, "
-        f"specificity={result.specificity}, confidence={result.confidence}"
-    )
-
-    await ctx.send(sender, result)
+    # Scored with whatever else arrives in the next EVAL_BATCH_WINDOW seconds;
+    # the batcher sends the EvaluationResponse
+    batcher.submit(sender, msg)
 
 
 @agent.on_event("startup")
 async def on_start(ctx: Context):
+    batcher.start(ctx)
     ctx.logger.info("Evaluator agent started and ready to receive EvaluationRequest")
 
 
+@agent.on_interval(period=60.0)
+async def log_asi_metrics(ctx: Context):
+    ctx.logger.info(f"ASI scheduler: {asi.metrics()}")
+    ctx.logger.info(f"ASI response cache: {response_cache.stats()}")
+    ctx.logger.info(f"Evaluation batches: {batcher.metrics()}")
+
+
+@agent.on_event("shutdown")
+async def on_shutdown(ctx: Context):
+    await batcher.drain()
+    await asi.close()
+    response_cache.close()
+
+
 agent.include(eval_proto, publish_manifest=True)
 
 if __name__ == "__main__":
@@ -0,0 +1,222 @@
+# heuristic_scorer.py
+"""
+Deterministic, local scoring of interview answers.
+
+Scores the same three dimensions as the ASI evaluator (clarity,
+specificity, confidence; 1-5) from surface features of the answer:
+numbers and metrics, tool names, STAR structure (Situation, Task, Action,
+Result), hedging phrases and sentence-length statistics. No network, no
+model, a few milliseconds per answer.
+
+Used by the evaluator as a fast path (answers that are clearly strong or
+clearly weak are scored locally; borderline ones go to ASI) and as the
+fallback when ASI can't be reached. It can't rewrite an answer, so its
+evaluations have no improved answer (an empty string); the suggestions
+go in the feedback instead.
+"""
+
+from dataclasses import dataclass, field
+from typing import List
+import re
+import statistics
+
+# Overall scores in this range are "borderline": the features don't
+# separate a decent answer from a weak one, so a caller should ask ASI
+BORDERLINE_LOW = 2.5
+BORDERLINE_HIGH = 3.75
+
+_WORD = re.compile(r"[A-Za-z0-9][A-Za-z0-9+#'./-]*")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+_NUMBER = re.compile(r"(?<![A-Za-z])[$£€]?\d[\d,]*(?:\.\d+)?")
+_METRIC = re.compile(
+    r"[$£€]\s?\d[\d,]*(?:\.\d+)?\s*[kmb]?\b"
+    r"|\d[\d,]*(?:\.\d+)?\s*(?:%|percent\b|x\b|ms\b|seconds?\b|minutes?\b|hours?\b|days?\b|weeks?\b|months?\b"
+    r"|years?\b|users?\b|customers?\b|clients?\b|people\b|engineers?\b|developers?\b|members?\b|requests?\b"
+    r"|k\b|million\b|billion\b|thousand\b)",
+    re.IGNORECASE,
+)
+
+TOOLS = frozenset(
+    """
+    python java javascript typescript go golang rust c++ c# ruby php kotlin swift scala sql nosql
+    postgres postgresql mysql sqlite mongodb redis kafka rabbitmq elasticsearch spark hadoop airflow
+    snowflake dbt tableau excel powerbi aws azure gcp docker kubernetes terraform ansible jenkins
+    github gitlab git jira confluence linux bash react angular vue node.js nodejs django flask fastapi
+    spring graphql rest grpc pandas numpy pytorch tensorflow scikit-learn figma salesforce slack
+    ci/cd devops agile scrum kanban okrs kpis a/b api apis microservices
+    """.split()
+)
+
+_STAR_MARKERS = {
+    "situation": re.compile(
+        r"\b(?:when i was|at my (?:last|previous|current)|in my (?:last|previous|current) (?:role|job|team|company)"
+        r"|the situation|we were facing|we had a problem|there was a|the project)\b",
+        re.IGNORECASE,
+    ),
+    "task": re.compile(
+        r"\b(?:my (?:role|task|job|goal|responsibility) was|i was (?:responsible|asked|tasked)|(?:needed|had) to"
+        r"|the goal was|the challenge was)\b",
+        re.IGNORECASE,
+    ),
+    "action": re.compile(
+        r"\bi (?:built|led|implemented|designed|created|wrote|developed|organi[sz]ed|introduced|decided|set up"
+        r"|migrated|automated|refactored|proposed|analy[sz]ed|negotiated|coordinated|mentored|launched|fixed"
+        r"|started|drove|owned|ran)\b",
+        re.IGNORECASE,
+    ),
+    "result": re.compile(
+        r"\b(?:as a result|the result|resulted in|which (?:led|meant|cut|saved)|(?:reduced|increased|improved"
+        r"|saved|cut|grew|doubled|halved) (?:the |our |by )?|in the end|outcome|we delivered|we shipped)",
+        re.IGNORECASE,
+    ),
+}
+
+_HEDGES = re.compile(
+    r"\b(?:i think|i guess|i suppose|maybe|perhaps|probably|possibly|kind of|sort of|not sure|might"
+    r"|hopefully|somewhat|i feel like|i'm not|i am not|i don't know|um+|uh+|a bit)\b",
+    re.IGNORECASE,
+)
+_ASSERTIVE = re.compile(
+    r"\b(?:i led|i decided|i delivered|i owned|i own|i built|i achieved|i'm confident|i am confident"
+    r"|definitely|certainly|i made sure|i took ownership|i'm proud|i am proud)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class AnswerFeatures:
+    word_count: int
+    sentence_count: int
+    mean_sentence_words: float
+    sentence_words_stdev: float
+    numbers: int
+    metrics: int
+    tools: List[str]
+    star: List[str]
+    hedges: int
+    assertive: int
+
+    @property
+    def hedge_ratio(self) -> float:
+        """Hedging phrases per sentence."""
+        return self.hedges / max(1, self.sentence_count)
+
+
+@dataclass
+class HeuristicScore:
+    clarity: float
+    specificity: float
+    confidence: float
+    features: AnswerFeatures
+    suggestions: List[str] = field(default_factory=list)
+
+    @property
+    def overall(self) -> float:
+        return round((self.clarity + self.specificity + self.confidence) / 3.0, 2)
+
+    @property
+    def borderline(self) -> bool:
+        return BORDERLINE_LOW <= self.overall <= BORDERLINE_HIGH
+
+    def scores(self) -> dict:
+        """Integer 1-5 scores, in the shape of an ASI evaluation."""
+        return {
+            "clarity": _to_score(self.clarity),
+            "specificity": _to_score(self.specificity),
+            "confidence": _to_score(self.confidence),
+        }
+
+    def feedback(self) -> str:
+        if not self.suggestions:
+            return "Strong answer: clear, specific and confident. Keep using concrete examples and measurable outcomes."
+        return " ".join(self.suggestions[:3])
+
+    @property
+    def improved_answer(self) -> str:
+        """Not available from surface features: always empty (written by ASI for the final report)."""
+        return ""
+
+
+def _to_score(raw: float) -> int:
+    return max(1, min(5, int(raw + 0.5)))
+
+
+def extract_features(answer: str) -> AnswerFeatures:
+    words = _WORD.findall(answer)
+    sentences = [s for s in _SENTENCE_END.split(answer.strip()) if _WORD.search(s)]
+    lengths = [len(_WORD.findall(s)) for s in sentences] or [0]
+    lowered = [w.lower().rstrip(".,") for w in words]
+    return AnswerFeatures(
+        word_count=len(words),
+        sentence_count=len(sentences),
+        mean_sentence_words=statistics.fmean(lengths),
+        sentence_words_stdev=statistics.pstdev(lengths),
+        numbers=len(_NUMBER.findall(answer)),
+        metrics=len(_METRIC.findall(answer)),
+        tools=sorted({w for w in lowered if w in TOOLS}),
+        star=[part for part, marker in _STAR_MARKERS.items() if marker.search(answer)],
+        hedges=len(_HEDGES.findall(answer)),
+        assertive=len(_ASSERTIVE.findall(answer)),
+    )
+
+
+def score_answer(answer: str) -> HeuristicScore:
+    """Score an answer on clarity, specificity and confidence (raw 1-5 floats)."""
+    f = extract_features(answer)
+    suggestions: List[str] = []
+
+    # Clarity: STAR structure, a sensible length, readable sentences
+    clarity = 1.5 + 1.5 * len(f.star) / len(_STAR_MARKERS)
+    if 40 <= f.word_count <= 250:
+        clarity += 1.0
+    elif 20 <= f.word_count <= 400:
+        clarity += 0.5
+    else:
+        clarity -= 0.5
+    if 8 <= f.mean_sentence_words <= 25:
+        clarity += 1.0
+    elif 5 <= f.mean_sentence_words <= 35:
+        clarity += 0.5
+    if f.sentence_count > 2 and f.sentence_words_stdev > f.mean_sentence_words:
+        clarity -= 0.5
+
+    # Specificity: numbers, metrics, named tools, concrete actions and results
+    specificity = (
+        1.0
+        + min(1.5, 0.25 * f.numbers + 0.5 * f.metrics)
+        + min(1.0, 0.5 * len(f.tools))
+        + (0.75 if "action" in f.star else 0.0)
+        + (0.75 if "result" in f.star else 0.0)
+    )
+
+    # Confidence: ownership language up, hedging down
+    confidence = 3.0 + min(1.5, 0.5 * f.assertive) - min(2.0, 1.5 * f.hedge_ratio)
+    if "action" in f.star:
+        confidence += 0.5
+    if f.word_count < 15:
+        confidence -= 1.0
+
+    if f.word_count < 20:
+        suggestions.append("Your answer is very short; walk through a real example in more detail.")
+    missing = [part for part in _STAR_MARKERS if part not in f.star]
+    if missing:
+        suggestions.append(
+            f"Structure it with STAR - add the {', '.join(p.capitalize() for p in missing)} "
+            f"{'part' if len(missing) == 1 else 'parts'}."
+        )
+    if f.metrics == 0:
+        suggestions.append("Quantify your impact with numbers (percentages, time saved, users, team size).")
+    if not f.tools:
+        suggestions.append("Name the specific tools, technologies or methods you used.")
+    if f.hedge_ratio >= 0.5:
+        suggestions.append("Cut hedging phrases like 'I think' or 'maybe' and state what you did directly.")
+    if f.mean_sentence_words > 35:
+        suggestions.append("Break long sentences up so each makes one point.")
+
+    return HeuristicScore(
+        clarity=max(1.0, min(5.0, clarity)),
+        specificity=max(1.0, min(5.0, specificity)),
+        confidence=max(1.0, min(5.0, confidence)),
+        features=f,
+        suggestions=suggestions,
+    )
@@ -0,0 +1,337 @@
+# interview_history.py
+"""
+Per-user interview history with bounded memory.
+
+Replaces the INTERVIEW_HISTORY dict, which grew forever: every evaluated
+answer of every user stayed in memory for the life of the agent.
+
+- Records are __slots__ objects (no per-record dict).
+- Only the newest `max_records_per_user` records of each user stay in
+  memory, and users idle for `ttl` seconds or beyond `max_users` (least
+  recently used first) are evicted.
+- Every event is appended to a JSON-lines log on disk (if `log_path` is
+  set). An index of where each user's records start in the log is built
+  once at startup and kept up to date, so evicted users, older pages and
+  history from before a restart are read back with one seek per record,
+  and users the log has never seen cost no read at all.
+- Events made obsolete by a reset or a newer role/persona choice are
+  dropped by compacting the log once they make up over half of it.
+  Users idle for longer than `retention` seconds (if set) are dropped
+  from the log at the same time.
+"""
+
+from array import array
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterable, List, Optional
+import json
+import os
+import time
+
+
+class HistoryRecord:
+    """One answered question with its evaluation scores."""
+
+    __slots__ = ("question", "answer", "clarity", "specificity", "confidence", "overall_score", "timestamp")
+
+    def __init__(
+        self,
+        question: str,
+        answer: str,
+        clarity: int,
+        specificity: int,
+        confidence: int,
+        overall_score: float,
+        timestamp: float,
+    ):
+        self.question = question
+        self.answer = answer
+        self.clarity = clarity
+        self.specificity = specificity
+        self.confidence = confidence
+        self.overall_score = overall_score
+        self.timestamp = timestamp
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "question": self.question,
+            "answer": self.answer,
+            "clarity": self.clarity,
+            "specificity": self.specificity,
+            "confidence": self.confidence,
+            "overall_score": self.overall_score,
+            "timestamp": datetime.fromtimestamp(self.timestamp, timezone.utc).replace(tzinfo=None).isoformat(),
+        }
+
+
+class UserHistory:
+    __slots__ = ("role", "persona", "records", "total", "last_seen")
+
+    def __init__(self, max_records: int):
+        self.role: Optional[str] = None
+        self.persona: Optional[str] = None
+        # The newest records; `total` counts every record since the last reset
+        self.records: Deque[HistoryRecord] = deque(maxlen=max_records)
+        self.total = 0
+        self.last_seen = time.monotonic()
+
+
+class UserLogIndex:
+    """Where a user's current history is in the log."""
+
+    __slots__ = ("role", "persona", "offsets", "last_event")
+
+    def __init__(self):
+        self.role: Optional[str] = None
+        self.persona: Optional[str] = None
+        # Byte offsets of the user's "qa" lines since their last reset
+        self.offsets = array("q")
+        self.last_event = 0.0
+
+    def live_events(self) -> int:
+        """Lines of the log this user still needs."""
+        return len(self.offsets) + (self.role is not None) + (self.persona is not None)
+
+
+class InterviewHistoryStore:
+    """
+    Example:
+        history = InterviewHistoryStore("interview_history.jsonl")
+        history.set_role(user, "Junior Data Analyst")
+        history.append(user, question, answer, 4, 3, 4, 3.67)
+        history.page(user, offset=0, limit=20)
+    """
+
+    def __init__(
+        self,
+        log_path: Optional[str] = None,
+        max_users: int = 10_000,
+        max_records_per_user: int = 50,
+        ttl: Optional[float] = 24 * 3600.0,
+        retention: Optional[float] = None,
+        compact_min_bytes: int = 1 << 20,
+    ):
+        self.log_path = log_path
+        self.max_users = max_users
+        self.max_records_per_user = max_records_per_user
+        self.ttl = ttl
+        self.retention = retention
+        self.compact_min_bytes = compact_min_bytes
+        self._users: "OrderedDict[str, UserHistory]" = OrderedDict()
+        self._index: Dict[str, UserLogIndex] = {}
+        # Lines in the log, and how many of them are still needed
+        self._lines = 0
+        self._live = 0
+        self._size = 0
+        self._log = None
+        self._reader = None
+        if log_path is not None:
+            try:
+                self._open_log()
+            except OSError as e:
+                # e.g. a read-only filesystem: keep history in memory only
+                print(f"Interview history log at {log_path!r} unavailable ({e}); not spilling to disk")
+                self._log = self._reader = None
+
+    # -------------------------------
+    # Append-only log
+    # -------------------------------
+
+    def _open_log(self) -> None:
+        """Open the log and index it (one pass, at startup and after compaction)."""
+        self._log = open(self.log_path, "ab")
+        self._reader = open(self.log_path, "rb")
+        self._index = {}
+        self._lines = self._live = self._size = 0
+        for line in self._reader:
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("unterminated line")
+                entry = json.loads(line)
+            except ValueError:
+                # Torn final line after a crash: cut it off so appends start clean
+                self._log.truncate(self._size)
+                break
+            self._track(entry, self._size)
+            self._size += len(line)
+
+    def _track(self, entry: Dict[str, Any], offset: int) -> None:
+        """Update the index for an event written at `offset`."""
+        event, user_address = entry["event"], entry["user"]
+        index = self._index.get(user_address)
+        if index is None:
+            index = self._index[user_address] = UserLogIndex()
+        self._lines += 1
+        self._live -= index.live_events()
+        if event == "reset":
+            index = self._index[user_address] = UserLogIndex()
+        elif event == "role":
+            index.role = entry["role"]
+        elif event == "persona":
+            index.persona = entry["persona"]
+        elif event == "qa":
+            index.offsets.append(offset)
+        index.last_event = entry["time"]
+        self._live += index.live_events()
+
+    def _write(self, event: str, user_address: str, **fields: Any) -> None:
+        if self._log is None:
+            return
+        entry = {"event": event, "user": user_address, "time": time.time(), **fields}
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+        self._log.write(line)
+        self._log.flush()
+        self._track(entry, self._size)
+        self._size += len(line)
+        if self._size >= self.compact_min_bytes and self._lines > 2 * self._live:
+            self.compact()
+
+    def _read_records(self, offsets: Iterable[int]) -> List[HistoryRecord]:
+        records = []
+        for offset in offsets:
+            self._reader.seek(offset)
+            entry = json.loads(self._reader.readline())
+            records.append(HistoryRecord(
+                entry["question"], entry["answer"], entry["clarity"], entry["specificity"],
+                entry["confidence"], entry["overall_score"], entry["time"],
+            ))
+        return records
+
+    def compact(self) -> None:
+        """
+        Rewrite the log with only the events still needed (each user's
+        latest role and persona and their records since the last reset),
+        dropping users idle for longer than `retention`.
+        """
+        if self._log is None:
+            return
+        cutoff = time.time() - self.retention if self.retention is not None else None
+        tmp_path = self.log_path + ".tmp"
+        with open(tmp_path, "wb") as out:
+            for user_address, index in self._index.items():
+                if cutoff is not None and index.last_event < cutoff:
+                    self._users.pop(user_address, None)
+                    continue
+                for event in ("role", "persona"):
+                    value = getattr(index, event)
+                    if value is not None:
+                        entry = {"event": event, "user": user_address, "time": index.last_event, event: value}
+                        out.write((json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8"))
+                for offset in index.offsets:
+                    self._reader.seek(offset)
+                    out.write(self._reader.readline())
+            out.flush()
+            os.fsync(out.fileno())
+        self._log.close()
+        self._reader.close()
+        os.replace(tmp_path, self.log_path)
+        self._open_log()
+
+    # -------------------------------
+    # In-memory retention
+    # -------------------------------
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._users:
+            user_address, user = next(iter(self._users.items()))
+            expired = self.ttl is not None and now - user.last_seen > self.ttl
+            if not expired and len(self._users) <= self.max_users:
+                break
+            del self._users[user_address]
+
+    def _user(self, user_address: str) -> UserHistory:
+        user = self._users.get(user_address)
+        if user is None:
+            user = UserHistory(self.max_records_per_user)
+            # Evicted, or from before a restart: rebuild from the log. Users
+            # the log has never seen have no index entry and need no read.
+            index = self._index.get(user_address)
+            if index is not None:
+                user.role = index.role
+                user.persona = index.persona
+                user.total = len(index.offsets)
+                user.records.extend(self._read_records(index.offsets[-self.max_records_per_user:]))
+            self._users[user_address] = user
+        else:
+            self._users.move_to_end(user_address)
+        user.last_seen = time.monotonic()
+        self._evict()
+        return user
+
+    # -------------------------------
+    # Public API
+    # -------------------------------
+
+    def reset(self, user_address: str) -> None:
+        self._write("reset", user_address)
+        self._users[user_address] = UserHistory(self.max_records_per_user)
+        self._users.move_to_end(user_address)
+        self._evict()
+
+    def set_role(self, user_address: str, role: str) -> None:
+        self._user(user_address).role = role
+        self._write("role", user_address, role=role)
+
+    def set_persona(self, user_address: str, persona: str) -> None:
+        self._user(user_address).persona = persona
+        self._write("persona", user_address, persona=persona)
+
+    def append(
+        self,
+        user_address: str,
+        question: str,
+        answer: str,
+        clarity: int,
+        specificity: int,
+        confidence: int,
+        overall_score: float,
+    ) -> None:
+        user = self._user(user_address)
+        now = time.time()
+        user.records.append(HistoryRecord(question, answer, clarity, specificity, confidence, overall_score, now))
+        user.total += 1
+        self._write(
+            "qa", user_address, question=question, answer=answer, clarity=clarity,
+            specificity=specificity, confidence=confidence, overall_score=overall_score,
+        )
+
+    def page(self, user_address: str, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Records [offset, offset + limit) of the user's history (oldest first)
+        plus the role, persona and total count. Records no longer in memory
+        are read from the log, one seek each.
+        """
+        user = self._user(user_address)
+        end = user.total if limit is None else min(user.total, offset + limit)
+        in_memory_from = user.total - len(user.records)
+        if offset >= in_memory_from:
+            records = list(user.records)[offset - in_memory_from:end - in_memory_from]
+        elif user_address in self._index and self._reader is not None:
+            records = self._read_records(self._index[user_address].offsets[offset:end])
+        else:
+            records = list(user.records)[:max(0, end - in_memory_from)]
+        return {
+            "role": user.role,
+            "persona": user.persona,
+            "interview_history": [record.to_dict() for record in records],
+            "total": user.total,
+            "offset": offset,
+            "limit": limit,
+        }
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "users_in_memory": len(self._users),
+            "records_in_memory": sum(len(user.records) for user in self._users.values()),
+            "users_logged": len(self._index),
+            "log_lines": self._lines,
+            "log_live_lines": self._live,
+            "log_bytes": self._size,
+        }
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._reader.close()
+            self._log = self._reader = None
@@ -1,10 +1,11 @@
 from datetime import datetime
 from uuid import uuid4
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Any
-import requests
+from typing import Dict, List, Optional, Any, Set, Tuple
+import asyncio
 import json
 import re
+import time
 
 from uagents import Agent, Context, Protocol, Model
 from uagents_core.contrib.protocols.chat import (
@@ -20,12 +21,20 @@ from uagents_core.contrib.protocols.chat import (
 # -------------------------------------------------------
 # MeTTa-inspired Knowledge Graph (Pure Python)
 # -------------------------------------------------------
-from knowledge import build_interview_kg
+from knowledge import KG_CANDIDATES_DIR, build_interview_kg
 from interviewrag import InterviewKG
+from asi_client import AsiClient, AsiError, AsiScheduler, StreamingJsonFields, PRIORITY_QUESTION, PRIORITY_SPECULATIVE
+from resilience import Resilience
+from prompts import HistoryCompactor, interviewer_preamble
+from session_store import LocalRedis, RedisBackend, SessionStore, SQLiteBackend, UAgentsStorageBackend
+from response_cache import ResponseCache
+from interview_history import InterviewHistoryStore
+from heuristic_scorer import score_answer
+from analytics import InterviewAnalytics
 
 # Initialize knowledge graph at module load
 _kg = build_interview_kg()
-interview_kg = InterviewKG(_kg)
+interview_kg = InterviewKG(_kg, candidate_dir=KG_CANDIDATES_DIR)
 
 # -------------------------------------------------------
 # Interviewer Personas + Questions + Session State
@@ -34,9 +43,28 @@ interview_kg = InterviewKG(_kg)
 ROLES = ["Junior Data Analyst"]  # Only one role supported
 PERSONAS = ["HR", "Junior Developer", "Senior Developer", "Corporate Executive"]
 
-# In-memory interview history per user (resets on agent restart)
-# Structure: {user_address: {role, persona, interview_history: [{question, answer, scores, timestamp}]}}
-INTERVIEW_HISTORY: Dict[str, Dict[str, Any]] = {}
+# Interview history per user: the latest records of recently active users
+# stay in memory; everything is appended to INTERVIEW_HISTORY_LOG_PATH, from
+# which evicted users and older pages are read back
+INTERVIEW_HISTORY_LOG_PATH = "interview_history.jsonl"
+INTERVIEW_HISTORY_MAX_USERS = 10_000
+INTERVIEW_HISTORY_RECORDS_PER_USER = 50
+INTERVIEW_HISTORY_TTL = 24 * 3600.0
+
+interview_history = InterviewHistoryStore(
+    INTERVIEW_HISTORY_LOG_PATH,
+    max_users=INTERVIEW_HISTORY_MAX_USERS,
+    max_records_per_user=INTERVIEW_HISTORY_RECORDS_PER_USER,
+    ttl=INTERVIEW_HISTORY_TTL,
+)
+
+# Every evaluation is also added to a columnar store partitioned by day,
+# persona and role, for aggregate queries across sessions (analytics.py);
+# new rows are written to ANALYTICS_PATH every ANALYTICS_FLUSH_PERIOD seconds
+ANALYTICS_PATH = "interview_analytics"
+ANALYTICS_FLUSH_PERIOD = 30.0
+
+analytics = InterviewAnalytics(ANALYTICS_PATH)
 
 # Number of questions per interview session
 QUESTIONS_PER_SESSION = 5
@@ -85,6 +113,74 @@ ASI_API_KEY = "sk-FVoN14UREfvuUPIZugEWKiJGuxMROZ18Ahz4MT6L8TE"
 ASI_API_URL = "https://inference.asicloud.cudos.org/v1/chat/completions"
 ASI_MODEL = "asi1-mini"
 
+# Question generation is latency-critical: if the scheduler can't start a
+# call within ASI_QUESTION_MAX_WAIT seconds we use the fallback questions.
+ASI_MAX_IN_FLIGHT = 8
+ASI_MAX_QUEUE = 64
+ASI_RATE_PER_SECOND = 5.0
+ASI_BURST = 10
+ASI_QUESTION_MAX_WAIT = 5.0
+
+# The candidate is waiting, so question calls get one quick retry and are
+# hedged: a call still unanswered at the p95 latency is raced by a duplicate
+ASI_RETRY_ATTEMPTS = 2
+ASI_HEDGE_REQUESTS = True
+
+# One pooled, non-blocking client shared by every question generator,
+# behind a scheduler that bounds concurrency and request rate
+asi = AsiScheduler(
+    AsiClient(ASI_API_KEY, ASI_API_URL, ASI_MODEL),
+    max_in_flight=ASI_MAX_IN_FLIGHT,
+    max_queue=ASI_MAX_QUEUE,
+    rate=ASI_RATE_PER_SECOND,
+    burst=ASI_BURST,
+    resilience=Resilience(retry_attempts=ASI_RETRY_ATTEMPTS, hedge=ASI_HEDGE_REQUESTS),
+)
+
+# The opening question depends only on (role, persona), so it is generated
+# once per pair and served from disk afterwards
+ASI_CACHE_PATH = "interviewer_cache.sqlite3"
+ASI_CACHE_TTL = 24 * 3600.0
+ASI_CACHE_MAX_ENTRIES = 1_000
+
+response_cache = ResponseCache(ASI_CACHE_PATH, ttl=ASI_CACHE_TTL, max_entries=ASI_CACHE_MAX_ENTRIES)
+
+# Adaptive question prompts carry the latest turns verbatim and a summary of
+# the rest, so their size doesn't grow with the length of the interview
+history_compactor = HistoryCompactor()
+
+# Scores aggregated per session for the final report
+SCORE_DIMENSIONS = ("clarity", "specificity", "confidence", "overall_score")
+
+
+@dataclass
+class ScoreAggregate:
+    """Running count, sum, min, max and variance of one score (Welford's algorithm)."""
+    count: int = 0
+    total: float = 0.0
+    m2: float = 0.0  # Sum of squared deviations from the mean
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+    def add(self, value: float):
+        old_mean = self.mean
+        self.count += 1
+        self.total += value
+        self.m2 += (value - old_mean) * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.count if self.count else 0.0
+
+    def to_list(self) -> List[Any]:
+        return [self.count, self.total, self.m2, self.min, self.max]
+
 
 @dataclass
 class SessionState:
@@ -96,6 +192,26 @@ class SessionState:
     evaluations: List[Dict[str, Any]] = None
     questions: List[str] = None  # Store generated questions (for backward compatibility)
     conversation_history: List[Dict[str, str]] = None  # Store Q&A pairs: [{"question": "...", "answer": "..."}]
+    scores: Dict[str, ScoreAggregate] = None  # Running aggregates of `evaluations`, per SCORE_DIMENSIONS
+
+    def score_aggregates(self) -> Dict[str, ScoreAggregate]:
+        """The running aggregates, rebuilt if `evaluations` was replaced behind their back."""
+        evaluations = self.evaluations or []
+        if self.scores is None or self.scores["clarity"].count != len(evaluations):
+            self.scores = {dimension: ScoreAggregate() for dimension in SCORE_DIMENSIONS}
+            for evaluation in evaluations:
+                for dimension in SCORE_DIMENSIONS:
+                    self.scores[dimension].add(evaluation.get(dimension, 0))
+        return self.scores
+
+    def add_evaluation(self, evaluation: Dict[str, Any]):
+        """Append an evaluation and fold its scores into the running aggregates."""
+        scores = self.score_aggregates()
+        if self.evaluations is None:
+            self.evaluations = []
+        self.evaluations.append(evaluation)
+        for dimension in SCORE_DIMENSIONS:
+            scores[dimension].add(evaluation.get(dimension, 0))
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -107,6 +223,7 @@ class SessionState:
             "evaluations": self.evaluations or [],
             "questions": self.questions or [],
             "conversation_history": self.conversation_history or [],
+            "scores": {dimension: aggregate.to_list() for dimension, aggregate in self.score_aggregates().items()},
         }
 
     @staticmethod
@@ -122,6 +239,8 @@ class SessionState:
             evaluations=d.get("evaluations", []),
             questions=d.get("questions", []),
             conversation_history=d.get("conversation_history", []),
+            # Sessions saved before the aggregates existed rebuild them on first use
+            scores={dimension: ScoreAggregate(*values) for dimension, values in d["scores"].items()} if d.get("scores") else None,
         )
 
 
@@ -149,33 +268,75 @@ def normalize_role_name(user_input: str) -> Optional[str]:
     }
     return role_map.get(user_lower)
 
+# -------------------------------------------------------
+# Streaming question delivery
+# -------------------------------------------------------
+
+# Send generated questions to the user sentence by sentence as they stream in
+STREAM_QUESTIONS = True
+
+
+class ChatTextStream:
+    """
+    Delivers streamed LLM text to a chat user as successive ChatMessages,
+    one batch of complete sentences at a time, so the user starts reading
+    after the first sentence instead of after the whole reply.
+    """
+    _SENTENCE_END = re.compile(r"(?<=[.?!])\s+")
+
+    def __init__(self, ctx: Context, recipient: str):
+        self.ctx = ctx
+        self.recipient = recipient
+        self.text = ""
+        self._delivered = 0  # characters of self.text already sent
+
+    @property
+    def sent(self) -> bool:
+        return self._delivered > 0
+
+    async def feed(self, delta: str) -> None:
+        self.text += delta
+        last = None
+        for last in self._SENTENCE_END.finditer(self.text, self._delivered):
+            pass
+        if last is not None:
+            await self._deliver(self.text[self._delivered:last.start()])
+            self._delivered = last.end()
+
+    async def finish(self) -> str:
+        """Send whatever is left and return the full (cleaned) text."""
+        await self._deliver(self.text[self._delivered:])
+        self._delivered = len(self.text)
+        return self.text.replace("**", "").strip().strip('"').strip("'").strip()
+
+    async def _deliver(self, chunk: str) -> None:
+        # Same clean-up as for complete questions (quotes, markdown bold)
+        chunk = chunk.replace("**", "").strip().strip('"').strip("'").strip()
+        if chunk:
+            await self.ctx.send(self.recipient, make_text_message(chunk))
+
+
 # -------------------------------------------------------
 # ASI Cloud Question Generation
 # -------------------------------------------------------
 
-async def generate_first_question_with_asi(role: str, persona: str) -> str:
+async def generate_first_question_with_asi(
+    role: str, persona: str, stream: Optional[ChatTextStream] = None
+) -> str:
     """
     Generate the first, broad opening question for the interview.
     This question should be general and allow the candidate to introduce themselves.
     
     Uses MeTTa-inspired knowledge graph to enhance prompt with persona focus skills.
+    
+    With a `stream`, the question is sent to the user while it is generated
+    (check stream.sent before sending the returned text again).
     """
     # Query knowledge graph for persona focus skills
     focus_skills = interview_kg.get_focus_skills(persona)
     skills_context = ", ".join(focus_skills) if focus_skills else "general professional skills"
     
-    persona_descriptions = {
-        "hr interviewer": "You are an HR interviewer focusing on culture fit, communication, and basic role alignment. You check whether the candidate's values, attitude, and behaviour match the company culture. You verify basic qualifications, work eligibility, and salary expectations. You assess soft skills: communication, teamwork, professionalism. Your style is friendly, structured, and policy-minded. You ask open questions and pay close attention to how clearly and honestly the candidate answers.",
-        "junior developer": "You are a junior developer interviewer, relatively early in your own career and closer to the candidate's level. You understand the practical realities of junior work. You test basic technical understanding and problem-solving skills. You see how the candidate collaborates and explains ideas to peers. You evaluate willingness to learn, ask questions, and accept feedback. Your style is informal and collaborative. You often use simpler, concrete questions and may share your own experiences. You're less intimidating, but still notice whether the candidate is curious, humble, and logical.",
-        "senior developer": "You are a senior developer or tech lead interviewer, deeply technical and responsible for system quality and team productivity. You assess depth of technical knowledge and reasoning, not just memorised answers. You evaluate how the candidate designs, scales, and maintains systems in the real world. You check code quality, trade-off thinking, and ability to mentor or be mentored. Your style is direct, analytical, and detail-oriented. You ask scenario-based and 'why?' questions, dig into design decisions, edge cases, and trade-offs. You're less interested in buzzwords, more in how the candidate thinks under pressure and explains their solutions.",
-        "corporate executive": "You are a corporate executive interviewer (e.g., CTO, VP, founder) who cares about the 'big picture': business impact, risk, and long-term value. You understand how the candidate contributes to business goals, not just code. You gauge leadership potential, judgement, and maturity. You assess whether the candidate can represent the company well with clients and stakeholders. Your style is high-level, strategic, and time-efficient. You ask broad, probing questions and focus on clarity, confidence, ownership, and alignment with the company's mission.",
-    }
-    
-    persona_desc = persona_descriptions.get(persona, "professional and standard interviewer")
-    
-    prompt = f"""You are an expert interviewer conducting an interview for a {role} position.
-
-You are acting as: {persona_desc}
+    prompt = f"""{interviewer_preamble(role, persona)}
 
 Based on symbolic reasoning, your interviewer persona focuses on these key skills: {skills_context}.
 Use this knowledge to craft a question that naturally assesses these areas.
@@ -189,35 +350,36 @@ Generate ONE broad, opening question to start the interview. This should be:
 
 Return ONLY the question text, nothing else. No JSON, no explanations, just the question."""
 
+    cached = response_cache.get(prompt, ASI_MODEL, 0.7)
+    if cached is not None:
+        return cached
+
     try:
-        payload = {
-            "model": ASI_MODEL,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-        }
-        
-        headers = {
-            "Authorization": f"Bearer {ASI_API_KEY}",
-            "Content-Type": "application/json",
-        }
-        
-        response = requests.post(ASI_API_URL, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        result = response.json()
-        question = result["choices"][0]["message"]["content"].strip()
+        if stream is not None:
+            async for delta in asi.stream_chat(
+                prompt, temperature=0.7, priority=PRIORITY_QUESTION, max_wait=ASI_QUESTION_MAX_WAIT
+            ):
+                await stream.feed(delta)
+            question = await stream.finish()
+        else:
+            question = await asi.chat(
+                prompt, temperature=0.7, priority=PRIORITY_QUESTION, max_wait=ASI_QUESTION_MAX_WAIT
+            )
         
         # Clean up the question (remove quotes if present, remove markdown formatting)
         question = question.strip('"').strip("'").strip()
         if question.startswith("**"):
             question = question.replace("**", "")
         
+        if question:
+            response_cache.put(prompt, ASI_MODEL, 0.7, question)
         return question
         
     except Exception as e:
         print(f"ASI API error generating first question: {e}")
+        if stream is not None and stream.sent:
+            # Part of the question already reached the user - finish it as is
+            return await stream.finish()
         # Fallback to a generic opening question
         fallback_questions = PERSONA_QUESTIONS.get(persona, PERSONA_QUESTIONS["HR"])
         return fallback_questions[0] if fallback_questions else "Can you tell me a bit about yourself?"
@@ -227,8 +389,12 @@ async def generate_next_adaptive_question(
     role: str, 
     persona: str, 
     conversation_history: List[Dict[str, str]],
-    question_number: int
-) -> str:
+    question_number: int,
+    draft: Optional[str] = None,
+    fallback: bool = True,
+    stream: Optional[ChatTextStream] = None,
+    session_key: Optional[str] = None,
+) -> Optional[str]:
     """
     Generate the next question adaptively based on previous Q&A pairs.
     The question should naturally follow from the candidate's previous answers.
@@ -237,6 +403,12 @@ async def generate_next_adaptive_question(
     1. Get persona focus skills for question alignment
     2. Suggest next question topics based on persona priorities
     3. Ensure questions assess relevant skills
+    
+    A speculative `draft` of the question, if there is one, is refined
+    rather than written from scratch. With fallback=False, returns None
+    instead of a static question when the API call fails. With a `stream`,
+    the question is sent to the user while it is generated. `session_key`
+    lets the history summary be reused across the session's questions.
     """
     # Query knowledge graph for persona focus skills and recommended topics
     focus_skills = interview_kg.get_focus_skills(persona)
@@ -246,20 +418,8 @@ async def generate_next_adaptive_question(
     recommended_topics = interview_kg.get_topics_for_persona(persona, limit=3)
     topics_context = ", ".join([topic for topic, _ in recommended_topics]) if recommended_topics else ""
     
-    persona_descriptions = {
-        "HR": "You are an HR interviewer focusing on culture fit, communication, and basic role alignment. You check whether the candidate's values, attitude, and behaviour match the company culture. You verify basic qualifications, work eligibility, and salary expectations. You assess soft skills: communication, teamwork, professionalism. Your style is friendly, structured, and policy-minded. You ask open questions and pay close attention to how clearly and honestly the candidate answers.",
-        "Junior Developer": "You are a junior developer interviewer, relatively early in your own career and closer to the candidate's level. You understand the practical realities of junior work. You test basic technical understanding and problem-solving skills. You see how the candidate collaborates and explains ideas to peers. You evaluate willingness to learn, ask questions, and accept feedback. Your style is informal and collaborative. You often use simpler, concrete questions and may share your own experiences. You're less intimidating, but still notice whether the candidate is curious, humble, and logical.",
-        "Senior Developer": "You are a senior developer or tech lead interviewer, deeply technical and responsible for system quality and team productivity. You assess depth of technical knowledge and reasoning, not just memorised answers. You evaluate how the candidate designs, scales, and maintains systems in the real world. You check code quality, trade-off thinking, and ability to mentor or be mentored. Your style is direct, analytical, and detail-oriented. You ask scenario-based and 'why?' questions, dig into design decisions, edge cases, and trade-offs. You're less interested in buzzwords, more in how the candidate thinks under pressure and explains their solutions.",
-        "Corporate Executive": "You are a corporate executive interviewer (e.g., CTO, VP, founder) who cares about the 'big picture': business impact, risk, and long-term value. You understand how the candidate contributes to business goals, not just code. You gauge leadership potential, judgement, and maturity. You assess whether the candidate can represent the company well with clients and stakeholders. Your style is high-level, strategic, and time-efficient. You ask broad, probing questions and focus on clarity, confidence, ownership, and alignment with the company's mission.",
-    }
-    
-    persona_desc = persona_descriptions.get(persona, "professional and standard interviewer")
-    
-    # Build conversation context
-    conversation_text = ""
-    for i, qa in enumerate(conversation_history, 1):
-        conversation_text += f"Question {i}: {qa.get('question', '')}\n"
-        conversation_text += f"Answer {i}: {qa.get('answer', '')}\n\n"
+    # Recent turns verbatim, older ones summarized, within HISTORY_TOKEN_BUDGET
+    conversation_text = history_compactor.render(session_key, conversation_history)
     
     # Build symbolic reasoning context
     kg_context = f"""
@@ -269,9 +429,16 @@ Symbolic Reasoning Context:
 - Use this knowledge to ensure your question aligns with your interviewer's assessment goals.
 """
     
-    prompt = f"""You are an expert interviewer conducting an interview for a {role} position.
+    # A draft written while the candidate was typing: refining it is enough
+    draft_context = ""
+    if draft:
+        draft_context = f"""A draft of Question {question_number} was prepared before the latest answer arrived:
+"{draft}"
+Keep the draft if it still fits, or adapt it so it builds on the latest answer.
 
-You are acting as: {persona_desc}
+"""
+    
+    prompt = f"""{interviewer_preamble(role, persona)}
 
 {kg_context}
 
@@ -279,7 +446,7 @@ So far in this interview, you have asked the following questions and received th
 
 {conversation_text}
 
-Based on the candidate's previous answers, generate the next question (Question {question_number}) that:
+{draft_context}Based on the candidate's previous answers, generate the next question (Question {question_number}) that:
 1. Naturally follows from what the candidate has shared - build on their previous answers
 2. Digs deeper into interesting points they mentioned, or explores new relevant areas
 3. Is appropriate for a {role} role
@@ -293,24 +460,17 @@ IMPORTANT: Make the question feel like a real conversation. Reference or build u
 Return ONLY the question text, nothing else. No JSON, no explanations, just the question."""
 
     try:
-        payload = {
-            "model": ASI_MODEL,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.8,  # Higher temperature for more natural, varied follow-ups
-        }
-        
-        headers = {
-            "Authorization": f"Bearer {ASI_API_KEY}",
-            "Content-Type": "application/json",
-        }
-        
-        response = requests.post(ASI_API_URL, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        result = response.json()
-        question = result["choices"][0]["message"]["content"].strip()
+        # Higher temperature for more natural, varied follow-ups
+        if stream is not None:
+            async for delta in asi.stream_chat(
+                prompt, temperature=0.8, priority=PRIORITY_QUESTION, max_wait=ASI_QUESTION_MAX_WAIT
+            ):
+                await stream.feed(delta)
+            question = await stream.finish()
+        else:
+            question = await asi.chat(
+                prompt, temperature=0.8, priority=PRIORITY_QUESTION, max_wait=ASI_QUESTION_MAX_WAIT
+            )
         
         # Clean up the question
         question = question.strip('"').strip("'").strip()
@@ -321,12 +481,173 @@ Return ONLY the question text, nothing else. No JSON, no explanations, just the
         
     except Exception as e:
         print(f"ASI API error generating adaptive question: {e}")
-        # Fallback: try to generate a generic question based on persona
-        fallback_questions = PERSONA_QUESTIONS.get(persona, PERSONA_QUESTIONS["HR"])
-        if question_number <= len(fallback_questions):
-            return fallback_questions[question_number - 1]
-        else:
-            return "Can you tell me more about that?"
+        if stream is not None and stream.sent:
+            return await stream.finish()
+        if not fallback:
+            return None
+        return fallback_question(persona, question_number)
+
+
+def fallback_question(persona: str, question_number: int) -> str:
+    """Generic question for a persona, used when generation fails."""
+    fallback_questions = PERSONA_QUESTIONS.get(persona, PERSONA_QUESTIONS["HR"])
+    if question_number <= len(fallback_questions):
+        return fallback_questions[question_number - 1]
+    else:
+        return "Can you tell me more about that?"
+
+
+# -------------------------------------------------------
+# Speculative Question Drafts
+# -------------------------------------------------------
+
+# Draft the next question while the candidate is still typing their answer,
+# so answering only costs a quick refinement (or nothing) instead of a full
+# generation round trip.
+SPECULATIVE_DRAFTS_ENABLED = True
+
+# Seconds to wait for the answer-aware question before using the draft instead
+SPECULATIVE_REFINE_BUDGET = 2.5
+
+# Further seconds to wait for either of them, if neither is ready when the
+# budget runs out, before using the fallback question
+SPECULATIVE_GRACE = 1.5
+
+# session_key -> (question number being drafted, task returning the draft or None)
+SPECULATIVE_DRAFTS: Dict[str, Tuple[int, "asyncio.Task[Optional[str]]"]] = {}
+
+
+async def draft_next_question_with_asi(
+    role: str,
+    persona: str,
+    conversation_history: List[Dict[str, str]],
+    current_question: str,
+    question_number: int,
+    session_key: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Draft Question `question_number` before the current question is answered.
+    
+    Uses the persona focus skills and one of the persona's top-priority KG
+    topics, so the draft works whatever the candidate says next. Runs at
+    the lowest scheduler priority and returns None if it can't be generated.
+    """
+    focus_skills = interview_kg.get_focus_skills(persona)
+    skills_context = ", ".join(focus_skills) if focus_skills else "general professional skills"
+    
+    # Rotate through the persona's highest-priority topics
+    recommended_topics = interview_kg.get_topics_for_persona(persona, limit=QUESTIONS_PER_SESSION)
+    topic = recommended_topics[(question_number - 2) % len(recommended_topics)][0] if recommended_topics else None
+    topic_context = f"\nFocus this question on the topic: {topic}." if topic else ""
+    
+    conversation_text = history_compactor.render(session_key, conversation_history)
+    
+    prompt = f"""You are the {persona} interviewer in an interview for a {role} position.
+Your persona focuses on these skills: {skills_context}.{topic_context}
+
+Conversation so far:
+
+{conversation_text}You just asked: {current_question}
+
+While the candidate answers, draft Question {question_number}. It must make sense whatever they answer, follow naturally from the conversation, and be clear, concise, and ready to ask directly.
+
+Return ONLY the question text, nothing else."""
+
+    try:
+        question = await asi.chat(prompt, temperature=0.7, priority=PRIORITY_SPECULATIVE)
+    except Exception as e:
+        print(f"ASI API error drafting question {question_number}: {e}")
+        return None
+    
+    question = question.strip('"').strip("'").strip()
+    if question.startswith("**"):
+        question = question.replace("**", "")
+    return question or None
+
+
+def start_speculative_draft(session_key: str, session: SessionState) -> None:
+    """Start drafting the question after the one just asked, if there will be one."""
+    cancel_speculative_draft(session_key)
+    question_number = session.question_index + 2
+    if not SPECULATIVE_DRAFTS_ENABLED or FUSED_TURNS or question_number > QUESTIONS_PER_SESSION:
+        return
+    questions = session.questions or []
+    current_question = questions[session.question_index] if session.question_index < len(questions) else ""
+    task = asyncio.create_task(
+        draft_next_question_with_asi(
+            role=session.role,
+            persona=session.persona,
+            conversation_history=list(session.conversation_history or []),
+            current_question=current_question,
+            question_number=question_number,
+            session_key=session_key,
+        )
+    )
+    SPECULATIVE_DRAFTS[session_key] = (question_number, task)
+
+
+def cancel_speculative_draft(session_key: str) -> None:
+    entry = SPECULATIVE_DRAFTS.pop(session_key, None)
+    if entry is not None:
+        entry[1].cancel()
+
+
+async def next_question_with_speculation(
+    session_key: str,
+    role: str,
+    persona: str,
+    conversation_history: List[Dict[str, str]],
+    question_number: int,
+    stream: Optional[ChatTextStream] = None,
+) -> str:
+    """
+    Get the next question, using the speculative draft when there is one.
+    
+    The answer-aware question (refining the draft if it is ready) gets
+    SPECULATIVE_REFINE_BUDGET seconds. After that a ready draft is used at
+    once; otherwise whichever of the two is available first within
+    SPECULATIVE_GRACE more seconds, and then the fallback question. Without
+    a draft the question is generated directly, streamed to `stream` if given.
+    """
+    entry = SPECULATIVE_DRAFTS.pop(session_key, None)
+    if entry is not None and entry[0] != question_number:
+        entry[1].cancel()
+        entry = None
+    if entry is None:
+        return await generate_next_adaptive_question(
+            role, persona, conversation_history, question_number, stream=stream, session_key=session_key
+        )
+    
+    draft_task = entry[1]
+    draft = draft_task.result() if draft_task.done() else None
+    refine_task = asyncio.create_task(
+        generate_next_adaptive_question(
+            role, persona, conversation_history, question_number,
+            draft=draft, fallback=False, session_key=session_key,
+        )
+    )
+    
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SPECULATIVE_REFINE_BUDGET + SPECULATIVE_GRACE
+    await asyncio.wait({refine_task}, timeout=SPECULATIVE_REFINE_BUDGET)
+    waiting = {refine_task, draft_task}
+    while waiting:
+        # The refined question wins ties; a task that produced None drops out
+        for task in (refine_task, draft_task):
+            if task in waiting and task.done():
+                waiting.discard(task)
+                if task.result():
+                    for other in waiting:
+                        other.cancel()
+                    return task.result()
+        remaining = deadline - loop.time()
+        if not waiting or remaining <= 0:
+            break
+        await asyncio.wait(waiting, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+    
+    for task in waiting:
+        task.cancel()
+    return fallback_question(persona, question_number)
 
 
 async def generate_questions_with_asi(role: str, persona: str, num_questions: int = QUESTIONS_PER_SESSION) -> List[str]:
@@ -335,18 +656,7 @@ async def generate_questions_with_asi(role: str, persona: str, num_questions: in
     Returns a list of questions, or falls back to hardcoded questions if API fails.
     """
     # Build the prompt for question generation
-    persona_descriptions = {
-        "HR": "You are an HR interviewer focusing on culture fit, communication, and basic role alignment. You check whether the candidate's values, attitude, and behaviour match the company culture. You verify basic qualifications, work eligibility, and salary expectations. You assess soft skills: communication, teamwork, professionalism. Your style is friendly, structured, and policy-minded. You ask open questions and pay close attention to how clearly and honestly the candidate answers.",
-        "Junior Developer": "You are a junior developer interviewer, relatively early in your own career and closer to the candidate's level. You understand the practical realities of junior work. You test basic technical understanding and problem-solving skills. You see how the candidate collaborates and explains ideas to peers. You evaluate willingness to learn, ask questions, and accept feedback. Your style is informal and collaborative. You often use simpler, concrete questions and may share your own experiences. You're less intimidating, but still notice whether the candidate is curious, humble, and logical.",
-        "Senior Developer": "You are a senior developer or tech lead interviewer, deeply technical and responsible for system quality and team productivity. You assess depth of technical knowledge and reasoning, not just memorised answers. You evaluate how the candidate designs, scales, and maintains systems in the real world. You check code quality, trade-off thinking, and ability to mentor or be mentored. Your style is direct, analytical, and detail-oriented. You ask scenario-based and 'why?' questions, dig into design decisions, edge cases, and trade-offs. You're less interested in buzzwords, more in how the candidate thinks under pressure and explains their solutions.",
-        "Corporate Executive": "You are a corporate executive interviewer (e.g., CTO, VP, founder) who cares about the 'big picture': business impact, risk, and long-term value. You understand how the candidate contributes to business goals, not just code. You gauge leadership potential, judgement, and maturity. You assess whether the candidate can represent the company well with clients and stakeholders. Your style is high-level, strategic, and time-efficient. You ask broad, probing questions and focus on clarity, confidence, ownership, and alignment with the company's mission.",
-    }
-    
-    persona_desc = persona_descriptions.get(persona, "professional and standard interviewer")
-    
-    prompt = f"""You are an expert interviewer creating interview questions for a {role} position.
-
-You are acting as: {persona_desc}
+    prompt = f"""{interviewer_preamble(role, persona)}
 
 Generate exactly {num_questions} interview questions that:
 1. Are appropriate for a {role} role
@@ -361,25 +671,10 @@ Return ONLY a JSON array of strings, one question per string, like this:
 Do not include any other text, explanations, or markdown formatting. Just the JSON array."""
 
     try:
-        # Call ASI Cloud API
-        payload = {
-            "model": ASI_MODEL,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,  # Slightly higher temperature for more varied questions
-        }
-        
-        headers = {
-            "Authorization": f"Bearer {ASI_API_KEY}",
-            "Content-Type": "application/json",
-        }
-        
-        response = requests.post(ASI_API_URL, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        result = response.json()
-        ai_response = result["choices"][0]["message"]["content"].strip()
+        # Call ASI Cloud API (slightly higher temperature for more varied questions)
+        ai_response = await asi.chat(
+            prompt, temperature=0.7, priority=PRIORITY_QUESTION, max_wait=ASI_QUESTION_MAX_WAIT
+        )
         
         # Parse the JSON response from ASI
         # Try to extract JSON array from the response (it might have markdown code blocks)
@@ -404,7 +699,7 @@ Do not include any other text, explanations, or markdown formatting. Just the JS
         else:
             raise ValueError("Invalid format from API")
         
-    except (requests.exceptions.RequestException, json.JSONDecodeError, KeyError, ValueError) as e:
+    except (AsiError, json.JSONDecodeError, KeyError, ValueError) as e:
         # API call failed - fallback to hardcoded questions
         print(f"ASI API error generating questions: {e}")
         print(f"Falling back to hardcoded questions for persona: {persona}")
@@ -423,6 +718,9 @@ class EvaluationRequest(Model):
     persona: Optional[str] = None
     role: Optional[str] = None
     user_address: str
+    # Echoed back in the response, which is routed by request_id
+    request_id: Optional[str] = None
+    session_key: Optional[str] = None
 
 
 class EvaluationResponse(Model):
@@ -431,6 +729,8 @@ class EvaluationResponse(Model):
     persona: Optional[str] = None
     role: Optional[str] = None
     user_address: str
+    request_id: Optional[str] = None
+    session_key: Optional[str] = None
 
     clarity: int
     specificity: int
@@ -440,6 +740,10 @@ class EvaluationResponse(Model):
     feedback: str
     improved_answer: str
 
+    # Scores sent ahead of the improved answer, which follows in a second
+    # (full) response with the same request_id
+    partial: bool = False
+
 
 # -------------------------------------------------------
 # Helpers for session key + storage
@@ -458,9 +762,35 @@ def get_session_key(sender: str, msg: ChatMessage) -> str:
     return f"session:sender:{sender}"
 
 
+# Where sessions are persisted: "uagents" (the agent's ctx.storage),
+# "sqlite" (SESSION_DB_PATH) or "redis" (SESSION_REDIS_CLIENT, e.g.
+# redis.Redis(); defaults to the in-process LocalRedis stand-in)
+SESSION_BACKEND = "uagents"
+SESSION_DB_PATH = "interviewer_sessions.sqlite3"
+SESSION_REDIS_CLIENT = None
+
+# SessionState lists persisted item by item, so a turn only writes what it added
+SESSION_LIST_FIELDS = ("answers", "evaluations", "questions", "conversation_history")
+
+SESSION_STORE: Optional[SessionStore] = None
+
+
+def get_session_store(ctx: Context) -> SessionStore:
+    """The hot session cache, created on first use (ctx.storage is only reachable from a handler)."""
+    global SESSION_STORE
+    if SESSION_STORE is None:
+        if SESSION_BACKEND == "sqlite":
+            backend = SQLiteBackend(SESSION_DB_PATH)
+        elif SESSION_BACKEND == "redis":
+            backend = RedisBackend(SESSION_REDIS_CLIENT or LocalRedis())
+        else:
+            backend = UAgentsStorageBackend(ctx.storage)
+        SESSION_STORE = SessionStore(backend, SessionState.to_dict, SessionState.from_dict, SESSION_LIST_FIELDS)
+    return SESSION_STORE
+
+
 def load_session(ctx: Context, session_key: str) -> SessionState:
-    stored = ctx.storage.get(session_key)
-    session = SessionState.from_dict(stored)
+    session = get_session_store(ctx).get(session_key)
     ctx.logger.info(
         f"Loaded session for {session_key}: role={session.role}, persona={session.persona}, "
         f"q_index={session.question_index}, finished={session.finished}"
@@ -469,43 +799,34 @@ def load_session(ctx: Context, session_key: str) -> SessionState:
 
 
 def save_session(ctx: Context, session_key: str, session: SessionState):
-    ctx.storage.set(session_key, session.to_dict())
+    """Mark the session changed; the delta is written by flush_sessions()."""
+    get_session_store(ctx).put(session_key, session)
     ctx.logger.info(
         f"Saved session for {session_key}: role={session.role}, persona={session.persona}, "
         f"q_index={session.question_index}, finished={session.finished}"
     )
 
 
-# -------------------------------------------------------
-# In-memory logging functions for demo
-# -------------------------------------------------------
-
-def initialize_user_history(user_address: str):
-    """Initialize a new interview history entry for a user."""
-    INTERVIEW_HISTORY[user_address] = {
-        "role": None,
-        "persona": None,
-        "interview_history": []  # List of {question, answer, clarity, specificity, confidence, overall_score, timestamp}
-    }
-
+def flush_sessions(ctx: Context):
+    """Persist all session changes made since the last flush (once per message)."""
+    try:
+        get_session_store(ctx).flush()
+    except Exception as e:
+        ctx.logger.error(f"Failed to persist sessions: {e}")
 
-def get_user_history(user_address: str) -> Dict[str, Any]:
-    """Get the interview history for a user."""
-    if user_address not in INTERVIEW_HISTORY:
-        initialize_user_history(user_address)
-    return INTERVIEW_HISTORY[user_address]
 
+# -------------------------------------------------------
+# Interview history logging
+# -------------------------------------------------------
 
 def log_role_selection(user_address: str, role: str):
     """Log the selected role for a user."""
-    history = get_user_history(user_address)
-    history["role"] = role
+    interview_history.set_role(user_address, role)
 
 
 def log_persona_selection(user_address: str, persona: str):
     """Log the selected persona for a user."""
-    history = get_user_history(user_address)
-    history["persona"] = persona
+    interview_history.set_persona(user_address, persona)
 
 
 def log_question_answer_evaluation(
@@ -518,26 +839,18 @@ def log_question_answer_evaluation(
     overall_score: float
 ):
     """Log a complete Q&A with evaluation scores and timestamp."""
-    history = get_user_history(user_address)
-    history["interview_history"].append({
-        "question": question,
-        "answer": answer,
-        "clarity": clarity,
-        "specificity": specificity,
-        "confidence": confidence,
-        "overall_score": overall_score,
-        "timestamp": datetime.utcnow().isoformat()
-    })
+    interview_history.append(user_address, question, answer, clarity, specificity, confidence, overall_score)
 
 
 def reset_user_history(user_address: str):
     """Reset the interview history for a user (for restart command)."""
-    initialize_user_history(user_address)
+    interview_history.reset(user_address)
 
 
-def get_user_interview_history(user_address: str) -> Dict[str, Any]:
+def get_user_interview_history(user_address: str, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
     """
-    Get the complete interview history for a user.
+    Get a page of the interview history for a user (all of it by default),
+    oldest first. Older pages are read back from the history log.
     Returns: {
         "role": str or None,
         "persona": str or None,
@@ -552,25 +865,74 @@ def get_user_interview_history(user_address: str) -> Dict[str, Any]:
                 "timestamp": str (ISO format)
             },
             ...
-        ]
+        ],
+        "total": int (records since the last reset),
+        "offset": int,
+        "limit": int or None
     }
     """
-    return get_user_history(user_address)
+    return interview_history.page(user_address, offset, limit)
+
+
+REPORT_TEMPLATE = """✅ Interview complete – here's your detailed report
+
+Role: {role}
+
+Interviewer style: {persona}
+
+Questions answered: {count}
+
+Average scores this session
+
+Clarity: {clarity} / 5
+Specificity: {specificity} / 5
+Confidence: {confidence} / 5
+Overall: {overall} / 5
+
+📋 Detailed Question-by-Question Feedback
+
+{questions}{strengths}{areas_to_improve}📝 Next steps
+
+{next_steps}
+Type 'restart' to try another interview with a different interviewer style."""
 
+QUESTION_TEMPLATE = """Question {number}: {question}
 
-def generate_end_of_interview_summary(session: SessionState) -> str:
-    """Generate end-of-interview summary matching the example format."""
+Your answer: "{answer}"
+
+Scores: Clarity {clarity}/5, Specificity {specificity}/5, Confidence {confidence}/5, Overall {overall}/5
+
+Feedback: {feedback}
+
+Improved example answer:
+{improved}
+
+---
+
+"""
+
+
+def _report_list(heading: str, items: List[str]) -> str:
+    return f"{heading}\n\n" + "".join(f"{item}\n" for item in items) + "\n" if items else ""
+
+
+def generate_end_of_interview_summary(session: SessionState, improved_answers: Optional[Dict[int, str]] = None) -> str:
+    """
+    Generate end-of-interview summary matching the example format.
+    The averages come from the session's running aggregates and the text
+    is rendered from templates in one pass. `improved_answers` fills in
+    example answers the evaluations lack, by index into session.evaluations.
+    """
     if not session.evaluations or len(session.evaluations) == 0:
         return "Interview complete. No evaluations available."
     
     evals = session.evaluations
-    n = len(evals)
+    scores = session.score_aggregates()
     
-    # Calculate averages
-    avg_clarity = round(sum(e.get("clarity", 0) for e in evals) / n, 2)
-    avg_specificity = round(sum(e.get("specificity", 0) for e in evals) / n, 2)
-    avg_confidence = round(sum(e.get("confidence", 0) for e in evals) / n, 2)
-    avg_overall = round(sum(e.get("overall_score", 0) for e in evals) / n, 2)
+    avg_clarity = round(scores["clarity"].mean, 2)
+    avg_specificity = round(scores["specificity"].mean, 2)
+    avg_confidence = round(scores["confidence"].mean, 2)
+    avg_overall = round(scores["overall_score"].mean, 2)
     
     # Determine strengths and areas to improve based on scores
     strengths = []
@@ -613,59 +975,7 @@ def generate_end_of_interview_summary(session: SessionState) -> str:
     if len(areas_to_improve) == 0:
         areas_to_improve.append("Continue refining your interview responses with more specific examples.")
     
-    # Limit to 2-3 items each
-    strengths = strengths[:3]
-    areas_to_improve = areas_to_improve[:3]
-    
-    # Build summary in exact format from example
-    role_display = session.role.title() if session.role else "N/A"
-    persona_display = session.persona.title() if session.persona else "N/A"
-    
-    summary = (
-        f"✅ Interview complete – here's your detailed report\n\n"
-        f"Role: {role_display}\n\n"
-        f"Interviewer style: {persona_display}\n\n"
-        f"Questions answered: {n}\n\n"
-        f"Average scores this session\n\n"
-        f"Clarity: {avg_clarity} / 5\n"
-        f"Specificity: {avg_specificity} / 5\n"
-        f"Confidence: {avg_confidence} / 5\n"
-        f"Overall: {avg_overall} / 5\n\n"
-    )
-    
-    # Add detailed per-question feedback (since we don't show it during interview)
-    summary += "📋 Detailed Question-by-Question Feedback\n\n"
-    for i, eval_data in enumerate(evals, 1):
-        question = eval_data.get("question", "N/A")
-        answer = eval_data.get("answer", "N/A")
-        clarity = eval_data.get("clarity", 0)
-        specificity = eval_data.get("specificity", 0)
-        confidence = eval_data.get("confidence", 0)
-        overall = eval_data.get("overall_score", 0)
-        feedback = eval_data.get("feedback", "No feedback available.")
-        improved = eval_data.get("improved_answer", "No improved answer available.")
-        
-        summary += f"Question {i}: {question}\n\n"
-        summary += f'Your answer: "{answer}"\n\n'
-        summary += f"Scores: Clarity {clarity}/5, Specificity {specificity}/5, Confidence {confidence}/5, Overall {overall}/5\n\n"
-        summary += f"Feedback: {feedback}\n\n"
-        summary += f"Improved example answer:\n{improved}\n\n"
-        summary += "---\n\n"
-    
-    if strengths:
-        summary += "💪 Strengths\n\n"
-        for strength in strengths:
-            summary += f"{strength}\n"
-        summary += "\n"
-    
-    if areas_to_improve:
-        summary += "🎯 Key areas to improve\n\n"
-        for area in areas_to_improve:
-            summary += f"{area}\n"
-        summary += "\n"
-    
     # Next steps
-    summary += "📝 Next steps\n\n"
     next_steps = []
     
     if avg_specificity < 3.0:
@@ -682,12 +992,110 @@ def generate_end_of_interview_summary(session: SessionState) -> str:
     if len(next_steps) == 0:
         next_steps.append("Review your feedback and practice the improved answer examples.")
     
-    for step in next_steps:
-        summary += f"{step}\n"
-    
-    summary += "\nType 'restart' to try another interview with a different interviewer style."
+    # Detailed per-question feedback (since we don't show it during interview)
+    questions = "".join(
+        QUESTION_TEMPLATE.format(
+            number=i,
+            question=eval_data.get("question", "N/A"),
+            answer=eval_data.get("answer", "N/A"),
+            clarity=eval_data.get("clarity", 0),
+            specificity=eval_data.get("specificity", 0),
+            confidence=eval_data.get("confidence", 0),
+            overall=eval_data.get("overall_score", 0),
+            feedback=eval_data.get("feedback", "No feedback available."),
+            improved=(
+                eval_data.get("improved_answer")
+                or (improved_answers or {}).get(i - 1)
+                or "No improved answer available."
+            ),
+        )
+        for i, eval_data in enumerate(evals, 1)
+    )
     
-    return summary
+    return REPORT_TEMPLATE.format(
+        role=session.role.title() if session.role else "N/A",
+        persona=session.persona.title() if session.persona else "N/A",
+        count=len(evals),
+        clarity=avg_clarity,
+        specificity=avg_specificity,
+        confidence=avg_confidence,
+        overall=avg_overall,
+        questions=questions,
+        # Limit to 2-3 items each
+        strengths=_report_list("💪 Strengths", strengths[:3]),
+        areas_to_improve=_report_list("🎯 Key areas to improve", areas_to_improve[:3]),
+        next_steps="".join(f"{step}\n" for step in next_steps),
+    )
+
+
+# Answers scored by the local heuristic scorer (the evaluator's "tiered"
+# mode, or a request that timed out here) have no improved example answer.
+# When the report is built, one ASI call writes all the missing ones.
+REPORT_IMPROVED_ANSWERS = True
+
+
+def build_improved_answers_prompt(session: SessionState, evaluations: List[Dict[str, Any]]) -> str:
+    answers = "\n\n".join(
+        f"""### Answer {i}
+Question: {eval_data.get('question', '')}
+Candidate's answer: {eval_data.get('answer', '')}"""
+        for i, eval_data in enumerate(evaluations, 1)
+    )
+    return f"""You are an expert interview coach. A candidate for a {session.role or 'General'} role gave these answers to an interviewer with this style: {session.persona or 'Standard'}.
+
+{answers}
+
+For each answer, write a complete improved version with specific examples, numbers, and concrete details.
+
+Provide your response as a JSON array with exactly one object per answer, in this exact format:
+[
+    {{
+        "id": <answer number>,
+        "improved_answer": "<the improved answer>"
+    }}
+]"""
+
+
+async def write_missing_improved_answers(session: SessionState) -> Dict[int, str]:
+    """
+    Improved example answers for the evaluations that have none, by index
+    into session.evaluations. Empty if there are none to write or the ASI
+    call fails (the report then says none is available).
+    """
+    evals = session.evaluations or []
+    missing = [i for i, eval_data in enumerate(evals) if not eval_data.get("improved_answer")]
+    if not REPORT_IMPROVED_ANSWERS or not missing:
+        return {}
+    try:
+        ai_response = await asi.chat(
+            build_improved_answers_prompt(session, [evals[i] for i in missing]),
+            temperature=0.3,
+            priority=PRIORITY_QUESTION,
+            max_wait=ASI_QUESTION_MAX_WAIT,
+        )
+        json_match = re.search(r'\[[\s\S]*\]', ai_response)
+        items = json.loads(json_match.group(0) if json_match else ai_response)
+        if not isinstance(items, list):
+            raise ValueError("Expected a JSON array")
+    except (AsiError, json.JSONDecodeError, ValueError) as e:
+        print(f"ASI API error writing improved answers for the report: {e}")
+        return {}
+
+    improved: Dict[int, str] = {}
+    for item in items:
+        try:
+            position = int(item["id"]) - 1
+            text = str(item["improved_answer"]).strip()
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= position < len(missing) and text:
+            improved[missing[position]] = text
+    return improved
+
+
+async def build_final_report(session: SessionState) -> str:
+    """The end-of-interview report, with improved answers written for any that lack one."""
+    return generate_end_of_interview_summary(session, await write_missing_improved_answers(session))
 
 
 # -------------------------------------------------------
@@ -712,6 +1120,76 @@ def make_text_message(text: str) -> ChatMessage:
     )
 
 
+# -------------------------------------------------------
+# Pending evaluations (routing evaluator responses)
+# -------------------------------------------------------
+
+# Each EvaluationRequest carries a request ID that the evaluator echoes back,
+# so a response is matched to its session in memory, without a storage
+# read, even when one user has several sessions. Requests unanswered after
+# EVAL_RESPONSE_TIMEOUT seconds are scored locally so the final report
+# isn't held up; a response that arrives after that is dropped as stale.
+EVAL_RESPONSE_TIMEOUT = 120.0
+
+
+@dataclass
+class PendingEvaluation:
+    session_key: str
+    user_address: str
+    question: str
+    answer: str
+    sent_at: float
+    # From a partial response: already logged, and used if the full one never comes
+    scores: Optional[Dict[str, Any]] = None
+
+
+PENDING_EVALUATIONS: Dict[str, PendingEvaluation] = {}
+
+
+def cancel_pending_evaluations(session_key: str):
+    """Forget a session's outstanding requests (their responses become stale)."""
+    for request_id in [rid for rid, p in PENDING_EVALUATIONS.items() if p.session_key == session_key]:
+        del PENDING_EVALUATIONS[request_id]
+
+
+def local_evaluation_data(question: str, answer: str) -> Dict[str, Any]:
+    """Evaluation from the local heuristic scorer, in record_evaluation's shape."""
+    score = score_answer(answer)
+    scores = score.scores()
+    return {
+        "question": question,
+        "answer": answer,
+        **scores,
+        "overall_score": round(sum(scores.values()) / 3.0, 2),
+        "feedback": score.feedback(),
+        "improved_answer": score.improved_answer,
+    }
+
+
+async def expire_pending_evaluations(ctx: Context):
+    """
+    Stop waiting for timed-out requests: use the scores that streamed in,
+    if any (the report writes the missing improved answer), else score the
+    answer locally.
+    """
+    cutoff = time.monotonic() - EVAL_RESPONSE_TIMEOUT
+    expired = [rid for rid, p in PENDING_EVALUATIONS.items() if p.sent_at < cutoff]
+    for request_id in expired:
+        pending = PENDING_EVALUATIONS.pop(request_id)
+        if pending.scores is not None:
+            ctx.logger.warning(
+                f"No full evaluation for request {request_id} after {EVAL_RESPONSE_TIMEOUT:.0f}s; using its scores"
+            )
+            await record_evaluation(ctx, pending.session_key, pending.user_address, pending.scores, scores_logged=True)
+            continue
+        ctx.logger.warning(
+            f"No evaluation for request {request_id} after {EVAL_RESPONSE_TIMEOUT:.0f}s; scoring it locally"
+        )
+        await record_evaluation(
+            ctx, pending.session_key, pending.user_address, local_evaluation_data(pending.question, pending.answer)
+        )
+
+
 # -------------------------------------------------------
 # Helper to send evaluation requests
 # -------------------------------------------------------
@@ -729,22 +1207,29 @@ async def send_evaluation_request(
         ctx.logger.warning("EVALUATOR_AGENT_ADDRESS not set correctly.")
         return
 
+    request_id = str(uuid4())
     try:
-        # Store mapping from user_address to session_key so we can retrieve it in response handler
-        ctx.storage.set(f"eval_session:{user_address}", session_key)
-        ctx.logger.info(f"Stored session mapping: {user_address} -> {session_key}")
-
         req = EvaluationRequest(
             question=question,
             answer=answer,
             persona=persona,
             role=role,
             user_address=user_address,
+            request_id=request_id,
+            session_key=session_key,
+        )
+        PENDING_EVALUATIONS[request_id] = PendingEvaluation(
+            session_key=session_key,
+            user_address=user_address,
+            question=question,
+            answer=answer,
+            sent_at=time.monotonic(),
         )
 
         ctx.logger.info(f"Sending EvaluationRequest to evaluator: {req}")
         await ctx.send(EVALUATOR_AGENT_ADDRESS, req)
     except Exception as e:
+        PENDING_EVALUATIONS.pop(request_id, None)
         ctx.logger.error(f"Failed to send evaluation request to evaluator at {EVALUATOR_AGENT_ADDRESS}: {e}")
         ctx.logger.warning("Make sure the evaluator agent is running. Start it with: python evaluator.py")
         # Note: The error will be logged but the interview will wait for the evaluator
@@ -752,6 +1237,221 @@ async def send_evaluation_request(
         raise  # Re-raise to let the caller know the evaluation failed
 
 
+# -------------------------------------------------------
+# Recording evaluations
+# -------------------------------------------------------
+
+def log_evaluation_scores(session: SessionState, user_address: str, evaluation_data: Dict[str, Any]):
+    """Add an evaluation's scores to the analytics store and the user's history."""
+    analytics.ingest(session.persona, session.role, evaluation_data)
+    
+    # Log complete Q&A with evaluation to user history
+    log_question_answer_evaluation(
+        user_address=user_address,
+        question=evaluation_data["question"],
+        answer=evaluation_data["answer"],
+        clarity=evaluation_data["clarity"],
+        specificity=evaluation_data["specificity"],
+        confidence=evaluation_data["confidence"],
+        overall_score=evaluation_data["overall_score"]
+    )
+
+
+async def record_evaluation(
+    ctx: Context,
+    session_key: str,
+    user_address: str,
+    evaluation_data: Dict[str, Any],
+    scores_logged: bool = False,
+):
+    """
+    Store an answer's evaluation silently (no feedback during the interview)
+    and send the final report once the finished interview has all of them.
+    `scores_logged` means a partial response already logged the scores.
+    """
+    session = load_session(ctx, session_key)
+
+    session.add_evaluation(evaluation_data)
+    if not scores_logged:
+        log_evaluation_scores(session, user_address, evaluation_data)
+    
+    # Save session with updated evaluations
+    save_session(ctx, session_key, session)
+    flush_sessions(ctx)
+    
+    # If interview is finished, check if we should send the final report
+    if session.finished:
+        # Send report if we have evaluations (even if not all are complete, in case some failed)
+        if session.evaluations and len(session.evaluations) > 0:
+            # Check if this is likely the last evaluation (we have as many as questions answered)
+            # or if we've been waiting and have at least some evaluations
+            num_answers = len(session.answers) if session.answers else 0
+            if len(session.evaluations) >= num_answers or len(session.evaluations) >= QUESTIONS_PER_SESSION:
+                summary = await build_final_report(session)
+                await ctx.send(user_address, make_text_message(summary))
+
+
+# -------------------------------------------------------
+# Fused Turns (evaluation + next question in one ASI call)
+# -------------------------------------------------------
+
+# One structured completion per answer returns both the evaluation and the
+# next question, instead of one call via the evaluator agent plus one here.
+# The last answer (no next question) still goes to the evaluator agent.
+# Speculative drafts are not used in this mode.
+FUSED_TURNS = False
+
+# Between the evaluator's 0.3 and the question generator's 0.8
+FUSED_TEMPERATURE = 0.5
+
+# Background tasks still parsing a fused evaluation, by session key
+FUSED_EVALUATIONS: Dict[str, Set["asyncio.Task[None]"]] = {}
+
+
+def cancel_fused_evaluations(session_key: str) -> None:
+    """Cancel a session's in-flight fused evaluations so they can't record into its next interview."""
+    for task in FUSED_EVALUATIONS.pop(session_key, ()):
+        task.cancel()
+
+
+def _forget_fused_evaluation(session_key: str, task: "asyncio.Task[None]") -> None:
+    tasks = FUSED_EVALUATIONS.get(session_key)
+    if tasks is not None:
+        tasks.discard(task)
+        if not tasks:
+            del FUSED_EVALUATIONS[session_key]
+
+
+def _clamp_score(value: Any) -> int:
+    return max(1, min(5, int(value)))
+
+
+async def evaluate_and_ask_next_with_asi(
+    ctx: Context,
+    session_key: str,
+    user_address: str,
+    session: SessionState,
+    question_number: int,
+    turn_saved: asyncio.Event,
+) -> Optional[str]:
+    """
+    Evaluate the latest answer and generate Question `question_number` with
+    one ASI call.
+    
+    The JSON reply lists the next question first, so it is returned as soon
+    as that field is complete (None if it never arrives, e.g. the call
+    failed). The evaluation keeps streaming in the background and is
+    recorded once `turn_saved` is set; if its scores don't arrive, the
+    answer is sent to the evaluator agent instead. A restart or stop
+    cancels it (cancel_fused_evaluations).
+    """
+    role, persona = session.role, session.persona
+    conversation_history = list(session.conversation_history or [])
+    latest = conversation_history[-1]
+    
+    focus_skills = interview_kg.get_focus_skills(persona)
+    skills_context = ", ".join(focus_skills) if focus_skills else "general professional skills"
+    recommended_topics = interview_kg.get_topics_for_persona(persona, limit=3)
+    topics_context = ", ".join([topic for topic, _ in recommended_topics]) if recommended_topics else ""
+    conversation_text = history_compactor.render(session_key, conversation_history)
+    
+    prompt = f"""{interviewer_preamble(role, persona)}
+
+Symbolic Reasoning Context:
+- Your persona focuses on these skills: {skills_context}
+- Recommended question topics for your persona: {topics_context}
+
+So far in this interview, you have asked the following questions and received these answers:
+
+{conversation_text}
+You have two tasks.
+
+Task 1: Generate the next question (Question {question_number}) that:
+1. Naturally follows from what the candidate has shared - build on their previous answers
+2. Is appropriate for a {role} role
+3. Matches your interviewer avatar style and focuses on assessing: {skills_context}
+4. Is clear, concise, and ready to ask directly
+
+Task 2: As an expert interview coach, evaluate the candidate's latest answer (to "{latest.get('question', '')}") on three dimensions (score each 1-5):
+1. Clarity: How clear, well-structured, and easy to understand is the answer?
+2. Specificity: How many concrete examples, numbers, metrics, tools, or specific details are included?
+3. Confidence: How confident, assertive, and decisive does the candidate sound?
+
+Provide your response in this exact JSON format, with the fields in this order:
+{{
+    "next_question": "<the question text only>",
+    "clarity": <integer 1-5>,
+    "specificity": <integer 1-5>,
+    "confidence": <integer 1-5>,
+    "feedback": "<2-3 sentences of constructive feedback focusing on what to improve>",
+    "improved_answer": "<A complete improved version of the answer with specific examples, numbers, and concrete details>"
+}}"""
+
+    question_ready: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    async def consume() -> None:
+        fields = StreamingJsonFields()
+        try:
+            async for delta in asi.stream_chat(
+                prompt, temperature=FUSED_TEMPERATURE, priority=PRIORITY_QUESTION, max_wait=ASI_QUESTION_MAX_WAIT
+            ):
+                completed = fields.feed(delta)
+                if "next_question" in completed and not question_ready.done():
+                    question = str(completed["next_question"]).strip('"').strip("'").strip()
+                    if question.startswith("**"):
+                        question = question.replace("**", "")
+                    question_ready.set_result(question or None)
+        except (AsiError, ValueError) as e:
+            # ValueError: e.g. an invalid escape in the streamed JSON
+            print(f"ASI API error in fused evaluation + question: {e}")
+        except Exception as e:
+            # Whatever went wrong, fall through so the answer still gets evaluated
+            print(f"Fused evaluation + question failed: {e!r}")
+        finally:
+            if not question_ready.done():
+                question_ready.set_result(None)
+        
+        # Don't let this save race the handler's save of the same session
+        await turn_saved.wait()
+        if asyncio.current_task() not in FUSED_EVALUATIONS.get(session_key, ()):
+            # The session was restarted or stopped meanwhile
+            return
+        try:
+            scores = {key: _clamp_score(fields.values[key]) for key in ("clarity", "specificity", "confidence")}
+        except (KeyError, TypeError, ValueError):
+            ctx.logger.info("Fused reply had no usable scores; asking the evaluator agent")
+            try:
+                await send_evaluation_request(
+                    ctx,
+                    user_address=user_address,
+                    question=latest.get("question", ""),
+                    answer=latest.get("answer", ""),
+                    persona=persona,
+                    session_key=session_key,
+                    role=role,
+                )
+            except Exception as e:
+                ctx.logger.warning(f"Evaluation request failed: {e}")
+            return
+        
+        try:
+            await record_evaluation(ctx, session_key, user_address, {
+                "question": latest.get("question", ""),
+                "answer": latest.get("answer", ""),
+                **scores,
+                "overall_score": round(sum(scores.values()) / 3.0, 2),
+                "feedback": fields.values.get("feedback", "No specific feedback provided."),
+                "improved_answer": fields.values.get("improved_answer", ""),
+            })
+        except Exception as e:
+            ctx.logger.error(f"Failed to record fused evaluation: {e}")
+
+    task = asyncio.create_task(consume())
+    FUSED_EVALUATIONS.setdefault(session_key, set()).add(task)
+    task.add_done_callback(lambda done: _forget_fused_evaluation(session_key, done))
+    return await question_ready
+
+
 # -------------------------------------------------------
 # ChatMessage Handler
 # -------------------------------------------------------
@@ -760,6 +1460,7 @@ async def send_evaluation_request(
 async def on_chat_message(ctx: Context, sender: str, msg: ChatMessage):
     ctx.logger.info(f"Got ChatMessage from {sender}: {msg}")
 
+    session_key = None
     try:
         # Always ACK
         await ctx.send(
@@ -771,6 +1472,8 @@ async def on_chat_message(ctx: Context, sender: str, msg: ChatMessage):
         )
 
         session_key = get_session_key(sender, msg)
+        # Flushes by other handlers meanwhile skip this session until the turn is over
+        get_session_store(ctx).begin(session_key)
         session = load_session(ctx, session_key)
 
         # Split incoming content types
@@ -801,11 +1504,14 @@ async def on_chat_message(ctx: Context, sender: str, msg: ChatMessage):
             return
 
         if user_text == "stop":
+            cancel_speculative_draft(session_key)
+            cancel_fused_evaluations(session_key)
+            history_compactor.forget(session_key)
             session.finished = True
             save_session(ctx, session_key, session)
             
             if session.evaluations and len(session.evaluations) > 0:
-                summary = generate_end_of_interview_summary(session)
+                summary = await build_final_report(session)
                 if summary:
                     await ctx.send(sender, make_text_message(summary))
             else:
@@ -817,6 +1523,10 @@ async def on_chat_message(ctx: Context, sender: str, msg: ChatMessage):
 
         # Restart command - resets session and history
         if user_text == "restart":
+            cancel_speculative_draft(session_key)
+            cancel_pending_evaluations(session_key)
+            cancel_fused_evaluations(session_key)
+            history_compactor.forget(session_key)
             # Reset session state
             session = SessionState(role=None, persona=None, question_index=0, finished=False, answers=[], evaluations=[], questions=[], conversation_history=[])
             save_session(ctx, session_key, session)
@@ -849,6 +1559,7 @@ async def on_chat_message(ctx: Context, sender: str, msg: ChatMessage):
             session.finished = False
             session.answers = []
             session.evaluations = []
+            session.scores = None
             session.questions = []
             session.conversation_history = []
 
@@ -901,6 +1612,7 @@ async def on_chat_message(ctx: Context, sender: str, msg: ChatMessage):
             session.finished = False
             session.answers = []
             session.evaluations = []
+            session.scores = None
             session.questions = []
             session.conversation_history = []
 
@@ -940,10 +1652,12 @@ async def on_chat_message(ctx: Context, sender: str, msg: ChatMessage):
             intro_message = persona_intros.get(persona_choice, f"You selected the {persona_choice} interviewer. Let's begin your mock interview.")
             await ctx.send(sender, make_text_message(intro_message))
 
-            # Generate the first, broad opening question
+            # Generate the first, broad opening question (streamed to the user as it is written)
+            stream = ChatTextStream(ctx, sender) if STREAM_QUESTIONS else None
             first_question = await generate_first_question_with_asi(
                 role=session.role,
-                persona=persona_choice
+                persona=persona_choice,
+                stream=stream,
             )
             
             # Store the first question
@@ -952,8 +1666,12 @@ async def on_chat_message(ctx: Context, sender: str, msg: ChatMessage):
             session.questions.append(first_question)
             save_session(ctx, session_key, session)
             
-            # Send the first question
-            await ctx.send(sender, make_text_message(first_question))
+            # Send the first question (unless it was already streamed)
+            if stream is None or not stream.sent:
+                await ctx.send(sender, make_text_message(first_question))
+            
+            # Start drafting question 2 while the candidate answers
+            start_speculative_draft(session_key, session)
             return
 
         # Persona already chosen → treat text as an answer
@@ -990,20 +1708,25 @@ async def on_chat_message(ctx: Context, sender: str, msg: ChatMessage):
         # Save session before sending evaluation (so we can track which question was answered)
         save_session(ctx, session_key, session)
 
+        # In fused mode the answer is evaluated by the same ASI call that
+        # writes the next question (when there is one)
+        fused = FUSED_TURNS and session.question_index + 1 < QUESTIONS_PER_SESSION
+
         # Send evaluation to evaluator agent (silently, in background)
         # The evaluation will be stored when it comes back, but we don't wait for it
-        try:
-            await send_evaluation_request(
-                ctx,
-                user_address=sender,
-                question=current_q,
-                answer=user_text,
-                persona=session.persona,
-                session_key=session_key,
-                role=session.role,
-            )
-        except Exception as e:
-            ctx.logger.warning(f"Evaluation request failed (will continue interview): {e}")
+        if not fused:
+            try:
+                await send_evaluation_request(
+                    ctx,
+                    user_address=sender,
+                    question=current_q,
+                    answer=user_text,
+                    persona=session.persona,
+                    session_key=session_key,
+                    role=session.role,
+                )
+            except Exception as e:
+                ctx.logger.warning(f"Evaluation request failed (will continue interview): {e}")
 
         # Move to next question immediately (natural interview flow)
         session.question_index += 1
@@ -1011,6 +1734,7 @@ async def on_chat_message(ctx: Context, sender: str, msg: ChatMessage):
         # Check if we've completed all questions
         if session.question_index >= QUESTIONS_PER_SESSION:
             # Interview is complete - mark as finished
+            history_compactor.forget(session_key)
             session.finished = True
             save_session(ctx, session_key, session)
             
@@ -1030,23 +1754,41 @@ async def on_chat_message(ctx: Context, sender: str, msg: ChatMessage):
             # Get conversation history for adaptive generation
             conversation_history = session.conversation_history or []
             
-            # Generate next question adaptively based on previous answers
-            next_q = await generate_next_adaptive_question(
-                role=session.role,
-                persona=session.persona,
-                conversation_history=conversation_history,
-                question_number=next_question_number
-            )
-            
-            # Store the new question
-            if session.questions is None:
-                session.questions = []
-            session.questions.append(next_q)
+            stream = ChatTextStream(ctx, sender) if STREAM_QUESTIONS else None
+            turn_saved = asyncio.Event()
+            try:
+                next_q = None
+                if fused:
+                    next_q = await evaluate_and_ask_next_with_asi(
+                        ctx, session_key, sender, session, next_question_number, turn_saved
+                    )
+                if next_q is None:
+                    # Generate next question adaptively based on previous answers
+                    # (starting from the speculative draft when there is one)
+                    next_q = await next_question_with_speculation(
+                        session_key=session_key,
+                        role=session.role,
+                        persona=session.persona,
+                        conversation_history=conversation_history,
+                        question_number=next_question_number,
+                        stream=stream,
+                    )
+                
+                # Store the new question
+                if session.questions is None:
+                    session.questions = []
+                session.questions.append(next_q)
+                
+                save_session(ctx, session_key, session)
+            finally:
+                turn_saved.set()
             
-            save_session(ctx, session_key, session)
+            # Send the next question immediately (natural flow), unless it was streamed
+            if stream is None or not stream.sent:
+                await ctx.send(sender, make_text_message(next_q))
             
-            # Send the next question immediately (natural flow)
-            await ctx.send(sender, make_text_message(next_q))
+            # Start drafting the one after it while the candidate answers
+            start_speculative_draft(session_key, session)
         
         return
 
@@ -1091,6 +1833,11 @@ async def on_chat_message(ctx: Context, sender: str, msg: ChatMessage):
             )
         except:
             pass  # If we can't send error message, at least log it
+    finally:
+        # One write of this message's session changes
+        if session_key is not None:
+            get_session_store(ctx).end(session_key)
+        flush_sessions(ctx)
 
 
 # -------------------------------------------------------
@@ -1118,20 +1865,23 @@ async def on_evaluation_response(ctx: Context, sender: str, msg: EvaluationRespo
     """
     ctx.logger.info(f"Got EvaluationResponse from {sender}: {msg}")
 
-    # Retrieve session key from storage
-    session_key = ctx.storage.get(f"eval_session:{msg.user_address}")
-    if not session_key:
-        ctx.logger.warning(f"Could not find session key for user {msg.user_address}")
-        # Fallback: try to construct session key
+    pending = None
+    if msg.request_id is None:
+        if msg.partial:
+            # Can't be matched with the full response that follows
+            return
+        # Evaluator without request IDs: assume the user's default session
+        ctx.logger.warning(f"EvaluationResponse without a request ID for user {msg.user_address}")
         session_key = f"session:sender:{msg.user_address}"
+    else:
+        pending = PENDING_EVALUATIONS.get(msg.request_id)
+        if pending is None:
+            # Timed out (already scored locally), its session was restarted,
+            # or the scores of a request whose full response came first
+            ctx.logger.warning(f"Dropping stale EvaluationResponse for request {msg.request_id}")
+            return
+        session_key = pending.session_key
 
-    # Load the session
-    session = load_session(ctx, session_key)
-
-    # Store evaluation data silently (no user feedback during interview)
-    if session.evaluations is None:
-        session.evaluations = []
-    
     evaluation_data = {
         "question": msg.question,
         "answer": msg.answer,
@@ -1142,37 +1892,60 @@ async def on_evaluation_response(ctx: Context, sender: str, msg: EvaluationRespo
         "feedback": msg.feedback,
         "improved_answer": msg.improved_answer,
     }
-    session.evaluations.append(evaluation_data)
-    
-    # Log complete Q&A with evaluation to user history
-    log_question_answer_evaluation(
-        user_address=msg.user_address,
-        question=msg.question,
-        answer=msg.answer,
-        clarity=msg.clarity,
-        specificity=msg.specificity,
-        confidence=msg.confidence,
-        overall_score=msg.overall_score
+    if msg.partial:
+        # The scores streamed in ahead of the improved answer: log them now
+        # (and keep them in case the full response never comes); the
+        # session and its report get the evaluation with the full response
+        if pending.scores is None:
+            pending.scores = evaluation_data
+            log_evaluation_scores(load_session(ctx, session_key), msg.user_address, evaluation_data)
+        return
+    if pending is not None:
+        del PENDING_EVALUATIONS[msg.request_id]
+    await record_evaluation(
+        ctx, session_key, msg.user_address, evaluation_data, scores_logged=pending is not None and pending.scores is not None
     )
     
-    # Save session with updated evaluations
-    save_session(ctx, session_key, session)
-    
-    # If interview is finished, check if we should send the final report
-    if session.finished:
-        # Send report if we have evaluations (even if not all are complete, in case some failed)
-        if session.evaluations and len(session.evaluations) > 0:
-            # Check if this is likely the last evaluation (we have as many as questions answered)
-            # or if we've been waiting and have at least some evaluations
-            num_answers = len(session.answers) if session.answers else 0
-            if len(session.evaluations) >= num_answers or len(session.evaluations) >= QUESTIONS_PER_SESSION:
-                summary = generate_end_of_interview_summary(session)
-                await ctx.send(msg.user_address, make_text_message(summary))
-    
     # Note: We don't send any feedback to the user here - evaluations are stored silently
     # The interview flow continues naturally with questions, and all feedback is in the final report
 
 
+@agent.on_interval(period=15.0)
+async def check_pending_evaluations(ctx: Context):
+    await expire_pending_evaluations(ctx)
+
+
+@agent.on_interval(period=ANALYTICS_FLUSH_PERIOD)
+async def flush_analytics(ctx: Context):
+    try:
+        analytics.flush()
+    except OSError as e:
+        ctx.logger.error(f"Failed to write interview analytics: {e}")
+
+
+@agent.on_interval(period=60.0)
+async def log_asi_metrics(ctx: Context):
+    ctx.logger.info(f"ASI scheduler: {asi.metrics()}")
+    ctx.logger.info(f"Pending evaluations: {len(PENDING_EVALUATIONS)}")
+    ctx.logger.info(f"ASI response cache: {response_cache.stats()}")
+    ctx.logger.info(f"Session store: {get_session_store(ctx).metrics()}")
+    ctx.logger.info(f"Interview history: {interview_history.metrics()}")
+    ctx.logger.info(f"Interview analytics: {analytics.metrics()}")
+
+
+@agent.on_event("shutdown")
+async def on_shutdown(ctx: Context):
+    try:
+        get_session_store(ctx).close()
+    except Exception as e:
+        ctx.logger.error(f"Failed to persist sessions: {e}")
+    await asi.close()
+    response_cache.close()
+    interview_history.close()
+    analytics.close()
+    interview_kg.close()
+
+
 agent.include(chat_proto, publish_manifest=True)
 agent.include(eval_client_proto)
 
@@ -4,9 +4,11 @@ Interview Knowledge Graph wrapper using pure Python MeTTa simulation.
 Compatible with Agentverse (no binary dependencies).
 """
 
+from collections import defaultdict
 from typing import List, Optional, Dict, Tuple
 from metta_sim import (
     KnowledgeGraph,
+    GraphPartitions,
     get_focus_skills,
     get_question_skills,
     get_followup_question,
@@ -14,6 +16,7 @@ from metta_sim import (
     get_topics_for_skills,
     get_role_requirements,
     get_skill_prerequisites,
+    get_transitive_prerequisites,
     get_persona_skills_for_question,
     suggest_next_question_topic,
 )
@@ -22,9 +25,55 @@ class InterviewKG:
     """
     Wrapper class for interview knowledge graph queries.
     Uses pure Python MeTTa simulation instead of Hyperon.
+
+    Domain facts live in the shared graph. Each candidate's facts live in
+    their own small partition, as (candidate_mentioned Skill Evidence), so
+    per-candidate queries only touch that candidate's facts. Idle candidates
+    are evicted from memory after `candidate_ttl` seconds, and the least
+    recently active ones once `max_candidates` or `max_candidate_facts` is
+    exceeded.
+
+    With a `candidate_dir`, partitions are persisted there (snapshot + WAL
+    per candidate), so candidate facts survive eviction and restarts;
+    without one they are kept in memory only.
     """
-    def __init__(self, kg: KnowledgeGraph):
+    def __init__(
+        self,
+        kg: KnowledgeGraph,
+        candidate_ttl: Optional[float] = 3600.0,
+        max_candidates: int = 1024,
+        max_candidate_facts: int = 100_000,
+        candidate_dir: Optional[str] = None,
+    ):
         self.kg = kg
+        self.candidates = GraphPartitions(
+            ttl=candidate_ttl,
+            max_partitions=max_candidates,
+            max_facts=max_candidate_facts,
+            path=candidate_dir,
+        )
+        # Candidate facts an older snapshot still holds in the shared graph,
+        # read once here and copied into a candidate's partition when it is created
+        self._legacy: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        for user_address, skill, evidence in kg.query("candidate_mentioned", "$user", "$skill", "$evidence"):
+            self._legacy[user_address].append((skill, evidence))
+
+    def _candidate_graph(self, user_address: str, create: bool = False) -> Optional[KnowledgeGraph]:
+        """
+        The candidate's partition (from memory or disk). A new one is seeded
+        with the candidate's legacy facts, if any.
+        """
+        graph = self.candidates.peek(user_address)
+        if graph is not None:
+            return graph
+        legacy = self._legacy.get(user_address, ())
+        if not legacy and not create:
+            return None
+        graph = self.candidates.get(user_address)
+        with graph.batch():
+            for skill, evidence in legacy:
+                graph.add_atom("candidate_mentioned", skill, evidence)
+        return graph
 
     def get_focus_skills(self, persona: str) -> List[str]:
         """Get all focus skills for a given persona."""
@@ -54,6 +103,10 @@ class InterviewKG:
         """Get prerequisites for a given skill."""
         return get_skill_prerequisites(self.kg, skill)
 
+    def get_transitive_prerequisites(self, skill: str) -> List[str]:
+        """Get direct and indirect prerequisites for a given skill."""
+        return get_transitive_prerequisites(self.kg, skill)
+
     def get_question_skills(self, qid: str) -> List[str]:
         """Get all skills assessed by a question ID."""
         return get_question_skills(self.kg, qid)
@@ -65,16 +118,29 @@ class InterviewKG:
     def add_candidate_skill(self, user_address: str, skill: str, evidence: str):
         """
         Add a fact that candidate mentioned a skill.
-        (candidate_mentioned User Skill Evidence)
+        (candidate_mentioned Skill Evidence) in the candidate's partition
         """
-        self.kg.add_atom("candidate_mentioned", user_address, skill, evidence)
+        self._candidate_graph(user_address, create=True).add_atom("candidate_mentioned", skill, evidence)
+        self.candidates.enforce_limits()
+
+    def forget_candidate(self, user_address: str) -> bool:
+        """Drop a candidate's facts (e.g. once their interview is over)."""
+        legacy = self._legacy.pop(user_address, None)
+        return self.candidates.drop(user_address) or bool(legacy)
+
+    def close(self):
+        """Write the candidate partitions out (persistent ones) and release them."""
+        self.candidates.close()
 
     def get_candidate_skills(self, user_address: str) -> List[Tuple[str, str]]:
         """
         Get all skills mentioned by candidate with evidence.
         Returns list of (skill, evidence) tuples.
         """
-        results = self.kg.query("candidate_mentioned", user_address, "$skill", "$evidence")
+        graph = self._candidate_graph(user_address)
+        if graph is None:
+            return []
+        results = graph.query("candidate_mentioned", "$skill", "$evidence")
         return [(r[0], r[1]) for r in results]
 
     def analyze_skill_gaps(self, user_address: str, role: str) -> Dict[str, List[str]]:
@@ -83,7 +149,7 @@ class InterviewKG:
         Returns dict with:
         - 'mentioned': skills candidate mentioned
         - 'missing': required skills not mentioned
-        - 'missing_prerequisites': prerequisites of mentioned skills that are missing
+        - 'missing_prerequisites': prerequisites (direct or transitive) of mentioned skills that are missing
         """
         mentioned_skills = [skill for skill, _ in self.get_candidate_skills(user_address)]
         required_skills = [skill for skill, _ in self.get_role_requirements(role)]
@@ -93,14 +159,17 @@ class InterviewKG:
         
         missing = [skill for skill in required_set if skill not in mentioned_set]
         
-        # Check for missing prerequisites
-        missing_prereqs = []
-        for skill in mentioned_skills:
-            prereqs = self.get_skill_prerequisites(skill)
-            for prereq in prereqs:
-                if prereq not in mentioned_set and prereq in required_set:
-                    if prereq not in missing_prereqs:
-                        missing_prereqs.append(prereq)
+        # Check for missing prerequisites: required prerequisites of mentioned skills.
+        # The candidate's skills seed the join over the shared domain graph.
+        prereq_rows = self.kg.query_all(
+            [
+                ("requires_transitively", "$skill", "$prereq"),
+                ("role_requires", role, "$prereq", "_"),
+            ],
+            ["$prereq"],
+            bindings=[{"$skill": skill} for skill in mentioned_set],
+        )
+        missing_prereqs = [prereq for (prereq,) in prereq_rows if prereq not in mentioned_set]
         
         return {
             'mentioned': mentioned_skills,
@@ -4,12 +4,27 @@ Knowledge graph builder using pure Python MeTTa simulation.
 Works in restricted environments like Agentverse (no binary dependencies).
 """
 
-from metta_sim import build_interview_kg as _build_interview_kg, KnowledgeGraph
+import os
+from typing import Optional
 
-def build_interview_kg() -> KnowledgeGraph:
+from metta_sim import build_interview_kg as _build_interview_kg, open_interview_kg, KnowledgeGraph
+
+# Optional snapshot file. When set, the graph is memory-mapped from disk at
+# startup and changes to it persist across restarts.
+KG_SNAPSHOT_PATH = os.getenv("INTERVIEW_KG_SNAPSHOT")
+
+# Where InterviewKG persists its per-candidate partitions (one snapshot + WAL
+# per candidate). Defaults to a directory next to the snapshot; with neither
+# set, candidate facts are kept in memory only.
+KG_CANDIDATES_DIR = os.getenv("INTERVIEW_KG_CANDIDATES_DIR") or (
+    KG_SNAPSHOT_PATH + ".candidates" if KG_SNAPSHOT_PATH else None
+)
+
+def build_interview_kg(snapshot_path: Optional[str] = KG_SNAPSHOT_PATH) -> KnowledgeGraph:
     """
     Build the interview knowledge graph with domain facts.
     Uses pure Python MeTTa simulation instead of Hyperon.
     """
+    if snapshot_path:
+        return open_interview_kg(snapshot_path)
     return _build_interview_kg()
-
@@ -0,0 +1,174 @@
+# prompts.py
+"""
+Prompt building for the interviewer agent.
+
+- PERSONA_DESCRIPTIONS: the one copy of the persona texts (the question
+  generators used to carry three copies, one of them with keys that never
+  matched the canonical persona names).
+- interviewer_preamble(): the persona part of a prompt, built once per
+  (role, persona) and reused for every question.
+- HistoryCompactor: renders conversation history within a token budget.
+  The most recent turns are kept verbatim; older turns are folded into a
+  short extractive summary, built incrementally and cached per session, so
+  a prompt's size stays bounded however long the interview runs.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional
+import re
+
+PERSONA_DESCRIPTIONS: Dict[str, str] = {
+    "HR": "You are an HR interviewer focusing on culture fit, communication, and basic role alignment. You check whether the candidate's values, attitude, and behaviour match the company culture. You verify basic qualifications, work eligibility, and salary expectations. You assess soft skills: communication, teamwork, professionalism. Your style is friendly, structured, and policy-minded. You ask open questions and pay close attention to how clearly and honestly the candidate answers.",
+    "Junior Developer": "You are a junior developer interviewer, relatively early in your own career and closer to the candidate's level. You understand the practical realities of junior work. You test basic technical understanding and problem-solving skills. You see how the candidate collaborates and explains ideas to peers. You evaluate willingness to learn, ask questions, and accept feedback. Your style is informal and collaborative. You often use simpler, concrete questions and may share your own experiences. You're less intimidating, but still notice whether the candidate is curious, humble, and logical.",
+    "Senior Developer": "You are a senior developer or tech lead interviewer, deeply technical and responsible for system quality and team productivity. You assess depth of technical knowledge and reasoning, not just memorised answers. You evaluate how the candidate designs, scales, and maintains systems in the real world. You check code quality, trade-off thinking, and ability to mentor or be mentored. Your style is direct, analytical, and detail-oriented. You ask scenario-based and 'why?' questions, dig into design decisions, edge cases, and trade-offs. You're less interested in buzzwords, more in how the candidate thinks under pressure and explains their solutions.",
+    "Corporate Executive": "You are a corporate executive interviewer (e.g., CTO, VP, founder) who cares about the 'big picture': business impact, risk, and long-term value. You understand how the candidate contributes to business goals, not just code. You gauge leadership potential, judgement, and maturity. You assess whether the candidate can represent the company well with clients and stakeholders. Your style is high-level, strategic, and time-efficient. You ask broad, probing questions and focus on clarity, confidence, ownership, and alignment with the company's mission.",
+}
+
+DEFAULT_PERSONA_DESCRIPTION = "professional and standard interviewer"
+
+# Token budgets for the conversation part of adaptive question prompts
+HISTORY_TOKEN_BUDGET = 700
+SUMMARY_TOKEN_BUDGET = 250
+
+# Per-turn limits for summarized (older) turns
+SUMMARY_QUESTION_WORDS = 14
+SUMMARY_ANSWER_WORDS = 30
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English prose)."""
+    return len(text) // 4 + 1
+
+
+def persona_description(persona: str) -> str:
+    return PERSONA_DESCRIPTIONS.get(persona, DEFAULT_PERSONA_DESCRIPTION)
+
+
+@lru_cache(maxsize=64)
+def interviewer_preamble(role: str, persona: str) -> str:
+    """The "who you are" opening shared by the question prompts."""
+    return (
+        f"You are an expert interviewer conducting an interview for a {role} position.\n\n"
+        f"You are acting as: {persona_description(persona)}"
+    )
+
+
+def _clip_words(text: str, limit: int) -> str:
+    words = text.split()
+    return " ".join(words[:limit]) + (" ..." if len(words) > limit else "")
+
+
+def format_turn(number: int, qa: Dict[str, str]) -> str:
+    """A turn as the prompts show it verbatim."""
+    return f"Question {number}: {qa.get('question', '')}\nAnswer {number}: {qa.get('answer', '')}\n\n"
+
+
+def summarize_turn(number: int, qa: Dict[str, str]) -> str:
+    """One-line extractive summary: the question and the answer's opening sentence."""
+    answer = (qa.get("answer") or "").strip()
+    first_sentence = _SENTENCE_END.split(answer, 1)[0] if answer else "(no answer)"
+    return (
+        f"- Q{number}: {_clip_words(qa.get('question', ''), SUMMARY_QUESTION_WORDS)} "
+        f"| A: {_clip_words(first_sentence, SUMMARY_ANSWER_WORDS)}"
+    )
+
+
+@dataclass
+class _SessionSummary:
+    # Summary lines for turns [0, len(lines)) of the session's history
+    lines: List[str] = field(default_factory=list)
+    # Text of the turns those lines were made from, to notice a reset history
+    questions: List[str] = field(default_factory=list)
+
+
+class HistoryCompactor:
+    """
+    Renders a conversation history within `budget` tokens.
+
+    Turns are taken verbatim from the newest backwards until the budget is
+    used up; everything older becomes one summary line per turn, computed
+    once per turn and cached per session. If the summary itself outgrows
+    `summary_budget`, its oldest lines are dropped.
+
+    Example:
+        compactor = HistoryCompactor()
+        text = compactor.render(session_key, session.conversation_history)
+        compactor.forget(session_key)  # when the interview ends
+    """
+
+    def __init__(
+        self,
+        budget: int = HISTORY_TOKEN_BUDGET,
+        summary_budget: int = SUMMARY_TOKEN_BUDGET,
+        max_sessions: int = 4096,
+    ):
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, _SessionSummary]" = OrderedDict()
+
+    def _summary_lines(self, session_key: Optional[str], history: List[Dict[str, str]], upto: int) -> List[str]:
+        """Summary lines for history[:upto], reusing the cached ones."""
+        if session_key is None:
+            return [summarize_turn(number, history[number - 1]) for number in range(1, upto + 1)]
+        state = self._sessions.get(session_key)
+        if state is None or state.questions != [qa.get("question", "") for qa in history[:len(state.questions)]]:
+            state = _SessionSummary()
+        self._sessions[session_key] = state
+        self._sessions.move_to_end(session_key)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+        for number in range(len(state.lines) + 1, upto + 1):
+            qa = history[number - 1]
+            state.lines.append(summarize_turn(number, qa))
+            state.questions.append(qa.get("question", ""))
+        return state.lines[:upto]
+
+    def render(self, session_key: Optional[str], history: List[Dict[str, str]]) -> str:
+        """The history as prompt text (no caching without a session_key)."""
+        # Newest turns verbatim, as many as fit (always at least the last one,
+        # with its answer clipped if it alone is over budget)
+        verbatim_budget = self.budget - self.summary_budget
+        verbatim: List[str] = []
+        used = 0
+        start = len(history)
+        while start > 0:
+            turn = format_turn(start, history[start - 1])
+            cost = estimate_tokens(turn)
+            if not verbatim and cost > verbatim_budget:
+                qa = dict(history[start - 1])
+                qa["answer"] = _clip_words(qa.get("answer", ""), verbatim_budget * 3 // 4)
+                turn = format_turn(start, qa)
+                cost = estimate_tokens(turn)
+            elif verbatim and used + cost > verbatim_budget:
+                break
+            verbatim.append(turn)
+            used += cost
+            start -= 1
+        verbatim.reverse()
+        if start == 0:
+            return "".join(verbatim)
+
+        lines = self._summary_lines(session_key, history, start)
+        kept: List[str] = []
+        summary_used = 0
+        for line in reversed(lines):
+            cost = estimate_tokens(line)
+            if summary_used + cost > self.summary_budget:
+                break
+            kept.append(line)
+            summary_used += cost
+        kept.reverse()
+        omitted = len(lines) - len(kept)
+        header = f"Summary of Questions 1-{start}"
+        if omitted:
+            header += f" ({omitted} earliest not shown)"
+        return header + ":\n" + "\n".join(kept) + "\n\nMost recent questions and answers:\n\n" + "".join(verbatim)
+
+    def forget(self, session_key: str) -> None:
+        self._sessions.pop(session_key, None)
@@ -0,0 +1,344 @@
+# resilience.py
+"""
+Retries, circuit breaking, adaptive timeouts and hedged requests for ASI calls.
+
+A call used to get one attempt with a fixed 30s timeout, so one stalled
+connection could keep a candidate waiting for 30 seconds before the
+fallback kicked in. Resilience wraps each call instead:
+
+- the per-attempt timeout follows the observed latency (p99 x a margin,
+  clamped to [min_timeout, max_timeout]) instead of a fixed worst case;
+- network errors, timeouts, 429s and 5xx responses are retried with
+  jittered exponential backoff (honouring Retry-After); malformed replies
+  are not, as the endpoint did answer;
+- after `failure_threshold` endpoint failures in a row the circuit opens
+  and calls fail fast with CircuitOpen until a probe call succeeds;
+- optionally, if a call hasn't answered by the p95 latency, a duplicate
+  is sent (if the scheduler has a slot for it) and whichever answers
+  first wins.
+
+Plug it into the scheduler so every scheduled call gets it:
+
+    asi = AsiScheduler(AsiClient(ASI_API_KEY), resilience=Resilience(hedge=True))
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from asi_client import AsiError, AsiMalformedResponse, AsiOverloaded
+
+T = TypeVar("T")
+
+
+class CircuitOpen(AsiError):
+    """The endpoint failed repeatedly; calls fail fast until it recovers."""
+
+
+def is_endpoint_failure(error: AsiError) -> bool:
+    """Network error, timeout or 5xx: the endpoint itself is unhealthy."""
+    if isinstance(error, (AsiOverloaded, CircuitOpen, AsiMalformedResponse)):
+        return False
+    return error.status is None or error.status >= 500
+
+
+def is_retryable(error: AsiError) -> bool:
+    return is_endpoint_failure(error) or error.status == 429
+
+
+class LatencyTracker:
+    """Sliding window of call latencies (seconds)."""
+
+    def __init__(self, window: int = 256, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """The p-th percentile, or None until min_samples calls were seen."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))]
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive endpoint failures;
+    open -> half_open after `reset_timeout` seconds, letting one probe call
+    through; the probe's outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def before_call(self) -> None:
+        """Raise CircuitOpen if the call may not go out."""
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpen("ASI endpoint circuit is open; failing fast")
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                raise CircuitOpen("ASI endpoint circuit is half-open; probe in flight")
+            self._probing = True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            self.state = "open"
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self) -> None:
+        """The call was abandoned without an outcome (e.g. cancelled)."""
+        self._probing = False
+
+
+class Resilience:
+    """
+    Retry / timeout / circuit-breaker / hedging policy for one endpoint.
+
+    `call()` and `stream()` take a factory that starts a fresh request each
+    time it's called. `pace`, if given, is awaited before every extra
+    request (retries and hedges), so they respect the scheduler's rate
+    limit. A hedge is only sent if `try_acquire()` (if given) grants it a
+    concurrency slot of its own, which is handed back with `release()`.
+    Streams are retried only until their first chunk arrives, and are
+    never hedged.
+    """
+
+    def __init__(
+        self,
+        retry_attempts: int = 3,
+        base_delay: float = 0.25,
+        max_delay: float = 4.0,
+        min_timeout: float = 2.0,
+        max_timeout: float = 30.0,
+        timeout_multiplier: float = 2.0,
+        hedge: bool = False,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.retry_attempts = retry_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.hedge = hedge
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        # Time to the first chunk of a stream
+        self.first_chunk = LatencyTracker()
+        self._counts: Dict[str, int] = {
+            "attempts": 0, "retries": 0, "timeouts": 0, "short_circuited": 0, "hedges": 0, "hedge_wins": 0,
+            "hedges_skipped": 0,
+        }
+
+    def timeout(self, tracker: Optional[LatencyTracker] = None) -> float:
+        """Per-attempt timeout from the observed p99 (max_timeout until there is data)."""
+        p99 = (tracker or self.latency).percentile(99)
+        if p99 is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, p99 * self.timeout_multiplier))
+
+    def backoff(self, attempt: int, error: AsiError) -> float:
+        """Full-jitter exponential backoff, at least the server's Retry-After."""
+        delay = random.uniform(0.0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, error.retry_after or 0.0)
+
+    def _before_attempt(self) -> None:
+        try:
+            self.breaker.before_call()
+        except CircuitOpen:
+            self._counts["short_circuited"] += 1
+            raise
+        self._counts["attempts"] += 1
+
+    def _settle(self, error: Optional[BaseException]) -> None:
+        """Feed an attempt's outcome to the circuit breaker."""
+        if error is None:
+            self.breaker.record_success()
+        elif isinstance(error, AsiError):
+            if is_endpoint_failure(error):
+                self.breaker.record_failure()
+            else:
+                # A 4xx or a malformed reply means the endpoint is up
+                self.breaker.record_success()
+        else:
+            self.breaker.release()
+
+    async def _paced(
+        self,
+        call: Callable[[], Awaitable[T]],
+        pace: Optional[Callable[[], Awaitable[None]]],
+        release: Optional[Callable[[], None]] = None,
+    ) -> T:
+        try:
+            if pace is not None:
+                await pace()
+            return await call()
+        finally:
+            if release is not None:
+                release()
+
+    async def _hedged(
+        self,
+        call: Callable[[], Awaitable[T]],
+        pace: Optional[Callable[[], Awaitable[None]]],
+        hedge_after: float,
+        timeout: float,
+        try_acquire: Optional[Callable[[], bool]],
+        release: Optional[Callable[[], None]],
+    ) -> T:
+        """Run `call`; if it hasn't answered after `hedge_after`, race a duplicate."""
+        deadline = time.monotonic() + timeout
+        primary = asyncio.ensure_future(call())
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=min(hedge_after, timeout))
+            if not done and time.monotonic() < deadline:
+                if try_acquire is None or try_acquire():
+                    self._counts["hedges"] += 1
+                    tasks.add(asyncio.ensure_future(self._paced(call, pace, release if try_acquire else None)))
+                else:
+                    # No free slot: a hedge would push past max_in_flight
+                    self._counts["hedges_skipped"] += 1
+            error: Optional[BaseException] = None
+            while tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                done, _ = await asyncio.wait(tasks, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError
+                for task in done:
+                    tasks.discard(task)
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._counts["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _attempt(
+        self,
+        call: Callable[[], Awaitable[T]],
+        pace: Optional[Callable[[], Awaitable[None]]],
+        try_acquire: Optional[Callable[[], bool]],
+        release: Optional[Callable[[], None]],
+    ) -> T:
+        self._before_attempt()
+        timeout = self.timeout()
+        hedge_after = self.latency.percentile(95) if self.hedge else None
+        started = time.monotonic()
+        try:
+            if hedge_after is not None:
+                result = await self._hedged(call, pace, hedge_after, timeout, try_acquire, release)
+            else:
+                result = await asyncio.wait_for(call(), timeout)
+        except asyncio.TimeoutError:
+            self._counts["timeouts"] += 1
+            error = AsiError(f"ASI call timed out after {timeout:.1f}s")
+            self._settle(error)
+            raise error from None
+        except BaseException as e:
+            self._settle(e)
+            raise
+        self._settle(None)
+        self.latency.record(time.monotonic() - started)
+        return result
+
+    async def call(
+        self,
+        call: Callable[[], Awaitable[T]],
+        pace: Optional[Callable[[], Awaitable[None]]] = None,
+        try_acquire: Optional[Callable[[], bool]] = None,
+        release: Optional[Callable[[], None]] = None,
+    ) -> T:
+        """Run `call()` with timeouts, retries, circuit breaking and (optionally) hedging."""
+        for attempt in range(self.retry_attempts):
+            if attempt > 0 and pace is not None:
+                await pace()
+            try:
+                return await self._attempt(call, pace, try_acquire, release)
+            except AsiError as e:
+                if attempt + 1 >= self.retry_attempts or not is_retryable(e):
+                    raise
+                self._counts["retries"] += 1
+                await asyncio.sleep(self.backoff(attempt, e))
+        raise AssertionError("unreachable")
+
+    async def stream(
+        self,
+        open_stream: Callable[[], AsyncIterator[str]],
+        pace: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Yield from `open_stream()`, retrying a stream that fails before its
+        first chunk. Each chunk must arrive within the adaptive timeout.
+        """
+        for attempt in range(self.retry_attempts):
+            if attempt > 0 and pace is not None:
+                await pace()
+            self._before_attempt()
+            timeout = self.timeout(self.first_chunk)
+            started = time.monotonic()
+            chunks = open_stream().__aiter__()
+            yielded = False
+            outcome: Optional[BaseException] = None
+            try:
+                while True:
+                    try:
+                        delta = await asyncio.wait_for(chunks.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        break
+                    if not yielded:
+                        self.first_chunk.record(time.monotonic() - started)
+                        yielded = True
+                    yield delta
+            except asyncio.TimeoutError:
+                self._counts["timeouts"] += 1
+                outcome = AsiError(f"ASI stream stalled for {timeout:.1f}s")
+            except BaseException as e:
+                outcome = e
+            finally:
+                self._settle(outcome)
+                await chunks.aclose()
+
+            if outcome is None:
+                return
+            if yielded or not isinstance(outcome, AsiError) or attempt + 1 >= self.retry_attempts \
+                    or not is_retryable(outcome):
+                raise outcome
+            self._counts["retries"] += 1
+            await asyncio.sleep(self.backoff(attempt, outcome))
+
+    def metrics(self) -> Dict[str, Any]:
+        """Circuit state, latency percentiles, current timeout and counters."""
+        return {
+            "circuit": self.breaker.state,
+            "p50": self.latency.percentile(50),
+            "p95": self.latency.percentile(95),
+            "p99": self.latency.percentile(99),
+            "timeout": round(self.timeout(), 2),
+            "stream_timeout": round(self.timeout(self.first_chunk), 2),
+            **self._counts,
+        }
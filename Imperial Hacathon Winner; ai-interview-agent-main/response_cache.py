@@ -0,0 +1,243 @@
+# response_cache.py
+"""
+Content-addressed cache for ASI responses, backed by SQLite.
+
+Entries are keyed on the normalized prompt plus model and temperature, so
+the opening question for a (role, persona) pair or the evaluation of an
+answer someone already gave is served locally instead of paying for
+another API call. Entries expire after a TTL and the least recently used
+ones are evicted once the cache is full.
+
+An optional similarity tier catches near-duplicates: a caller can pass the
+part of the prompt that varies (e.g. the candidate's answer) as
+`similar_text`, and a cached entry in the same namespace whose text is
+close enough (cosine similarity of hashed bag-of-words vectors) is reused.
+Pure Python, so it runs anywhere the agents do.
+"""
+
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+# Hashed bag-of-words dimensions for the similarity tier
+EMBEDDING_DIMENSIONS = 256
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt."""
+    return " ".join(prompt.split()).casefold()
+
+
+def cache_key(prompt: str, model: str, temperature: float) -> str:
+    data = f"{model}\0{temperature:.3f}\0{normalize_prompt(prompt)}"
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def embed_text(text: str) -> array:
+    """
+    Unit-length hashed bag-of-words vector (unigrams and bigrams).
+    Cheap stand-in for a learned embedding: good at "same answer, slightly
+    different wording", not at paraphrases.
+    """
+    words = _WORD.findall(text.casefold())
+    vector = array("f", [0.0]) * EMBEDDING_DIMENSIONS
+    for term in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        digest = hashlib.blake2b(term.encode("utf-8"), digest_size=4).digest()
+        bucket = int.from_bytes(digest, "little")
+        vector[bucket % EMBEDDING_DIMENSIONS] += 1.0 if bucket & 0x80000000 else -1.0
+    norm = math.sqrt(sum(x * x for x in vector))
+    if norm:
+        for i in range(EMBEDDING_DIMENSIONS):
+            vector[i] /= norm
+    return vector
+
+
+def _cosine(a: array, b: array) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache with TTL, LRU eviction and an optional
+    similarity tier.
+
+    Example:
+        cache = ResponseCache("asi_cache.sqlite3", ttl=7 * 24 * 3600)
+        text = cache.get(prompt, ASI_MODEL, 0.7)
+        if text is None:
+            text = await asi.chat(prompt, temperature=0.7)
+            cache.put(prompt, ASI_MODEL, 0.7, text)
+        cache.stats()  # hits, misses, hit_rate, ...
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        ttl: Optional[float] = 7 * 24 * 3600.0,
+        max_entries: int = 10_000,
+        similarity_threshold: float = 0.92,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+        except sqlite3.Error as e:
+            # e.g. a read-only filesystem: still cache for this process
+            print(f"Response cache at {path!r} unavailable ({e}); using memory")
+            self._db = sqlite3.connect(":memory:", check_same_thread=False)
+        self._db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                namespace TEXT,
+                response TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL,
+                vector BLOB
+            );
+            CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+            CREATE INDEX IF NOT EXISTS responses_namespace ON responses (namespace);
+            """
+        )
+        self._counts: Dict[str, int] = {"hits": 0, "similar_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        # namespace -> [(key, vector)] for the similarity tier, loaded lazily
+        self._vectors: Dict[str, List[Tuple[str, array]]] = {}
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def _vectors_for(self, namespace: str) -> List[Tuple[str, array]]:
+        vectors = self._vectors.get(namespace)
+        if vectors is None:
+            vectors = []
+            rows = self._db.execute(
+                "SELECT key, vector FROM responses WHERE namespace = ? AND vector IS NOT NULL", (namespace,)
+            )
+            for key, blob in rows:
+                vector = array("f")
+                vector.frombytes(blob)
+                vectors.append((key, vector))
+            self._vectors[namespace] = vectors
+        return vectors
+
+    def _forget_vector(self, key: str, namespace: Optional[str]) -> None:
+        vectors = self._vectors.get(namespace) if namespace is not None else None
+        if vectors is not None:
+            vectors[:] = [entry for entry in vectors if entry[0] != key]
+
+    def _lookup(self, key: str, now: float) -> Optional[str]:
+        row = self._db.execute("SELECT response, created, namespace FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        response, created, namespace = row
+        if self._expired(created, now):
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._forget_vector(key, namespace)
+            return None
+        self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return response
+
+    def get(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float,
+        namespace: Optional[str] = None,
+        similar_text: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        The cached response for this prompt, or None.
+
+        With `namespace` and `similar_text`, falls back to the most similar
+        entry stored under the same namespace, if it clears the threshold.
+        """
+        now = time.time()
+        with self._lock, self._db:
+            response = self._lookup(cache_key(prompt, model, temperature), now)
+            if response is not None:
+                self._counts["hits"] += 1
+                return response
+
+            if namespace is not None and similar_text:
+                query = embed_text(similar_text)
+                best_key, best_score = None, self.similarity_threshold
+                for key, vector in self._vectors_for(namespace):
+                    score = _cosine(query, vector)
+                    if score >= best_score:
+                        best_key, best_score = key, score
+                if best_key is not None:
+                    response = self._lookup(best_key, now)
+                    if response is not None:
+                        self._counts["similar_hits"] += 1
+                        return response
+
+            self._counts["misses"] += 1
+            return None
+
+    def put(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float,
+        response: str,
+        namespace: Optional[str] = None,
+        similar_text: Optional[str] = None,
+    ) -> None:
+        """Store a response (and its similarity vector, if `similar_text` is given)."""
+        key = cache_key(prompt, model, temperature)
+        vector = embed_text(similar_text) if namespace is not None and similar_text else None
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, namespace, response, created, accessed, vector) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, namespace, response, now, now, vector.tobytes() if vector is not None else None),
+            )
+            self._counts["stores"] += 1
+            if namespace is not None:
+                self._forget_vector(key, namespace)
+                if vector is not None and namespace in self._vectors:
+                    self._vectors[namespace].append((key, vector))
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then the least recently used beyond max_entries."""
+        doomed = []
+        if self.ttl is not None:
+            doomed += self._db.execute(
+                "SELECT key, namespace FROM responses WHERE created < ?", (now - self.ttl,)
+            ).fetchall()
+        (count,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        excess = count - len(doomed) - self.max_entries
+        if excess > 0:
+            doomed += self._db.execute(
+                "SELECT key, namespace FROM responses ORDER BY accessed LIMIT ?", (excess,)
+            ).fetchall()
+        for key, namespace in doomed:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._forget_vector(key, namespace)
+        self._counts["evictions"] += len(doomed)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and the overall hit rate (exact + similar)."""
+        with self._lock:
+            stats: Dict[str, float] = dict(self._counts)
+            (stats["entries"],) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        lookups = stats["hits"] + stats["similar_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["similar_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
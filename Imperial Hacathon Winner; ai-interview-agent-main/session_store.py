@@ -0,0 +1,343 @@
+# session_store.py
+"""
+Session persistence for the interviewer agent.
+
+save_session() used to write the whole SessionState (every answer,
+question and evaluation so far) to ctx.storage after each mutation, up to
+three times per message. SessionStore keeps sessions in an in-process hot
+cache instead, tracks which ones changed, and writes only the delta when
+it is flushed (once per message):
+
+- scalar fields (role, persona, question_index, finished) live in a small
+  head record stored under the session key;
+- list fields are append-only in practice, so each item is its own record
+  ("<key>:<field>:<index>") and a flush writes just the new items.
+
+So a turn costs O(change) writes rather than O(session). A list that was
+replaced or shrank (e.g. on restart) is rewritten, and sessions saved in
+the old whole-dict format are read as-is and converted on their next flush.
+
+Backends: the agent's ctx.storage, SQLite (WAL mode) and anything with the
+redis-py get/mget/mset/delete API, such as redis.Redis or the in-process
+LocalRedis stand-in.
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+import sqlite3
+import threading
+
+FORMAT_VERSION = 2
+
+
+# -------------------------------
+# Backends
+# -------------------------------
+
+class UAgentsStorageBackend:
+    """
+    The agent's ctx.storage. Note that the uAgents file store rewrites its
+    JSON file on every set, so only the number of writes is reduced here;
+    use SQLite or Redis for O(change) persistence.
+    """
+
+    def __init__(self, storage: Any):
+        self.storage = storage
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[Any]]:
+        return [self.storage.get(key) for key in keys]
+
+    def apply(self, sets: Dict[str, Any], deletes: Iterable[str]) -> None:
+        for key, value in sets.items():
+            self.storage.set(key, value)
+        for key in deletes:
+            self.storage.remove(key)
+
+
+class SQLiteBackend:
+    """Key/value table in SQLite (WAL mode); each flush is one transaction."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS session_kv (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """
+        )
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[Any]]:
+        found: Dict[str, Any] = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, value FROM session_kv WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                )
+                found.update((key, json.loads(value)) for key, value in rows)
+        return [found.get(key) for key in keys]
+
+    def apply(self, sets: Dict[str, Any], deletes: Iterable[str]) -> None:
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO session_kv (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in sets.items()],
+            )
+            self._db.executemany("DELETE FROM session_kv WHERE key = ?", [(key,) for key in deletes])
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the subset of redis-py that RedisBackend uses,
+    for running without a Redis server. Not persistent.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        return self._data.get(key)
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[str]]:
+        with self._lock:
+            return [self._data.get(key) for key in keys]
+
+    def mset(self, mapping: Dict[str, str]) -> bool:
+        with self._lock:
+            self._data.update(mapping)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+
+class RedisBackend:
+    """Redis (or LocalRedis): one MSET and one DEL per flush, values as JSON."""
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[Any]]:
+        if not keys:
+            return []
+        return [json.loads(value) if value is not None else None for value in self.client.mget(list(keys))]
+
+    def apply(self, sets: Dict[str, Any], deletes: Iterable[str]) -> None:
+        if sets:
+            self.client.mset({key: json.dumps(value) for key, value in sets.items()})
+        deletes = list(deletes)
+        if deletes:
+            self.client.delete(*deletes)
+
+
+# -------------------------------
+# Store
+# -------------------------------
+
+class SessionStore:
+    """
+    Write-behind session cache over a backend.
+
+    `put()` only marks a session dirty; `flush()` persists the changes of
+    every dirty session in one backend call. Sessions are objects that
+    round-trip through `to_dict` / `from_dict`; `list_fields` name the
+    dict entries stored item by item.
+
+    A session is shared by everything that handles it, so a flush from one
+    handler could write another handler's half-applied changes. Wrap each
+    message's changes in `turn(key)`: flushes skip sessions with a turn in
+    progress, and the turn's own flush writes them once it is complete.
+
+    If the backend fails, nothing is marked persisted and the sessions stay
+    dirty, so the next flush retries the same delta.
+
+    Example:
+        store = SessionStore(SQLiteBackend("sessions.sqlite3"), SessionState.to_dict,
+                             SessionState.from_dict, LIST_FIELDS)
+        with store.turn(key):
+            session = store.get(key)   # hot cache, else backend
+            session.answers.append(text)
+            store.put(key, session)    # mark dirty
+        store.flush()                  # write the delta (once per message)
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        to_dict: Callable[[Any], Dict[str, Any]],
+        from_dict: Callable[[Optional[Dict[str, Any]]], Any],
+        list_fields: Sequence[str],
+        max_cached: int = 2048,
+    ):
+        self.backend = backend
+        self.to_dict = to_dict
+        self.from_dict = from_dict
+        self.list_fields = tuple(list_fields)
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._dirty: Dict[str, Any] = {}
+        # key -> {field: (persisted length, persisted last item)}; None = nothing usable persisted
+        self._persisted: Dict[str, Optional[Dict[str, Tuple[int, Any]]]] = {}
+        # key -> number of turns in progress
+        self._turns: Dict[str, int] = {}
+        self._counts: Dict[str, int] = {"hits": 0, "misses": 0, "flushes": 0, "records_written": 0, "records_deleted": 0}
+
+    def _item_key(self, key: str, field: str, index: int) -> str:
+        return f"{key}:{field}:{index}"
+
+    def _load(self, key: str) -> Any:
+        (head,) = self.backend.get_many([key])
+        if not head:
+            self._persisted[key] = None
+            return self.from_dict(None)
+        if head.get("_v") != FORMAT_VERSION:
+            # Whole-dict format from before the store; rewritten on next flush
+            self._persisted[key] = None
+            return self.from_dict(head)
+
+        lengths: Dict[str, int] = head.get("_lengths", {})
+        item_keys = [
+            self._item_key(key, field, index)
+            for field in self.list_fields
+            for index in range(lengths.get(field, 0))
+        ]
+        items = iter(self.backend.get_many(item_keys))
+        data = {name: value for name, value in head.items() if not name.startswith("_")}
+        persisted = {}
+        for field in self.list_fields:
+            values = [next(items) for _ in range(lengths.get(field, 0))]
+            data[field] = values
+            persisted[field] = (len(values), values[-1] if values else None)
+        self._persisted[key] = persisted
+        return self.from_dict(data)
+
+    def _remember(self, key: str, session: Any) -> None:
+        self._cache[key] = session
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cached:
+            old_key = next(iter(self._cache))
+            if old_key in self._turns:
+                # Still being changed; it is evicted once the turn is over
+                break
+            if old_key in self._dirty:
+                try:
+                    self._flush_keys([old_key])
+                except Exception:
+                    # Keep it (still dirty) until a flush gets through
+                    break
+            del self._cache[old_key]
+            self._persisted.pop(old_key, None)
+
+    def get(self, key: str) -> Any:
+        """The cached session, loading it from the backend on a miss."""
+        session = self._cache.get(key)
+        if session is not None:
+            self._counts["hits"] += 1
+            self._cache.move_to_end(key)
+            return session
+        self._counts["misses"] += 1
+        session = self._load(key)
+        self._remember(key, session)
+        return session
+
+    def put(self, key: str, session: Any) -> None:
+        """Mark a session changed; it is written on the next flush()."""
+        if key not in self._cache and key not in self._persisted:
+            # Never loaded: find out what is persisted so the delta is right
+            self._load(key)
+        self._dirty[key] = session
+        self._remember(key, session)
+
+    def begin(self, key: str) -> None:
+        """Start a turn: the session's changes are not flushed until end(key)."""
+        self._turns[key] = self._turns.get(key, 0) + 1
+
+    def end(self, key: str) -> None:
+        self._turns[key] -= 1
+        if not self._turns[key]:
+            del self._turns[key]
+
+    @contextmanager
+    def turn(self, key: str):
+        """begin(key) / end(key) around a block."""
+        self.begin(key)
+        try:
+            yield
+        finally:
+            self.end(key)
+
+    def _delta(
+        self, key: str, session: Any, sets: Dict[str, Any], deletes: List[str]
+    ) -> Dict[str, Tuple[int, Any]]:
+        """Add a session's changes to `sets`/`deletes`; returns what will then be persisted."""
+        data = self.to_dict(session)
+        persisted = self._persisted.get(key) or {}
+        lengths = {}
+        new_persisted = {}
+        for field in self.list_fields:
+            values = data.get(field) or []
+            old_length, old_last = persisted.get(field, (0, None))
+            if key not in self._persisted or self._persisted[key] is None:
+                start = 0
+            elif old_length <= len(values) and (old_length == 0 or values[old_length - 1] == old_last):
+                # Appended to (or unchanged): write only the new items
+                start = old_length
+            else:
+                # Replaced or shrunk: rewrite it
+                start = 0
+            for index in range(start, len(values)):
+                sets[self._item_key(key, field, index)] = values[index]
+            deletes.extend(self._item_key(key, field, index) for index in range(len(values), old_length))
+            lengths[field] = len(values)
+            new_persisted[field] = (len(values), values[-1] if values else None)
+
+        head = {name: value for name, value in data.items() if name not in self.list_fields}
+        head["_v"] = FORMAT_VERSION
+        head["_lengths"] = lengths
+        sets[key] = head
+        return new_persisted
+
+    def _flush_keys(self, keys: Iterable[str]) -> None:
+        sets: Dict[str, Any] = {}
+        deletes: List[str] = []
+        persisted: Dict[str, Dict[str, Tuple[int, Any]]] = {}
+        for key in keys:
+            session = self._dirty.get(key)
+            if session is not None:
+                persisted[key] = self._delta(key, session, sets, deletes)
+        if sets or deletes:
+            # Only once the backend has the changes are they persisted (and clean)
+            self.backend.apply(sets, deletes)
+            self._counts["flushes"] += 1
+            self._counts["records_written"] += len(sets)
+            self._counts["records_deleted"] += len(deletes)
+        self._persisted.update(persisted)
+        for key in persisted:
+            del self._dirty[key]
+
+    def flush(self) -> None:
+        """Persist the changes of every dirty session without a turn in progress, in one backend call."""
+        self._flush_keys([key for key in self._dirty if key not in self._turns])
+
+    def close(self) -> None:
+        """Flush every dirty session (turns or not) and close the backend."""
+        try:
+            self._flush_keys(list(self._dirty))
+        finally:
+            close = getattr(self.backend, "close", None)
+            if close is not None:
+                close()
+
+    def metrics(self) -> Dict[str, int]:
+        return {"cached": len(self._cache), "dirty": len(self._dirty), "turns": len(self._turns), **self._counts}
@@ -0,0 +1,47 @@
+"""
+Test setup: make the agent modules importable.
+
+metta_sim has no .py extension (it is imported by path on Agentverse), so
+it is loaded here under its module name for the tests and for modules that
+import it.
+"""
+
+import asyncio
+import importlib
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+if "metta_sim" not in sys.modules:
+    _loader = importlib.machinery.SourceFileLoader("metta_sim", os.path.join(PROJECT_DIR, "metta_sim"))
+    _module = importlib.util.module_from_spec(importlib.util.spec_from_loader("metta_sim", _loader))
+    sys.modules["metta_sim"] = _module
+    _loader.exec_module(_module)
+
+
+@pytest.fixture(scope="session")
+def agent_module(tmp_path_factory):
+    """
+    Import an agent module (interviewer, evaluator) by name. They create
+    their caches and logs in the working directory, so that is a temp dir
+    while they load.
+    """
+    def load(name):
+        pytest.importorskip("uagents")
+        if name not in sys.modules:
+            # Agent() attaches to the current event loop
+            asyncio.set_event_loop(asyncio.new_event_loop())
+            cwd = os.getcwd()
+            os.chdir(tmp_path_factory.mktemp(name))
+            try:
+                importlib.import_module(name)
+            finally:
+                os.chdir(cwd)
+        return sys.modules[name]
+    return load
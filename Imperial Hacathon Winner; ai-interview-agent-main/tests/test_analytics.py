@@ -0,0 +1,124 @@
+import random
+import statistics
+from datetime import date, datetime, timezone
+
+import pytest
+
+from analytics import InterviewAnalytics
+from interview_history import InterviewHistoryStore
+
+DAY1 = datetime(2024, 3, 4, 12, tzinfo=timezone.utc).timestamp()  # a Monday
+DAY2 = DAY1 + 86400
+NEXT_WEEK = DAY1 + 7 * 86400
+
+
+def evaluation(clarity, specificity=3, confidence=3):
+    return {
+        "clarity": clarity, "specificity": specificity, "confidence": confidence,
+        "overall_score": (clarity + specificity + confidence) / 3,
+    }
+
+
+def populate(analytics, seed=0):
+    """Ingest random evaluations; returns {(persona, day): [clarity, ...]}."""
+    rng = random.Random(seed)
+    expected = {}
+    for _ in range(500):
+        persona = rng.choice(["HR", "Senior Developer"])
+        timestamp = rng.choice([DAY1, DAY2, NEXT_WEEK]) + rng.uniform(0, 3600)
+        clarity = rng.randint(1, 5)
+        analytics.ingest(persona, "Junior Data Analyst", evaluation(clarity), timestamp=timestamp)
+        day = datetime.fromtimestamp(timestamp, timezone.utc).date().isoformat()
+        expected.setdefault((persona, day), []).append(clarity)
+    return expected
+
+
+def test_grouped_rollups_match_a_full_scan():
+    analytics = InterviewAnalytics()
+    expected = populate(analytics)
+    result = analytics.query("clarity", group_by=("persona",), percentiles=(50, 90))
+    assert set(result) == {("HR",), ("Senior Developer",)}
+    for (persona,), summary in result.items():
+        values = sorted(v for (p, _), vs in expected.items() if p == persona for v in vs)
+        assert summary["count"] == len(values)
+        assert summary["mean"] == pytest.approx(statistics.mean(values), abs=1e-4)
+        assert summary["stdev"] == pytest.approx(statistics.pstdev(values), abs=1e-4)
+        assert (summary["min"], summary["max"]) == (min(values), max(values))
+        assert summary["p50"] == values[len(values) // 2]
+        assert summary["p90"] == values[int(0.9 * len(values))]
+
+
+def test_filters_and_week_grouping():
+    analytics = InterviewAnalytics()
+    expected = populate(analytics)
+    first_week = analytics.query("clarity", group_by=("week",), until=date(2024, 3, 10))
+    assert list(first_week) == [("2024-W10",)]
+    by_day = analytics.query("clarity", group_by=("day",), persona="HR", since=date(2024, 3, 5))
+    assert {day: summary["count"] for (day,), summary in by_day.items()} == {
+        day: len(values) for (persona, day), values in expected.items()
+        if persona == "HR" and day >= "2024-03-05"
+    }
+    assert analytics.query("clarity", role="Nobody") == {}
+    with pytest.raises(ValueError):
+        analytics.query("clarity", group_by=("user",))
+    with pytest.raises(ValueError):
+        analytics.query("charisma")
+
+
+def test_flushed_partitions_reload(tmp_path):
+    path = str(tmp_path / "analytics")
+    analytics = InterviewAnalytics(path)
+    populate(analytics)
+    before = analytics.query("overall_score", group_by=("day", "persona"), percentiles=(25,))
+    assert analytics.flush() == 500
+    assert analytics.metrics()["unflushed"] == 0
+    analytics.ingest("HR", "Junior Data Analyst", evaluation(5), timestamp=DAY1)
+    analytics.close()
+
+    reloaded = InterviewAnalytics(path)
+    assert reloaded.metrics()["rows"] == 501
+    reloaded_summary = reloaded.query("overall_score", group_by=("day", "persona"), percentiles=(25,))
+    hr_day1 = ("2024-03-04", "HR")
+    assert reloaded_summary[hr_day1]["count"] == before[hr_day1]["count"] + 1
+    for group, summary in before.items():
+        if group != hr_day1:
+            assert reloaded_summary[group] == pytest.approx(summary)
+
+
+def test_torn_row_is_cut_off_before_appending(tmp_path):
+    path = str(tmp_path / "analytics")
+    analytics = InterviewAnalytics(path)
+    analytics.ingest("HR", "Junior Data Analyst", evaluation(4), timestamp=DAY1)
+    analytics.close()
+    (file_path,) = [p for p in (tmp_path / "analytics").rglob("*.f64")]
+    with open(file_path, "ab") as f:
+        f.write(b"\x00" * 13)  # a crash mid-write
+
+    analytics = InterviewAnalytics(path)
+    assert list(analytics.column("clarity")) == [4.0]
+    analytics.ingest("HR", "Junior Data Analyst", evaluation(5), timestamp=DAY1)
+    analytics.close()
+
+    reloaded = InterviewAnalytics(path)
+    assert list(reloaded.column("clarity")) == [4.0, 5.0]
+    assert reloaded.query("clarity")[()]["mean"] == 4.5
+
+
+def test_history_log_backfill_uses_the_latest_selection(tmp_path):
+    log_path = str(tmp_path / "history.jsonl")
+    history = InterviewHistoryStore(log_path)
+    history.set_role("u", "Junior Data Analyst")
+    history.set_persona("u", "HR")
+    history.append("u", "q1", "a1", 4, 3, 4, 11 / 3)
+    history.set_persona("u", "Senior Developer")
+    history.append("u", "q2", "a2", 2, 2, 2, 2.0)
+    history.reset("u")
+    history.append("u", "q3", "a3", 5, 5, 5, 5.0)
+    history.close()
+
+    analytics = InterviewAnalytics()
+    assert analytics.ingest_history_log(log_path) == 3
+    counts = {group: summary["count"] for group, summary in analytics.query("clarity", group_by=("persona", "role")).items()}
+    assert counts == {("", ""): 1, ("HR", "Junior Data Analyst"): 1, ("Senior Developer", "Junior Data Analyst"): 1}
+    assert sorted(analytics.column("clarity")) == [2.0, 4.0, 5.0]
+    assert list(analytics.column("specificity", persona="HR")) == [3.0]
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from asi_client import (
+    PRIORITY_EVALUATION,
+    PRIORITY_QUESTION,
+    PRIORITY_SPECULATIVE,
+    AsiError,
+    AsiOverloaded,
+    AsiScheduler,
+    StreamingJsonFields,
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class Gate:
+    """Calls that block until opened, recording the order they ran in."""
+
+    def __init__(self):
+        self.opened = asyncio.Event()
+        self.order = []
+
+    def call(self, name):
+        async def call():
+            self.order.append(name)
+            await self.opened.wait()
+            return name
+        return call
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_waiters_are_served_by_priority_then_age():
+    async def main():
+        scheduler = AsiScheduler(None, max_in_flight=1, rate=1000.0, burst=100)
+        gate = Gate()
+        tasks = [asyncio.ensure_future(scheduler.run(gate.call("running")))]
+        await settle()
+        for name, priority in [("eval", PRIORITY_EVALUATION), ("question1", PRIORITY_QUESTION),
+                               ("draft", PRIORITY_SPECULATIVE), ("question2", PRIORITY_QUESTION)]:
+            tasks.append(asyncio.ensure_future(scheduler.run(gate.call(name), priority=priority)))
+        await settle()
+        assert scheduler.metrics()["queued"] == 4
+        gate.opened.set()
+        await asyncio.gather(*tasks)
+        assert gate.order == ["running", "question1", "question2", "eval", "draft"]
+        assert scheduler.metrics()["in_flight"] == 0
+
+    run(main())
+
+
+def test_full_queue_sheds_lower_priorities_first():
+    async def main():
+        scheduler = AsiScheduler(None, max_in_flight=1, max_queue=1, rate=1000.0, burst=100)
+        gate = Gate()
+        running = asyncio.ensure_future(scheduler.run(gate.call("running")))
+        await settle()
+        evaluation = asyncio.ensure_future(scheduler.run(gate.call("eval"), priority=PRIORITY_EVALUATION))
+        await settle()
+        # A question displaces the waiting evaluation...
+        question = asyncio.ensure_future(scheduler.run(gate.call("question")))
+        await settle()
+        with pytest.raises(AsiOverloaded):
+            await evaluation
+        # ...but nothing outranks a waiting question: the newcomer is rejected
+        with pytest.raises(AsiOverloaded):
+            await scheduler.run(gate.call("late"), priority=PRIORITY_EVALUATION)
+        gate.opened.set()
+        assert await asyncio.gather(running, question) == ["running", "question"]
+        shed = scheduler.metrics()["priorities"][PRIORITY_EVALUATION]["shed"]
+        assert shed == 2
+
+    run(main())
+
+
+def test_waiting_longer_than_max_wait_sheds():
+    async def main():
+        scheduler = AsiScheduler(None, max_in_flight=1, rate=1000.0, burst=100)
+        gate = Gate()
+        running = asyncio.ensure_future(scheduler.run(gate.call("running")))
+        await settle()
+        with pytest.raises(AsiOverloaded):
+            await scheduler.run(gate.call("impatient"), max_wait=0.01)
+        gate.opened.set()
+        await running
+        assert gate.order == ["running"]
+        assert scheduler.metrics()["queued"] == 0
+
+    run(main())
+
+
+def test_http_429_pauses_new_calls():
+    async def main():
+        scheduler = AsiScheduler(None, rate=1000.0, burst=100)
+
+        async def limited():
+            raise AsiError("slow down", status=429, retry_after=0.2)
+
+        async def ok():
+            return "ok"
+
+        with pytest.raises(AsiError):
+            await scheduler.run(limited)
+        started = asyncio.get_running_loop().time()
+        assert await scheduler.run(ok) == "ok"
+        assert asyncio.get_running_loop().time() - started >= 0.15
+
+    run(main())
+
+
+def test_streaming_fields_complete_as_they_arrive():
+    reply = '```json\n{"next_question": "Why \\"SQL\\"?", "clarity": 45, "tags": ["a", "b"], "feedback": "cut off'
+    fields = StreamingJsonFields()
+    seen = []
+    for i in range(0, len(reply), 3):
+        for key, value in fields.feed(reply[i:i + 3]).items():
+            seen.append((key, value))
+    # 45 is only complete once the "," after it arrives; the cut-off field never is
+    assert seen == [("next_question", 'Why "SQL"?'), ("clarity", 45), ("tags", ["a", "b"])]
+    assert "feedback" not in fields.values
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import logging
+
+import pytest
+
+from response_cache import ResponseCache
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakeContext:
+    def __init__(self):
+        self.sent = []
+        self.logger = logging.getLogger("test")
+
+    async def send(self, destination, message):
+        self.sent.append((destination, message))
+
+
+@pytest.fixture
+def evaluator(agent_module, monkeypatch):
+    module = agent_module("evaluator")
+    monkeypatch.setattr(module, "response_cache", ResponseCache())
+    monkeypatch.setattr(module, "EVAL_MODE", "asi")
+    return module
+
+
+def request(evaluator, number, answer=None):
+    return evaluator.EvaluationRequest(
+        question=f"Question {number}?", answer=answer or f"Answer {number}.",
+        user_address=f"user{number}", request_id=f"r{number}",
+    )
+
+
+SCORES = '{"clarity": 4, "specificity": 2, "confidence": 5, '
+FULL_REPLY = SCORES + '"feedback": "Add numbers.", "improved_answer": "I cut the run time by 80%."}'
+
+
+def test_scores_are_sent_before_the_improved_answer_streams(evaluator, monkeypatch):
+    events = []
+
+    async def stream_chat(prompt, **kwargs):
+        for chunk in (SCORES, '"feedback": "Add numbers.", ', '"improved_answer": "I cut the run time by 80%."}'):
+            events.append("chunk")
+            yield chunk
+
+    async def on_scores(partial):
+        events.append(("scores", partial.partial, partial.confidence, partial.improved_answer))
+
+    monkeypatch.setattr(evaluator.asi, "stream_chat", stream_chat)
+    result = run(evaluator.evaluate_with_asi(request(evaluator, 1), on_scores))
+    # The last score is complete once the "," after it arrives, before the rest streams
+    assert events == ["chunk", ("scores", True, 5, ""), "chunk", "chunk"]
+    assert not result.partial
+    assert result.improved_answer == "I cut the run time by 80%."
+
+
+def test_cached_evaluations_send_no_partial(evaluator, monkeypatch):
+    async def stream_chat(prompt, **kwargs):
+        yield FULL_REPLY
+
+    partials = []
+
+    async def on_scores(partial):
+        partials.append(partial)
+
+    monkeypatch.setattr(evaluator.asi, "stream_chat", stream_chat)
+    run(evaluator.evaluate_with_asi(request(evaluator, 1)))
+    assert run(evaluator.evaluate_with_asi(request(evaluator, 1), on_scores)).clarity == 4
+    assert partials == []
+
+
+def test_batch_replies_are_split_per_sender_and_gaps_scored_alone(evaluator, monkeypatch):
+    batch_prompts, single_prompts = [], []
+
+    async def chat(prompt, **kwargs):
+        batch_prompts.append(prompt)
+        # Answer 2 is missing, one item is malformed and one is out of range
+        return "```json\n" + json.dumps([
+            {"id": 3, "clarity": 2, "specificity": 2, "confidence": 2, "feedback": "f3", "improved_answer": "i3"},
+            {"id": "first", "clarity": 5},
+            {"id": 9, "clarity": 5, "specificity": 5, "confidence": 5},
+            {"id": 1, "clarity": 5, "specificity": 4, "confidence": 3, "feedback": "f1", "improved_answer": "i1"},
+        ]) + "\n```"
+
+    async def stream_chat(prompt, **kwargs):
+        single_prompts.append(prompt)
+        yield FULL_REPLY
+
+    monkeypatch.setattr(evaluator.asi, "chat", chat)
+    monkeypatch.setattr(evaluator.asi, "stream_chat", stream_chat)
+    ctx = FakeContext()
+    batcher = evaluator.EvaluationBatcher(window=0.01)
+    batcher.start(ctx)
+
+    async def main():
+        for number in (1, 2, 3):
+            batcher.submit(f"agent{number}", request(evaluator, number))
+        await batcher.drain()
+
+    run(main())
+    assert len(batch_prompts) == 1 and len(single_prompts) == 1
+    assert "Answer 2." in single_prompts[0]
+    final = {destination: message for destination, message in ctx.sent if not message.partial}
+    assert {destination: (m.request_id, m.clarity, m.improved_answer) for destination, m in final.items()} == {
+        "agent1": ("r1", 5, "i1"),
+        "agent2": ("r2", 4, "I cut the run time by 80%."),
+        "agent3": ("r3", 2, "i3"),
+    }
+    # The answer scored alone streamed, so its scores went out first
+    assert [destination for destination, message in ctx.sent if message.partial] == ["agent2"]
+    assert batcher.metrics()["mean_batch_size"] == 3
+
+
+def test_unparseable_batch_reply_falls_back_to_single_evaluations(evaluator, monkeypatch):
+    async def chat(prompt, **kwargs):
+        return "Sorry, I can't help with that."
+
+    async def stream_chat(prompt, **kwargs):
+        yield FULL_REPLY
+
+    monkeypatch.setattr(evaluator.asi, "chat", chat)
+    monkeypatch.setattr(evaluator.asi, "stream_chat", stream_chat)
+    reqs = [request(evaluator, 1), request(evaluator, 2)]
+    results = run(evaluator.evaluate_batch_with_asi(reqs))
+    assert [(r.request_id, r.clarity, r.partial) for r in results] == [("r1", 4, False), ("r2", 4, False)]
+
+
+def test_submit_needs_a_started_batcher(evaluator):
+    with pytest.raises(RuntimeError):
+        evaluator.EvaluationBatcher().submit("agent1", request(evaluator, 1))
@@ -0,0 +1,32 @@
+from heuristic_scorer import extract_features, score_answer
+
+STRONG = (
+    "At my last company the reporting pipeline took 6 hours to run. My task was to cut that for the "
+    "finance team. I built a new one in Python with Airflow and moved the heavy joins into Snowflake SQL. "
+    "As a result the run time dropped by 80% to 70 minutes and 40 analysts got their reports before 9am."
+)
+WEAK = "I think maybe I sort of did some stuff, I guess."
+
+
+def test_features():
+    features = extract_features(STRONG)
+    assert {"python", "airflow", "snowflake", "sql"} <= set(features.tools)
+    assert features.metrics >= 3
+    assert {"situation", "task", "action", "result"} <= set(features.star)
+    assert extract_features(WEAK).hedges >= 3
+
+
+def test_strong_and_weak_answers_are_not_borderline():
+    strong, weak = score_answer(STRONG), score_answer(WEAK)
+    assert strong.overall > weak.overall
+    assert not strong.borderline and not weak.borderline
+    assert all(1 <= value <= 5 for value in strong.scores().values())
+    assert all(1 <= value <= 5 for value in weak.scores().values())
+
+
+def test_suggestions_go_in_feedback_not_an_improved_answer():
+    weak = score_answer(WEAK)
+    assert weak.suggestions
+    assert weak.suggestions[0] in weak.feedback()
+    assert weak.improved_answer == ""
+    assert score_answer(STRONG).improved_answer == ""
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from interview_history import InterviewHistoryStore
+
+
+def answer(store, user, n):
+    for i in range(n):
+        store.append(user, f"q{i}", f"a{i}", 3, 4, 5, 4.0)
+
+
+def questions(page):
+    return [record["question"] for record in page["interview_history"]]
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "history.jsonl")
+
+
+def test_pages_combine_memory_and_log(log_path):
+    store = InterviewHistoryStore(log_path, max_records_per_user=3)
+    store.set_role("u", "Junior Data Analyst")
+    answer(store, "u", 7)
+    assert questions(store.page("u", 0, 2)) == ["q0", "q1"]
+    assert questions(store.page("u", 5)) == ["q5", "q6"]
+    assert questions(store.page("u")) == [f"q{i}" for i in range(7)]
+    assert store.page("u")["total"] == 7
+
+
+def test_history_survives_eviction_and_restart(log_path):
+    store = InterviewHistoryStore(log_path, max_users=1)
+    store.set_persona("u", "HR")
+    answer(store, "u", 2)
+    store.set_role("other", "Junior Data Analyst")
+    assert store.metrics()["users_in_memory"] == 1
+    assert store.page("u")["persona"] == "HR"
+    store.close()
+
+    reopened = InterviewHistoryStore(log_path)
+    page = reopened.page("u")
+    assert (page["persona"], questions(page)) == ("HR", ["q0", "q1"])
+
+
+def test_unknown_users_do_not_read_the_log(log_path, monkeypatch):
+    store = InterviewHistoryStore(log_path)
+    answer(store, "u", 2)
+    monkeypatch.setattr(store, "_read_records", lambda offsets: pytest.fail("log was read"))
+    store.set_role("new-user", "Junior Data Analyst")
+    assert store.page("new-user")["interview_history"] == []
+
+
+def test_reset_clears_history_across_restarts(log_path):
+    store = InterviewHistoryStore(log_path)
+    answer(store, "u", 2)
+    store.reset("u")
+    store.append("u", "fresh", "a", 1, 1, 1, 1.0)
+    store.close()
+    assert questions(InterviewHistoryStore(log_path).page("u")) == ["fresh"]
+
+
+def test_compaction_drops_obsolete_events(log_path):
+    store = InterviewHistoryStore(log_path, compact_min_bytes=0)
+    for _ in range(20):
+        store.set_role("u", "Junior Data Analyst")
+    answer(store, "u", 3)
+    metrics = store.metrics()
+    assert metrics["log_lines"] <= 2 * metrics["log_live_lines"]
+    with open(log_path) as log:
+        assert len(log.readlines()) == metrics["log_lines"]
+    store.close()
+
+    page = InterviewHistoryStore(log_path).page("u")
+    assert (page["role"], questions(page)) == ("Junior Data Analyst", ["q0", "q1", "q2"])
+
+
+def test_compaction_drops_users_past_retention(log_path):
+    store = InterviewHistoryStore(log_path, retention=0.0)
+    answer(store, "u", 2)
+    store.compact()
+    assert store.metrics()["users_logged"] == 0
+    assert store.page("u")["total"] == 0
+
+
+def test_torn_last_line_is_ignored(log_path):
+    store = InterviewHistoryStore(log_path)
+    answer(store, "u", 1)
+    store.close()
+    with open(log_path, "a") as log:
+        log.write('{"event":"qa","user":"u"')
+    store = InterviewHistoryStore(log_path)
+    answer(store, "v", 1)
+    store.close()
+    with open(log_path) as log:
+        assert [json.loads(line)["user"] for line in log] == ["u", "v"]
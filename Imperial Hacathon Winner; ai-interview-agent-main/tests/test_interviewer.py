@@ -0,0 +1,501 @@
+import asyncio
+import json
+import logging
+import random
+import statistics
+
+import pytest
+
+from session_store import LocalRedis, RedisBackend, SessionStore
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakeContext:
+    """Records what a handler sends instead of sending it."""
+
+    def __init__(self):
+        self.sent = []
+        self.logger = logging.getLogger("test")
+        self.storage = None
+
+    async def send(self, destination, message):
+        self.sent.append((destination, message))
+
+    def texts(self):
+        return [message.content[0].text for _, message in self.sent if hasattr(message, "content")]
+
+
+@pytest.fixture
+def interviewer(agent_module, monkeypatch):
+    module = agent_module("interviewer")
+    store = SessionStore(
+        RedisBackend(LocalRedis()), module.SessionState.to_dict, module.SessionState.from_dict,
+        module.SESSION_LIST_FIELDS,
+    )
+    monkeypatch.setattr(module, "SESSION_STORE", store)
+    monkeypatch.setattr(module, "PENDING_EVALUATIONS", {})
+    monkeypatch.setattr(module, "FUSED_EVALUATIONS", {})
+    return module
+
+
+def evaluation(number, improved=""):
+    return {
+        "question": f"Question {number}?", "answer": f"Answer {number}.",
+        "clarity": 3, "specificity": 2, "confidence": 4, "overall_score": 3.0,
+        "feedback": "Add numbers.", "improved_answer": improved,
+    }
+
+
+def finished_session(interviewer, evaluations):
+    session = interviewer.SessionState.from_dict(None)
+    session.role, session.persona, session.finished = "Junior Data Analyst", "HR", True
+    for eval_data in evaluations:
+        session.answers.append(eval_data["answer"])
+        session.add_evaluation(eval_data)
+    return session
+
+
+def test_report_has_asi_write_missing_improved_answers(interviewer, monkeypatch):
+    prompts = []
+
+    async def chat(prompt, **kwargs):
+        prompts.append(prompt)
+        # Only one of the two missing answers comes back
+        return json.dumps([{"id": 2, "improved_answer": "At Acme I cut report time by 80%."}])
+
+    monkeypatch.setattr(interviewer.asi, "chat", chat)
+    session = finished_session(interviewer, [evaluation(1), evaluation(2, "Already improved."), evaluation(3)])
+    report = run(interviewer.build_final_report(session))
+
+    assert len(prompts) == 1
+    assert "Answer 1." in prompts[0] and "Answer 3." in prompts[0] and "Answer 2." not in prompts[0]
+    assert "Already improved." in report
+    assert "At Acme I cut report time by 80%." in report
+    assert report.count("No improved answer available.") == 1
+
+
+def test_report_without_missing_answers_makes_no_call(interviewer, monkeypatch):
+    async def chat(prompt, **kwargs):
+        raise AssertionError("no ASI call expected")
+
+    monkeypatch.setattr(interviewer.asi, "chat", chat)
+    session = finished_session(interviewer, [evaluation(1, "Improved.")])
+    assert run(interviewer.build_final_report(session)) == interviewer.generate_end_of_interview_summary(session)
+
+
+def test_report_survives_a_failed_call(interviewer, monkeypatch):
+    async def chat(prompt, **kwargs):
+        raise interviewer.AsiError("down", status=503)
+
+    monkeypatch.setattr(interviewer.asi, "chat", chat)
+    session = finished_session(interviewer, [evaluation(1)])
+    assert "No improved answer available." in run(interviewer.build_final_report(session))
+
+
+def start_session(interviewer, ctx, session_key, answers=1):
+    session = interviewer.SessionState.from_dict(None)
+    session.role, session.persona = "Junior Data Analyst", "HR"
+    session.answers = [f"Answer {i}." for i in range(1, answers + 1)]
+    interviewer.save_session(ctx, session_key, session)
+    return session
+
+
+async def send_request(interviewer, ctx, session_key, user, number=1):
+    await interviewer.send_evaluation_request(
+        ctx, user_address=user, question=f"Question {number}?", answer=f"Answer {number}.",
+        persona="HR", session_key=session_key, role="Junior Data Analyst",
+    )
+    return ctx.sent[-1][1].request_id
+
+
+def response(interviewer, request_id, user, partial=False, number=1):
+    return interviewer.EvaluationResponse(
+        question=f"Question {number}?", answer=f"Answer {number}.", user_address=user,
+        request_id=request_id, clarity=4, specificity=2, confidence=5, overall_score=3.67,
+        feedback="Add numbers.", improved_answer="" if partial else "I cut run time by 80%.", partial=partial,
+    )
+
+
+def test_streamed_scores_are_logged_once(interviewer):
+    ctx, user = FakeContext(), "user-partial"
+    start_session(interviewer, ctx, "s")
+    rows = interviewer.analytics.metrics()["rows"]
+
+    async def main():
+        request_id = await send_request(interviewer, ctx, "s", user)
+        await interviewer.on_evaluation_response(ctx, "evaluator", response(interviewer, request_id, user, partial=True))
+        # Scores are logged, but the session waits for the full response
+        assert interviewer.interview_history.page(user)["total"] == 1
+        assert interviewer.load_session(ctx, "s").evaluations == []
+        await interviewer.on_evaluation_response(ctx, "evaluator", response(interviewer, request_id, user))
+
+    run(main())
+    assert interviewer.interview_history.page(user)["total"] == 1
+    assert interviewer.analytics.metrics()["rows"] == rows + 1
+    (evaluation,) = interviewer.load_session(ctx, "s").evaluations
+    assert evaluation["improved_answer"] == "I cut run time by 80%."
+    assert interviewer.PENDING_EVALUATIONS == {}
+
+
+def test_streamed_scores_are_kept_if_the_full_response_never_comes(interviewer, monkeypatch):
+    ctx, user = FakeContext(), "user-partial-expired"
+    start_session(interviewer, ctx, "s")
+    monkeypatch.setattr(interviewer, "EVAL_RESPONSE_TIMEOUT", -1.0)
+
+    async def main():
+        request_id = await send_request(interviewer, ctx, "s", user)
+        await interviewer.on_evaluation_response(ctx, "evaluator", response(interviewer, request_id, user, partial=True))
+        await interviewer.expire_pending_evaluations(ctx)
+
+    run(main())
+    (evaluation,) = interviewer.load_session(ctx, "s").evaluations
+    assert (evaluation["clarity"], evaluation["confidence"], evaluation["improved_answer"]) == (4, 5, "")
+    assert interviewer.interview_history.page(user)["total"] == 1
+
+
+def fused_session(interviewer, ctx, session_key):
+    session = start_session(interviewer, ctx, session_key)
+    session.questions = ["Question 1?"]
+    session.conversation_history = [{"question": "Question 1?", "answer": "Answer 1."}]
+    interviewer.save_session(ctx, session_key, session)
+    return session
+
+
+def stub_stream(interviewer, monkeypatch, chunks, release):
+    """asi.stream_chat yielding chunks[0], then the rest once `release` is set."""
+    async def stream_chat(prompt, **kwargs):
+        yield chunks[0]
+        await release.wait()
+        for chunk in chunks[1:]:
+            yield chunk
+
+    monkeypatch.setattr(interviewer.asi, "stream_chat", stream_chat)
+
+
+NEXT_QUESTION = '{"next_question": "How did you clean the data?", '
+
+
+def test_fused_turn_returns_the_question_before_the_evaluation(interviewer, monkeypatch):
+    ctx, user = FakeContext(), "user-fused"
+    session = fused_session(interviewer, ctx, "s")
+
+    async def main():
+        release, turn_saved = asyncio.Event(), asyncio.Event()
+        stub_stream(interviewer, monkeypatch, [
+            NEXT_QUESTION, '"clarity": 4, "specificity": 3, "confidence": 5, ',
+            '"feedback": "Good.", "improved_answer": "Better."}',
+        ], release)
+        question = await interviewer.evaluate_and_ask_next_with_asi(ctx, "s", user, session, 2, turn_saved)
+        assert question == "How did you clean the data?"
+        assert interviewer.FUSED_EVALUATIONS["s"]
+        release.set()
+        turn_saved.set()
+        await asyncio.gather(*interviewer.FUSED_EVALUATIONS["s"])
+
+    run(main())
+    (evaluation,) = interviewer.load_session(ctx, "s").evaluations
+    assert (evaluation["clarity"], evaluation["improved_answer"]) == (4, "Better.")
+    assert interviewer.FUSED_EVALUATIONS == {}
+    assert ctx.sent == []
+
+
+@pytest.mark.parametrize("rest", [
+    ['"feedback": "No scores here."}'],
+    # An invalid escape makes the streamed JSON unparseable
+    ['"cl\\arity": 4, "specificity": 3, "confidence": 5, '],
+])
+def test_fused_turn_without_scores_asks_the_evaluator(interviewer, monkeypatch, rest):
+    ctx, user = FakeContext(), "user-fused-fallback"
+    session = fused_session(interviewer, ctx, "s")
+
+    async def main():
+        release, turn_saved = asyncio.Event(), asyncio.Event()
+        stub_stream(interviewer, monkeypatch, [NEXT_QUESTION] + rest, release)
+        assert await interviewer.evaluate_and_ask_next_with_asi(ctx, "s", user, session, 2, turn_saved)
+        release.set()
+        turn_saved.set()
+        await asyncio.gather(*interviewer.FUSED_EVALUATIONS["s"])
+
+    run(main())
+    assert interviewer.load_session(ctx, "s").evaluations == []
+    ((destination, request),) = ctx.sent
+    assert destination == interviewer.EVALUATOR_AGENT_ADDRESS
+    assert (request.question, request.answer, request.session_key) == ("Question 1?", "Answer 1.", "s")
+    assert list(interviewer.PENDING_EVALUATIONS) == [request.request_id]
+
+
+def test_restart_cancels_fused_evaluations(interviewer, monkeypatch):
+    ctx, user = FakeContext(), "user-fused-restart"
+    session = fused_session(interviewer, ctx, "s")
+
+    async def main():
+        release, turn_saved = asyncio.Event(), asyncio.Event()
+        stub_stream(interviewer, monkeypatch, [NEXT_QUESTION, '"clarity": 4, "specificity": 3, "confidence": 5}'], release)
+        await interviewer.evaluate_and_ask_next_with_asi(ctx, "s", user, session, 2, turn_saved)
+        (task,) = interviewer.FUSED_EVALUATIONS["s"]
+        interviewer.cancel_fused_evaluations("s")
+        release.set()
+        turn_saved.set()
+        await asyncio.gather(task, return_exceptions=True)
+        assert task.cancelled()
+
+    run(main())
+    assert interviewer.load_session(ctx, "s").evaluations == []
+    assert ctx.sent == []
+    assert interviewer.FUSED_EVALUATIONS == {}
+
+
+async def after(seconds, result):
+    await asyncio.sleep(seconds)
+    return result
+
+
+@pytest.mark.parametrize("refine, draft, expected", [
+    ((0.0, "refined"), (0.0, "draft"), "refined"),
+    # The refinement is slow: a ready draft is used as soon as the budget is up
+    ((10.0, "refined"), (0.0, "draft"), "draft"),
+    # Neither is ready after the budget: the first within the grace period
+    ((0.15, "refined"), (10.0, "draft"), "refined"),
+    ((10.0, "refined"), (0.15, "draft"), "draft"),
+    # Slow or failing generators: the fallback question once the grace is up
+    ((10.0, "refined"), (10.0, "draft"), None),
+    ((0.0, None), (10.0, "draft"), None),
+    ((10.0, "refined"), (0.0, None), None),
+])
+def test_speculative_question_waits_are_bounded(interviewer, monkeypatch, refine, draft, expected):
+    monkeypatch.setattr(interviewer, "SPECULATIVE_REFINE_BUDGET", 0.1)
+    monkeypatch.setattr(interviewer, "SPECULATIVE_GRACE", 0.1)
+
+    async def generate_next_adaptive_question(*args, **kwargs):
+        return await after(*refine)
+
+    monkeypatch.setattr(interviewer, "generate_next_adaptive_question", generate_next_adaptive_question)
+
+    async def main():
+        draft_task = asyncio.ensure_future(after(*draft))
+        monkeypatch.setitem(interviewer.SPECULATIVE_DRAFTS, "s", (2, draft_task))
+        await asyncio.sleep(0)
+        started = asyncio.get_running_loop().time()
+        question = await interviewer.next_question_with_speculation("s", "Junior Data Analyst", "HR", [], 2)
+        elapsed = asyncio.get_running_loop().time() - started
+        await asyncio.sleep(0)
+        return question, elapsed, draft_task
+
+    question, elapsed, draft_task = run(main())
+    assert question == (expected or interviewer.fallback_question("HR", 2))
+    assert elapsed < 0.2 + 0.1
+    if expected == "draft" and draft[0] == 0.0:
+        assert elapsed < 0.1 + 0.05
+    assert draft_task.done()
+
+
+def test_responses_are_routed_by_request_id(interviewer):
+    ctx, user = FakeContext(), "user-routing"
+    # The same user in two sessions (e.g. two browser tabs)
+    start_session(interviewer, ctx, "tab1")
+    start_session(interviewer, ctx, "tab2")
+
+    async def main():
+        first = await send_request(interviewer, ctx, "tab1", user)
+        second = await send_request(interviewer, ctx, "tab2", user, number=2)
+        await interviewer.on_evaluation_response(ctx, "evaluator", response(interviewer, second, user, number=2))
+        await interviewer.on_evaluation_response(ctx, "evaluator", response(interviewer, first, user))
+        # A duplicate and an unknown ID are dropped
+        await interviewer.on_evaluation_response(ctx, "evaluator", response(interviewer, first, user))
+        await interviewer.on_evaluation_response(ctx, "evaluator", response(interviewer, "unknown", user))
+
+    run(main())
+    assert [e["question"] for e in interviewer.load_session(ctx, "tab1").evaluations] == ["Question 1?"]
+    assert [e["question"] for e in interviewer.load_session(ctx, "tab2").evaluations] == ["Question 2?"]
+    assert interviewer.PENDING_EVALUATIONS == {}
+
+
+def test_response_without_request_id_goes_to_the_default_session(interviewer):
+    ctx, user = FakeContext(), "user-legacy"
+    start_session(interviewer, ctx, f"session:sender:{user}")
+    run(interviewer.on_evaluation_response(ctx, "evaluator", response(interviewer, None, user)))
+    assert len(interviewer.load_session(ctx, f"session:sender:{user}").evaluations) == 1
+
+
+def test_expired_requests_are_scored_locally_and_late_responses_dropped(interviewer, monkeypatch):
+    ctx, user = FakeContext(), "user-expired"
+    start_session(interviewer, ctx, "s")
+
+    async def main():
+        request_id = await send_request(interviewer, ctx, "s", user)
+        await interviewer.expire_pending_evaluations(ctx)
+        assert request_id in interviewer.PENDING_EVALUATIONS  # not timed out yet
+        monkeypatch.setattr(interviewer, "EVAL_RESPONSE_TIMEOUT", -1.0)
+        await interviewer.expire_pending_evaluations(ctx)
+        await interviewer.on_evaluation_response(ctx, "evaluator", response(interviewer, request_id, user))
+
+    run(main())
+    (evaluation,) = interviewer.load_session(ctx, "s").evaluations
+    expected = interviewer.local_evaluation_data("Question 1?", "Answer 1.")
+    assert evaluation == expected
+    assert evaluation["feedback"] != "Add numbers."
+    assert interviewer.PENDING_EVALUATIONS == {}
+
+
+def test_restart_makes_outstanding_responses_stale(interviewer):
+    ctx, user = FakeContext(), "user-restart"
+    start_session(interviewer, ctx, "s")
+    start_session(interviewer, ctx, "other")
+
+    async def main():
+        stale = await send_request(interviewer, ctx, "s", user)
+        kept = await send_request(interviewer, ctx, "other", user)
+        interviewer.cancel_pending_evaluations("s")
+        assert list(interviewer.PENDING_EVALUATIONS) == [kept]
+        await interviewer.on_evaluation_response(ctx, "evaluator", response(interviewer, stale, user))
+
+    run(main())
+    assert interviewer.load_session(ctx, "s").evaluations == []
+
+
+def test_last_evaluation_of_a_finished_interview_sends_the_report(interviewer, monkeypatch):
+    ctx, user = FakeContext(), "user-report"
+    session = start_session(interviewer, ctx, "s", answers=2)
+    session.finished = True
+    interviewer.save_session(ctx, "s", session)
+    monkeypatch.setattr(interviewer, "REPORT_IMPROVED_ANSWERS", False)
+
+    async def main():
+        first = await send_request(interviewer, ctx, "s", user)
+        second = await send_request(interviewer, ctx, "s", user, number=2)
+        ctx.sent.clear()
+        await interviewer.on_evaluation_response(ctx, "evaluator", response(interviewer, first, user))
+        assert ctx.sent == []
+        await interviewer.on_evaluation_response(ctx, "evaluator", response(interviewer, second, user, number=2))
+
+    run(main())
+    ((destination, message),) = ctx.sent
+    assert destination == user
+    assert "Questions answered: 2" in message.content[0].text
+
+
+def scored_session(interviewer, scores):
+    session = interviewer.SessionState.from_dict(None)
+    session.role, session.persona = "Junior Data Analyst", "Senior Developer"
+    for i, (clarity, specificity, confidence) in enumerate(scores, 1):
+        session.add_evaluation({
+            "question": f"Question {i}?", "answer": f"Answer {i}.",
+            "clarity": clarity, "specificity": specificity, "confidence": confidence,
+            "overall_score": round((clarity + specificity + confidence) / 3, 2),
+            "feedback": f"Feedback {i}.", "improved_answer": f"Improved {i}.",
+        })
+    return session
+
+
+def test_running_aggregates_match_a_rescan(interviewer):
+    rng = random.Random(7)
+    session = scored_session(interviewer, [tuple(rng.randint(1, 5) for _ in range(3)) for _ in range(40)])
+    for dimension, aggregate in session.score_aggregates().items():
+        values = [evaluation[dimension] for evaluation in session.evaluations]
+        assert aggregate.count == len(values)
+        assert aggregate.mean == pytest.approx(statistics.mean(values))
+        assert aggregate.variance == pytest.approx(statistics.pvariance(values))
+        assert (aggregate.min, aggregate.max) == (min(values), max(values))
+
+    # Evaluations replaced behind the aggregates' back are rescanned
+    session.evaluations = session.evaluations[:3]
+    assert session.score_aggregates()["clarity"].count == 3
+
+
+def test_aggregates_survive_a_round_trip(interviewer):
+    session = scored_session(interviewer, [(4, 2, 5), (3, 1, 4)])
+    restored = interviewer.SessionState.from_dict(json.loads(json.dumps(session.to_dict())))
+    assert restored.scores == session.scores
+    restored.add_evaluation(dict(session.evaluations[0]))
+    assert restored.scores["clarity"].count == 3
+
+    # Sessions saved before the aggregates existed rebuild them
+    legacy = session.to_dict()
+    del legacy["scores"]
+    assert interviewer.SessionState.from_dict(legacy).score_aggregates() == session.scores
+
+
+# The report as the string-building version before the templates wrote it
+EXPECTED_REPORT = """✅ Interview complete – here's your detailed report
+
+Role: Junior Data Analyst
+
+Interviewer style: Senior Developer
+
+Questions answered: 3
+
+Average scores this session
+
+Clarity: 4.0 / 5
+Specificity: 2.0 / 5
+Confidence: 4.0 / 5
+Overall: 3.34 / 5
+
+📋 Detailed Question-by-Question Feedback
+
+Question 1: Question 1?
+
+Your answer: "Answer 1."
+
+Scores: Clarity 4/5, Specificity 2/5, Confidence 5/5, Overall 3.67/5
+
+Feedback: Feedback 1.
+
+Improved example answer:
+Improved 1.
+
+---
+
+Question 2: Question 2?
+
+Your answer: "Answer 2."
+
+Scores: Clarity 3/5, Specificity 1/5, Confidence 4/5, Overall 2.67/5
+
+Feedback: Feedback 2.
+
+Improved example answer:
+Improved 2.
+
+---
+
+Question 3: Question 3?
+
+Your answer: "Answer 3."
+
+Scores: Clarity 5/5, Specificity 3/5, Confidence 3/5, Overall 3.67/5
+
+Feedback: Feedback 3.
+
+Improved example answer:
+Improved 3.
+
+---
+
+💪 Strengths
+
+You explain your motivations clearly and stay on topic.
+You generally sound confident when talking about your background.
+
+🎯 Key areas to improve
+
+Your examples are often too general. Add numbers, tools, and concrete outcomes.
+For technical questions, mention datasets, metrics, and specific steps you took.
+
+📝 Next steps
+
+Practise giving 1–2 quantified examples for each answer.
+Focus especially on making your answers more specific and measurable.
+Review common data-cleaning steps for junior analyst interviews.
+
+Type 'restart' to try another interview with a different interviewer style."""
+
+
+def test_report_matches_the_previous_format(interviewer):
+    session = scored_session(interviewer, [(4, 2, 5), (3, 1, 4), (5, 3, 3)])
+    assert interviewer.generate_end_of_interview_summary(session) == EXPECTED_REPORT
+    restored = interviewer.SessionState.from_dict(session.to_dict())
+    assert interviewer.generate_end_of_interview_summary(restored) == EXPECTED_REPORT
@@ -0,0 +1,71 @@
+import os
+
+from interviewrag import InterviewKG
+from metta_sim import GraphPartitions, KnowledgeGraph, build_interview_kg
+
+
+def test_candidate_facts_survive_a_restart(tmp_path):
+    candidates = str(tmp_path / "candidates")
+    kg = InterviewKG(build_interview_kg(), candidate_dir=candidates)
+    kg.add_candidate_skill("agent1alice", "sql", "wrote joins")
+    kg.close()
+
+    reopened = InterviewKG(build_interview_kg(), candidate_dir=candidates)
+    assert reopened.get_candidate_skills("agent1alice") == [("sql", "wrote joins")]
+    assert reopened.get_candidate_skills("agent1bob") == []
+
+
+def test_evicted_partitions_are_reloaded_from_disk(tmp_path):
+    kg = InterviewKG(build_interview_kg(), max_candidates=1, candidate_dir=str(tmp_path))
+    kg.add_candidate_skill("agent1alice", "sql", "joins")
+    kg.add_candidate_skill("agent1bob", "python", "pandas")
+    assert len(kg.candidates) == 1
+    assert kg.get_candidate_skills("agent1alice") == [("sql", "joins")]
+    assert kg.get_candidate_skills("agent1bob") == [("python", "pandas")]
+
+
+def test_in_memory_partitions_are_lost_on_eviction():
+    kg = InterviewKG(build_interview_kg(), max_candidates=1)
+    kg.add_candidate_skill("agent1alice", "sql", "joins")
+    kg.add_candidate_skill("agent1bob", "python", "pandas")
+    assert kg.get_candidate_skills("agent1alice") == []
+
+
+def test_forget_candidate_deletes_the_partition_files(tmp_path):
+    kg = InterviewKG(build_interview_kg(), candidate_dir=str(tmp_path))
+    kg.add_candidate_skill("agent1alice", "sql", "joins")
+    assert os.listdir(tmp_path)
+    assert kg.forget_candidate("agent1alice")
+    assert os.listdir(tmp_path) == []
+    assert kg.get_candidate_skills("agent1alice") == []
+
+
+def test_legacy_shared_graph_facts_are_read_once(monkeypatch):
+    shared = build_interview_kg()
+    shared.add_atom("candidate_mentioned", "agent1alice", "sql", "old answer")
+    kg = InterviewKG(shared)
+
+    def fail(*args):
+        raise AssertionError("the shared graph was queried again")
+
+    monkeypatch.setattr(shared, "query", fail)
+    assert kg.get_candidate_skills("agent1alice") == [("sql", "old answer")]
+    assert kg.get_candidate_skills("agent1bob") == []
+
+
+def test_partitions_expire_after_ttl():
+    partitions = GraphPartitions(ttl=0.0)
+    partitions.get("a").add_atom("x", "1")
+    assert partitions.peek("a") is None
+
+
+def test_partitions_respect_the_fact_budget():
+    evicted = []
+    partitions = GraphPartitions(max_facts=2, on_evict=lambda key, graph: evicted.append(key))
+    for key in "abc":
+        graph = partitions.get(key)
+        graph.add_atom("x", "1")
+        graph.add_atom("x", "2")
+        partitions.enforce_limits()
+    assert evicted == ["a", "b"]
+    assert isinstance(partitions.peek("c"), KnowledgeGraph)
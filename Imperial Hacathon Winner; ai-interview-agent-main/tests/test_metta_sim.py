@@ -0,0 +1,436 @@
+import os
+import random
+import threading
+
+import pytest
+
+from metta_sim import (
+    KnowledgeGraph,
+    build_interview_kg,
+    get_topics_for_persona,
+    load_atoms,
+    open_interview_kg,
+    suggest_next_question_topic,
+)
+
+
+def test_retracting_a_premise_after_restart_retracts_its_derived_facts(tmp_path):
+    path = str(tmp_path / "kg.snapshot")
+    kg = open_interview_kg(path)
+    kg.add_atom("skill_prerequisite", "forecasting", "statistical_analysis")
+    kg.close()
+
+    kg = open_interview_kg(path)
+    assert kg.query("requires_transitively", "forecasting", "data_cleaning") == [()]
+    assert kg.remove_atom("skill_prerequisite", "statistical_analysis", "data_cleaning")
+    assert kg.query("requires_transitively", "statistical_analysis", "data_cleaning") == []
+    assert kg.query("requires_transitively", "forecasting", "data_cleaning") == []
+    assert kg.query("requires_transitively", "forecasting", "statistical_analysis") == [()]
+    kg.close()
+
+    # The removal itself survives a restart, and nothing derived comes back
+    kg = open_interview_kg(path)
+    assert kg.query("requires_transitively", "statistical_analysis", "data_cleaning") == []
+    kg.close()
+
+
+def test_derived_atoms_are_neither_logged_nor_snapshotted(tmp_path):
+    path = str(tmp_path / "kg.snapshot")
+    kg = KnowledgeGraph.open(path)
+    kg.add_rule(("reachable", "$a", "$b"), [("edge", "$a", "$b")])
+    kg.add_atom("edge", "a", "b")
+    with open(path + ".wal") as wal:
+        assert wal.read().splitlines() == ['["+", "edge", "a", "b"]']
+    kg.checkpoint()
+    kg.close()
+
+    reopened = KnowledgeGraph.open(path)
+    assert reopened.query("edge", "$x", "$y") == [("a", "b")]
+    assert reopened.query("reachable", "$x", "$y") == []
+    reopened.add_rule(("reachable", "$a", "$b"), [("edge", "$a", "$b")])
+    assert reopened.query("reachable", "$x", "$y") == [("a", "b")]
+    reopened.close()
+
+
+def test_a_derived_atom_asserted_as_base_fact_is_persisted(tmp_path):
+    path = str(tmp_path / "kg.snapshot")
+    kg = KnowledgeGraph.open(path)
+    kg.add_rule(("reachable", "$a", "$b"), [("edge", "$a", "$b")])
+    kg.add_atom("edge", "a", "b")
+    kg.add_atom("reachable", "a", "b")
+    kg.remove_atom("edge", "a", "b")
+    assert kg.query("reachable", "a", "b") == [()]
+    kg.close()
+
+    assert KnowledgeGraph.open(path).query("reachable", "a", "b") == [()]
+
+
+def test_in_memory_and_reopened_graphs_agree(tmp_path):
+    path = str(tmp_path / "kg.snapshot")
+    memory = build_interview_kg()
+    disk = open_interview_kg(path)
+    assert sorted(map(repr, disk.get_all_atoms())) == sorted(map(repr, memory.get_all_atoms()))
+    assert os.path.exists(path)
+
+
+def test_numbers_are_read_back_as_strings(tmp_path):
+    path = str(tmp_path / "kg.snapshot")
+    kg = KnowledgeGraph.open(path)
+    kg.create_ranked_index("persona_priority", 3, key=0, item=1, score=2)
+    kg.add_atom("persona_priority", "HR", "culture_fit", 0.95)
+    kg.add_atom("persona_priority", "HR", "conflict_resolution", "0.9")
+    kg.add_atom("question_count", "HR", 3)
+    # query() hands out strings, as it did before numeric atoms
+    assert sorted(kg.query("persona_priority", "HR", "$topic", "$weight")) == [
+        ("conflict_resolution", "0.9"), ("culture_fit", "0.95"),
+    ]
+    assert kg.query("question_count", "HR", "$n") == [("3",)]
+    # Numbers and their text are the same symbol
+    assert kg.query("persona_priority", "HR", "$topic", "0.95") == [("culture_fit",)]
+    assert kg.query("question_count", "HR", 3.0) == [()]
+    assert kg.top_k("persona_priority", "HR", 2) == [("culture_fit", 0.95), ("conflict_resolution", 0.9)]
+    kg.close()
+
+    # Replayed from the log, then from the snapshot
+    for _ in range(2):
+        kg = KnowledgeGraph.open(path)
+        ((weight,),) = kg.query("persona_priority", "HR", "culture_fit", "$weight")
+        assert weight == "0.95" and float(weight) == 0.95
+        kg.create_ranked_index("persona_priority", 3, key=0, item=1, score=2)
+        assert kg.top_k("persona_priority", "HR", 1) == [("culture_fit", 0.95)]
+        kg.checkpoint()
+        kg.close()
+
+
+def edges():
+    kg = KnowledgeGraph()
+    for a, b in [("a", "b"), ("a", "c"), ("b", "c"), ("c", "c"), ("d", "a")]:
+        kg.add_atom("edge", a, b)
+    return kg
+
+
+def test_match_uses_literals_wildcards_and_repeated_variables():
+    kg = edges()
+    assert sorted(kg.query("edge", "a", "$to")) == [("b",), ("c",)]
+    assert sorted(kg.query("edge", "$from", "c")) == [("a",), ("b",), ("c",)]
+    assert kg.match("edge", "$x", "$x") == [{"$x": "c"}]
+    assert len(kg.match("edge", "_", "_")) == 5
+    assert kg.query("edge", "nowhere", "$to") == []
+    # Arity is part of the predicate
+    assert kg.query("edge", "$a") == []
+
+
+def test_cached_results_follow_writes_and_are_not_shared():
+    kg = edges()
+    first = kg.match("edge", "a", "$to")
+    first.append({"$to": "corrupted"})
+    first[0]["$to"] = "corrupted"
+    assert sorted(b["$to"] for b in kg.match("edge", "a", "$to")) == ["b", "c"]
+
+    kg.add_atom("edge", "a", "d")
+    assert sorted(kg.query("edge", "a", "$to")) == [("b",), ("c",), ("d",)]
+    kg.remove_atom("edge", "a", "b")
+    assert sorted(kg.query("edge", "a", "$to")) == [("c",), ("d",)]
+    # Writes to another predicate leave the cached entry valid
+    kg.add_atom("other", "a", "b")
+    assert sorted(kg.query("edge", "a", "$to")) == [("c",), ("d",)]
+
+
+def test_result_cache_can_be_disabled():
+    kg = KnowledgeGraph(cache_size=0)
+    kg.add_atom("edge", "a", "b")
+    assert kg.query("edge", "a", "$to") == [("b",)]
+    kg.add_atom("edge", "a", "c")
+    assert sorted(kg.query("edge", "a", "$to")) == [("b",), ("c",)]
+
+
+def brute_force(kg, clauses, bindings=({},)):
+    """match_all() by trying every combination of atoms, clause by clause in order."""
+    results = [dict(b) for b in bindings]
+    for predicate, *pattern in clauses:
+        extended = []
+        for solution in results:
+            for atom in kg.get_all_atoms():
+                if atom.predicate != predicate or len(atom.args) != len(pattern):
+                    continue
+                candidate = dict(solution)
+                for part, value in zip(pattern, atom.args):
+                    if part == "_":
+                        continue
+                    if part.startswith("$"):
+                        if candidate.setdefault(part, value) != value:
+                            break
+                    elif part != value:
+                        break
+                else:
+                    extended.append(candidate)
+        results = extended
+    return results
+
+
+def canonical(solutions):
+    return sorted(tuple(sorted(s.items())) for s in solutions)
+
+
+def test_join_planner_matches_brute_force():
+    rng = random.Random(7)
+    kg = KnowledgeGraph()
+    people, skills = [f"p{i}" for i in range(12)], [f"s{i}" for i in range(8)]
+    for _ in range(40):
+        kg.add_atom("has_skill", rng.choice(people), rng.choice(skills))
+        kg.add_atom("requires", rng.choice(["r0", "r1", "r2"]), rng.choice(skills))
+        kg.add_atom("knows", rng.choice(people), rng.choice(people))
+    queries = [
+        [("requires", "r0", "$s"), ("has_skill", "$p", "$s")],
+        [("has_skill", "$p", "$s"), ("requires", "$r", "$s"), ("knows", "$p", "$q"), ("has_skill", "$q", "$s")],
+        [("knows", "$p", "$p")],
+        [("knows", "$a", "$b"), ("knows", "$b", "$a")],
+        [("has_skill", "$p", "_"), ("requires", "r9", "$s")],
+    ]
+    for clauses in queries:
+        assert canonical(kg.match_all(clauses)) == canonical(brute_force(kg, clauses))
+
+    seeds = [{"$s": "s1"}, {"$s": "s2"}]
+    clauses = [("has_skill", "$p", "$s"), ("requires", "$r", "$s")]
+    assert canonical(kg.match_all(clauses, seeds)) == canonical(brute_force(kg, clauses, seeds))
+
+
+def test_query_all_projects_without_duplicates():
+    kg = edges()
+    # Two-step paths: a and d each start two of them
+    starts = kg.query_all([("edge", "$a", "$b"), ("edge", "$b", "$c")], ["$a"])
+    assert sorted(starts) == [("a",), ("b",), ("c",), ("d",)]
+
+
+def test_columnar_tables_delete_compact_and_re_add():
+    kg = KnowledgeGraph()
+    for i in range(10):
+        kg.add_atom("item", f"i{i}", "x")
+    kg.add_atom("item", "i0", "x")
+    assert kg.fact_count() == 10
+    # Deleting most rows compacts the table; the rest must survive it
+    for i in range(7):
+        assert kg.remove_atom("item", f"i{i}", "x")
+    assert not kg.remove_atom("item", "i0", "x")
+    assert sorted(kg.query("item", "$i", "x")) == [("i7",), ("i8",), ("i9",)]
+    kg.add_atom("item", "i0", "x")
+    assert sorted(kg.query("item", "$i", "x")) == [("i0",), ("i7",), ("i8",), ("i9",)]
+    assert sorted(repr(atom) for atom in kg.get_all_atoms()) == [
+        "(item i0 x)", "(item i7 x)", "(item i8 x)", "(item i9 x)",
+    ]
+    kg.clear()
+    assert kg.fact_count() == 0 and kg.query("item", "$i", "x") == []
+
+
+def atoms(kg):
+    return sorted(repr(atom) for atom in kg.get_all_atoms())
+
+
+def test_snapshot_and_wal_round_trip(tmp_path):
+    path = str(tmp_path / "kg.snapshot")
+    kg = KnowledgeGraph.open(path)
+    for i in range(6):
+        kg.add_atom("edge", f"n{i}", f"n{i + 1}")
+    kg.remove_atom("edge", "n0", "n1")
+    kg.checkpoint()
+    # After the checkpoint: changes on top of the mapped snapshot, in the log
+    kg.add_atom("edge", "n9", "n0")
+    kg.remove_atom("edge", "n3", "n4")
+    expected = atoms(kg)
+    kg.close()
+
+    reopened = KnowledgeGraph.open(path)
+    assert atoms(reopened) == expected
+    assert sorted(reopened.query("edge", "$a", "n0")) == [("n9",)]
+    # The mapped tables take writes too
+    reopened.add_atom("edge", "n1", "n9")
+    reopened.checkpoint()
+    reopened.close()
+    assert not os.path.getsize(path + ".wal")
+
+    final = KnowledgeGraph.open(path)
+    assert atoms(final) == sorted(expected + ["(edge n1 n9)"])
+    final.close()
+
+
+
+def test_torn_wal_entry_is_cut_off(tmp_path):
+    path = str(tmp_path / "kg.snapshot")
+    kg = KnowledgeGraph.open(path)
+    kg.add_atom("edge", "a", "b")
+    kg.close()
+    with open(path + ".wal", "a") as wal:
+        wal.write('["+", "edge", "b"')
+
+    reopened = KnowledgeGraph.open(path)
+    assert atoms(reopened) == ["(edge a b)"]
+    # Entries logged after the torn one must not be lost
+    reopened.add_atom("edge", "c", "d")
+    reopened.close()
+    final = KnowledgeGraph.open(path)
+    assert atoms(final) == ["(edge a b)", "(edge c d)"]
+    final.close()
+
+
+def closure(pairs):
+    reach = set(pairs)
+    while True:
+        extra = {(a, d) for a, b in reach for c, d in reach if b == c} - reach
+        if not extra:
+            return reach
+        reach |= extra
+
+
+def reachable(kg):
+    return set(kg.query("reach", "$a", "$b"))
+
+
+def test_recursive_rules_compute_and_retract_the_closure():
+    kg = KnowledgeGraph()
+    kg.add_rule(("reach", "$a", "$b"), [("edge", "$a", "$b")])
+    kg.add_rule(("reach", "$a", "$c"), [("edge", "$a", "$b"), ("reach", "$b", "$c")])
+    rng = random.Random(3)
+    pairs = {(f"n{rng.randrange(10)}", f"n{rng.randrange(10)}") for _ in range(18)}
+    kg.add_atoms(("edge", a, b) for a, b in pairs)
+    assert reachable(kg) == closure(pairs)
+
+    for pair in sorted(pairs)[:6]:
+        kg.remove_atom("edge", *pair)
+        pairs.discard(pair)
+        assert reachable(kg) == closure(pairs)
+
+
+def test_derived_fact_with_another_derivation_survives_retraction():
+    kg = KnowledgeGraph()
+    kg.add_rule(("reach", "$a", "$b"), [("edge", "$a", "$b")])
+    kg.add_rule(("reach", "$a", "$c"), [("edge", "$a", "$b"), ("reach", "$b", "$c")])
+    kg.add_atoms([("edge", "a", "b"), ("edge", "b", "c"), ("edge", "a", "c")])
+    kg.remove_atom("edge", "b", "c")
+    assert ("a", "c") in reachable(kg)
+    kg.remove_atom("edge", "a", "c")
+    assert reachable(kg) == {("a", "b")}
+    # reach feeds a rule, so removing a derived reach fact rederives it
+    kg.remove_atom("reach", "a", "b")
+    assert reachable(kg) == {("a", "b")}
+
+
+def test_ranked_index_follows_adds_and_removes():
+    kg = KnowledgeGraph()
+    kg.add_atom("persona_priority", "HR", "early", 0.5)
+    # Created over existing atoms, then maintained
+    kg.create_ranked_index("persona_priority", 3, key=0, item=1, score=2)
+    kg.add_atom("persona_priority", "HR", "culture_fit", 0.95)
+    kg.add_atom("persona_priority", "HR", "conflict_resolution", 0.9)
+    kg.add_atom("persona_priority", "HR", "unscored", "high")
+    kg.add_atom("persona_priority", "CEO", "strategy", 0.99)
+    assert kg.top_k("persona_priority", "HR", 5) == [
+        ("culture_fit", 0.95), ("conflict_resolution", 0.9), ("early", 0.5),
+    ]
+    assert kg.best_excluding("persona_priority", "HR", ["culture_fit"]) == ("conflict_resolution", 0.9)
+    assert kg.best_excluding("persona_priority", "HR", ["culture_fit", "conflict_resolution", "early"]) is None
+
+    kg.remove_atom("persona_priority", "HR", "culture_fit", 0.95)
+    assert kg.top_k("persona_priority", "HR", 1) == [("conflict_resolution", 0.9)]
+    assert kg.top_k("persona_priority", "nobody", 3) == []
+
+
+def test_persona_topic_routing_uses_the_index():
+    kg = build_interview_kg()
+    topics = get_topics_for_persona(kg, "HR", limit=2)
+    assert [topic for topic, _ in topics] == ["culture_fit", "conflict_resolution"]
+    assert suggest_next_question_topic(kg, "HR", ["culture_fit"]) == "conflict_resolution"
+
+
+def test_ranked_ties_keep_insertion_order():
+    kg = KnowledgeGraph()
+    kg.add_atom("persona_priority", "HR", "teamwork", 0.8)
+    kg.create_ranked_index("persona_priority", 3, key=0, item=1, score=2)
+    kg.add_atom("persona_priority", "HR", "communication", 0.8)
+    kg.add_atom("persona_priority", "HR", "adaptability", 0.8)
+    kg.add_atom("persona_priority", "HR", "culture_fit", 0.9)
+    assert [topic for topic, _ in kg.top_k("persona_priority", "HR", 4)] == [
+        "culture_fit", "teamwork", "communication", "adaptability",
+    ]
+    kg.remove_atom("persona_priority", "HR", "communication", 0.8)
+    assert kg.best_excluding("persona_priority", "HR", ["culture_fit", "teamwork"]) == ("adaptability", 0.8)
+
+
+def test_reads_use_the_index_built_at_load_and_never_create_one(tmp_path):
+    assert build_interview_kg().has_ranked_index("persona_priority")
+    assert open_interview_kg(str(tmp_path / "kg.snapshot")).has_ranked_index("persona_priority")
+    assert open_interview_kg(str(tmp_path / "kg.snapshot")).has_ranked_index("persona_priority")
+
+    kg = KnowledgeGraph()
+    for topic in ("teamwork", "communication", "culture_fit"):
+        kg.add_atom("persona_priority", "HR", topic, 0.95 if topic == "culture_fit" else 0.8)
+    assert get_topics_for_persona(kg, "HR") == [("culture_fit", 0.95), ("teamwork", 0.8), ("communication", 0.8)]
+    assert suggest_next_question_topic(kg, "HR", ["culture_fit"]) == "teamwork"
+    assert not kg.has_ranked_index("persona_priority")
+
+
+def query_in_thread(kg, *pattern):
+    results = []
+    thread = threading.Thread(target=lambda: results.extend(kg.query(*pattern)))
+    thread.start()
+    thread.join()
+    return results
+
+
+def test_batches_are_invisible_to_other_threads_until_committed():
+    kg = edges()
+    with kg.batch():
+        kg.add_atom("edge", "a", "z")
+        kg.remove_atom("edge", "a", "b")
+        # The writer reads its own batch; everyone else the committed version
+        assert sorted(kg.query("edge", "a", "$to")) == [("c",), ("z",)]
+        assert sorted(query_in_thread(kg, "edge", "a", "$to")) == [("b",), ("c",)]
+    assert sorted(query_in_thread(kg, "edge", "a", "$to")) == [("c",), ("z",)]
+
+
+def test_failed_batch_commits_nothing():
+    kg = edges()
+    assert sorted(kg.query("edge", "a", "$to")) == [("b",), ("c",)]
+    with pytest.raises(RuntimeError):
+        with kg.batch():
+            kg.add_atom("edge", "a", "z")
+            with kg.batch():
+                kg.remove_atom("edge", "a", "c")
+            assert sorted(kg.query("edge", "a", "$to")) == [("b",), ("z",)]
+            raise RuntimeError("abort")
+    # Neither the atoms nor the results cached inside the batch leak out
+    assert sorted(kg.query("edge", "a", "$to")) == [("b",), ("c",)]
+    kg.add_atom("edge", "a", "y")
+    assert sorted(kg.query("edge", "a", "$to")) == [("b",), ("c",), ("y",)]
+
+
+def test_loaders(tmp_path):
+    csv_path = tmp_path / "requires.csv"
+    csv_path.write_text("analyst,SQL,3\nanalyst,Excel,2\n")
+    jsonl_path = tmp_path / "topics.jsonl"
+    jsonl_path.write_text('["question_topic", "Q1", "teamwork"]\n{"predicate": "question_topic", "args": ["Q2", "sql"]}\n')
+    metta_path = tmp_path / "skills.metta"
+    metta_path.write_text('; comment\n(focus_skill HR communication)\n(focus_skill HR "culture fit") (weight HR 0.5)\n')
+
+    kg = KnowledgeGraph()
+    assert load_atoms(kg, str(csv_path), predicate="role_requires") == 2
+    assert load_atoms(kg, str(jsonl_path)) == 2
+    assert load_atoms(kg, str(metta_path)) == 3
+    # Loading again adds nothing new
+    assert load_atoms(kg, str(metta_path)) == 0
+    assert sorted(kg.query("role_requires", "analyst", "$skill", "$level")) == [("Excel", "2"), ("SQL", "3")]
+    assert sorted(kg.query("focus_skill", "HR", "$skill")) == [("communication",), ("culture fit",)]
+    assert kg.query("weight", "HR", 0.5) == [()]
+
+    bad = tmp_path / "bad.metta"
+    bad.write_text("(a (b c))")
+    with pytest.raises(ValueError, match="nested"):
+        load_atoms(kg, str(bad))
+    with pytest.raises(ValueError):
+        load_atoms(kg, str(tmp_path / "atoms.txt"))
+
+
+def test_query_many_answers_each_pattern_in_order():
+    kg = edges()
+    assert kg.query_many("edge", [("a", "$to"), ("nowhere", "$to"), ("$from", "a"), ("a", "$to")]) == [
+        kg.query("edge", "a", "$to"), [], [("d",)], kg.query("edge", "a", "$to"),
+    ]
@@ -0,0 +1,60 @@
+from prompts import HistoryCompactor, estimate_tokens, format_turn, interviewer_preamble, persona_description
+
+
+def make_history(turns, answer_words=40):
+    return [
+        {"question": f"Question about topic {i}?",
+         "answer": f"First sentence of answer {i}. " + " ".join(["detail"] * answer_words)}
+        for i in range(turns)
+    ]
+
+
+def test_short_history_is_verbatim():
+    history = make_history(2)
+    text = HistoryCompactor().render("s", history)
+    assert text == format_turn(1, history[0]) + format_turn(2, history[1])
+
+
+def test_long_history_stays_within_budget():
+    compactor = HistoryCompactor(budget=300, summary_budget=100)
+    for turns in (10, 50, 200):
+        history = make_history(turns)
+        text = compactor.render("s", history)
+        assert estimate_tokens(text) <= 300 + 50  # headers are outside the budgets
+        assert format_turn(turns, history[-1]) in text
+        assert "Summary of Questions 1-" in text
+    assert "earliest not shown" in text
+    assert "- Q200:" not in text.split("Most recent")[0]
+
+
+def test_summaries_are_cached_and_rebuilt_after_a_reset():
+    compactor = HistoryCompactor(budget=300, summary_budget=100)
+    history = make_history(10)
+    compactor.render("s", history)
+    cached = compactor._sessions["s"].lines
+    assert cached and cached[0].startswith("- Q1: Question about topic 0?")
+    assert "| A: First sentence of answer 0." in cached[0]
+
+    compactor.render("s", history + make_history(1))
+    assert compactor._sessions["s"].lines is cached
+
+    # A restarted interview with different questions must not reuse old lines
+    restarted = [dict(qa, question="New " + qa["question"]) for qa in history]
+    text = compactor.render("s", restarted)
+    assert "- Q1: Question about topic 0?" not in text
+    assert compactor._sessions["s"].lines[0].startswith("- Q1: New ")
+
+    compactor.forget("s")
+    assert "s" not in compactor._sessions
+
+
+def test_an_oversized_last_answer_is_clipped():
+    history = make_history(1, answer_words=5000)
+    text = HistoryCompactor(budget=300, summary_budget=100).render(None, history)
+    assert text.rstrip().endswith("...")
+    assert estimate_tokens(text) <= 300
+
+
+def test_preamble_uses_the_canonical_persona_text():
+    assert persona_description("HR") in interviewer_preamble("Data Analyst", "HR")
+    assert "professional and standard interviewer" in interviewer_preamble("Data Analyst", "Unknown")
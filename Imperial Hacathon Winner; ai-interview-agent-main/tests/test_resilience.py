@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from asi_client import AsiError, AsiMalformedResponse, AsiScheduler
+from resilience import CircuitBreaker, CircuitOpen, Resilience
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class Flaky:
+    """A call that raises the given errors in turn, then returns "ok"."""
+
+    def __init__(self, *errors, delay=0.0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def test_endpoint_failures_are_retried():
+    resilience = Resilience(base_delay=0.0)
+    call = Flaky(AsiError("down", status=503), AsiError("reset"))
+    assert run(resilience.call(call)) == "ok"
+    assert call.calls == 3
+    assert resilience.metrics()["retries"] == 2
+    assert resilience.breaker.state == "closed"
+
+
+def test_malformed_responses_are_not_retried_or_counted_as_failures():
+    resilience = Resilience(base_delay=0.0, breaker=CircuitBreaker(failure_threshold=1))
+    call = Flaky(AsiMalformedResponse("not JSON"))
+    with pytest.raises(AsiMalformedResponse):
+        run(resilience.call(call))
+    assert call.calls == 1
+    assert resilience.breaker.state == "closed"
+
+
+def test_client_errors_are_not_retried():
+    resilience = Resilience(base_delay=0.0)
+    call = Flaky(AsiError("bad request", status=400))
+    with pytest.raises(AsiError):
+        run(resilience.call(call))
+    assert call.calls == 1
+
+
+def test_breaker_opens_then_probes():
+    resilience = Resilience(retry_attempts=1, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60.0))
+    for _ in range(2):
+        with pytest.raises(AsiError):
+            run(resilience.call(Flaky(AsiError("down", status=502))))
+    assert resilience.breaker.state == "open"
+    call = Flaky()
+    with pytest.raises(CircuitOpen):
+        run(resilience.call(call))
+    assert call.calls == 0
+
+    # After reset_timeout one probe goes through and closes the circuit
+    resilience.breaker.reset_timeout = 0.0
+    assert run(resilience.call(call)) == "ok"
+    assert resilience.breaker.state == "closed"
+
+
+def test_timeouts_are_failures():
+    resilience = Resilience(retry_attempts=1, max_timeout=0.05)
+    with pytest.raises(AsiError, match="timed out"):
+        run(resilience.call(Flaky(delay=1.0)))
+    assert resilience.metrics()["timeouts"] == 1
+
+
+def hedging_scheduler(max_in_flight):
+    resilience = Resilience(hedge=True)
+    for _ in range(resilience.latency.min_samples):
+        resilience.latency.record(0.01)
+    return AsiScheduler(None, max_in_flight=max_in_flight, resilience=resilience)
+
+
+@pytest.mark.parametrize("max_in_flight, hedged", [(1, False), (2, True)])
+def test_hedges_need_a_free_slot(max_in_flight, hedged):
+    scheduler = hedging_scheduler(max_in_flight)
+    call = Flaky(delay=0.2)
+    peak = 0
+
+    async def main():
+        nonlocal peak
+        task = asyncio.ensure_future(scheduler.run(call))
+        while not task.done():
+            peak = max(peak, scheduler._in_flight)
+            await asyncio.sleep(0.01)
+        return await task
+
+    assert run(main()) == "ok"
+    metrics = scheduler.resilience.metrics()
+    assert (metrics["hedges"], metrics["hedges_skipped"]) == ((1, 0) if hedged else (0, 1))
+    assert call.calls == (2 if hedged else 1)
+    assert peak <= max_in_flight
+    assert scheduler._in_flight == 0
@@ -0,0 +1,77 @@
+import types
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, cache_key
+
+MODEL = "asi1-mini"
+ANSWER = "I cleaned the sales data in pandas, then built a Tableau dashboard the finance team used every week."
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls the time the cache sees; advance with clock.now += seconds."""
+    clock = types.SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(response_cache, "time", types.SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def test_exact_hits_ignore_case_and_whitespace():
+    cache = ResponseCache()
+    cache.put("Ask  a SQL question\n", MODEL, 0.7, "What is a LEFT JOIN?")
+    assert cache.get("ask a sql question", MODEL, 0.7) == "What is a LEFT JOIN?"
+    # Model and temperature are part of the key
+    assert cache.get("ask a sql question", MODEL, 0.2) is None
+    assert cache.get("ask a sql question", "other-model", 0.7) is None
+    assert cache_key("a  b", MODEL, 0.7) == cache_key("A b", MODEL, 0.7)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 1)
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(ttl=60.0)
+    cache.put("prompt", MODEL, 0.7, "reply")
+    clock.now += 59.0
+    assert cache.get("prompt", MODEL, 0.7) == "reply"
+    clock.now += 2.0
+    assert cache.get("prompt", MODEL, 0.7) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(max_entries=2)
+    for prompt in ("a", "b"):
+        cache.put(prompt, MODEL, 0.7, prompt.upper())
+        clock.now += 1.0
+    assert cache.get("a", MODEL, 0.7) == "A"
+    clock.now += 1.0
+    cache.put("c", MODEL, 0.7, "C")
+    assert cache.get("b", MODEL, 0.7) is None
+    assert cache.get("a", MODEL, 0.7) == "A"
+    assert cache.get("c", MODEL, 0.7) == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_similar_answers_hit_within_their_namespace():
+    cache = ResponseCache()
+    cache.put(f"Evaluate: {ANSWER}", MODEL, 0.3, "4/5", namespace="eval:sql", similar_text=ANSWER)
+    reworded = "So " + ANSWER
+    assert cache.get(f"Evaluate: {reworded}", MODEL, 0.3, namespace="eval:sql", similar_text=reworded) == "4/5"
+    assert cache.get(f"Evaluate: {reworded}", MODEL, 0.3, namespace="eval:python", similar_text=reworded) is None
+    unrelated = "I have never used a database."
+    assert cache.get(f"Evaluate: {unrelated}", MODEL, 0.3, namespace="eval:sql", similar_text=unrelated) is None
+    stats = cache.stats()
+    assert (stats["similar_hits"], stats["misses"]) == (1, 2)
+
+
+def test_similarity_vectors_survive_a_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResponseCache(path)
+    cache.put("p", MODEL, 0.3, "4/5", namespace="eval", similar_text=ANSWER)
+    cache.close()
+
+    cache = ResponseCache(path)
+    assert cache.get("q", MODEL, 0.3, namespace="eval", similar_text=ANSWER) == "4/5"
+    cache.close()
@@ -0,0 +1,153 @@
+import pytest
+
+from session_store import LocalRedis, RedisBackend, SessionStore, SQLiteBackend
+
+
+class Session:
+    def __init__(self, data=None):
+        data = data or {}
+        self.role = data.get("role")
+        self.answers = list(data.get("answers", []))
+
+    def to_dict(self):
+        return {"role": self.role, "answers": list(self.answers)}
+
+
+class FlakyBackend:
+    """RedisBackend over LocalRedis whose next `failures` applies raise."""
+
+    def __init__(self):
+        self.inner = RedisBackend(LocalRedis())
+        self.failures = 0
+
+    def get_many(self, keys):
+        return self.inner.get_many(keys)
+
+    def apply(self, sets, deletes):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("backend down")
+        self.inner.apply(sets, deletes)
+
+
+def make_store(backend, **kwargs):
+    return SessionStore(backend, Session.to_dict, Session, ("answers",), **kwargs)
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "sessions.sqlite3"))
+        yield backend
+        backend.close()
+    else:
+        yield RedisBackend(LocalRedis())
+
+
+def test_round_trip_writes_only_the_delta(backend):
+    store = make_store(backend)
+    session = store.get("k")
+    session.role = "Junior Data Analyst"
+    session.answers += ["a0", "a1"]
+    store.put("k", session)
+    store.flush()
+    session.answers.append("a2")
+    store.put("k", session)
+    store.flush()
+    # Head plus the one new answer
+    assert store.metrics()["records_written"] == 3 + 2
+
+    reloaded = make_store(backend).get("k")
+    assert reloaded.role == "Junior Data Analyst"
+    assert reloaded.answers == ["a0", "a1", "a2"]
+
+
+def test_shrunk_list_is_rewritten(backend):
+    store = make_store(backend)
+    session = store.get("k")
+    session.answers = ["a0", "a1", "a2"]
+    store.put("k", session)
+    store.flush()
+    session.answers = ["b0"]
+    store.put("k", session)
+    store.flush()
+    assert make_store(backend).get("k").answers == ["b0"]
+
+
+def test_whole_dict_sessions_are_converted(backend):
+    backend.apply({"k": {"role": "HR", "answers": ["old"]}}, [])
+    store = make_store(backend)
+    session = store.get("k")
+    assert session.answers == ["old"]
+    session.answers.append("new")
+    store.put("k", session)
+    store.flush()
+    assert make_store(backend).get("k").answers == ["old", "new"]
+
+
+def test_failed_flush_keeps_changes_dirty():
+    backend = FlakyBackend()
+    store = make_store(backend)
+    session = store.get("k")
+    session.answers.append("a0")
+    store.put("k", session)
+    store.flush()
+
+    session.answers.append("a1")
+    store.put("k", session)
+    backend.failures = 1
+    with pytest.raises(OSError):
+        store.flush()
+    assert store.metrics()["dirty"] == 1
+
+    session.answers.append("a2")
+    store.put("k", session)
+    store.flush()
+    assert store.metrics()["dirty"] == 0
+    # a1 was not lost: the retry wrote everything since the last good flush
+    assert make_store(backend).get("k").answers == ["a0", "a1", "a2"]
+
+
+def test_failed_eviction_keeps_session_cached():
+    backend = FlakyBackend()
+    store = make_store(backend, max_cached=1)
+    session = store.get("a")
+    session.answers.append("x")
+    store.put("a", session)
+    backend.failures = 1
+    store.get("b")
+    assert store.metrics()["cached"] == 2
+    store.flush()
+    assert make_store(backend).get("a").answers == ["x"]
+
+
+def test_flush_skips_sessions_mid_turn(backend):
+    store = make_store(backend)
+    other = store.get("other")
+    with store.turn("k"):
+        session = store.get("k")
+        session.answers.append("half")
+        store.put("k", session)
+        other.answers.append("done")
+        store.put("other", other)
+        # e.g. another handler flushing its own changes
+        store.flush()
+        assert make_store(backend).get("k").answers == []
+        assert make_store(backend).get("other").answers == ["done"]
+        session.answers.append("complete")
+    store.flush()
+    assert make_store(backend).get("k").answers == ["half", "complete"]
+
+
+def test_close_flushes_open_turns(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    store = make_store(SQLiteBackend(path))
+    store.begin("k")
+    session = store.get("k")
+    session.answers.append("a0")
+    store.put("k", session)
+    store.close()
+
+    backend = SQLiteBackend(path)
+    assert make_store(backend).get("k").answers == ["a0"]
+    backend.close()